@@ -1,6 +1,8 @@
 from __future__ import annotations
+import os
+import threading
 from pathlib import Path
-from typing import List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 
 from app.business.grouping import GroupingService, GroupTriplet
 from app.business.mapping import MappingService
@@ -9,12 +11,29 @@ from app.logs.logger import get_logger
 from app.storage.config import ConfigRepo
 
 RequestPayload = Tuple[List[int], Optional[List[int]], Optional[List[int]]]
+# 组内 txt 文件签名：((path, mtime_ns, size), ...)，任一文件变化即视为预合成结果失效
+FileSignature = Tuple[Tuple[str, int, int], ...]
+
+def _group_key(group: GroupTriplet) -> Tuple[Tuple[str, str], ...]:
+    return tuple((c, str(txt)) for c, (txt, _jpg) in group.files.items())
+
+def _group_signature(group: GroupTriplet) -> Optional[FileSignature]:
+    sig = []
+    for _c, (txt, _jpg) in group.files.items():
+        try:
+            st = os.stat(txt)
+        except OSError:
+            return None
+        sig.append((str(txt), st.st_mtime_ns, st.st_size))
+    return tuple(sig)
 
 class Dispatcher:
     """
     派发器（仅支持 triplet 三色编组）：
     - 从 work_dir 聚合完整三色组（顺序由配置 color_order 决定，默认 R→G→B）
     - 请求时返回 indices（2B/项，小端）；attrs 由上层决定是否承载
+    - 预合成：队首 dispatcher.prefetch_depth 个组由后台线程提前解析与映射，
+      B1 到达时仅出队并校验文件签名（path/mtime/size）；签名不符或未命中时现场合成
     """
     def __init__(self, work_dir: str | Path, grouping: GroupingService | None = None, mapping: MappingService | None = None) -> None:
         self.work_dir = Path(work_dir)
@@ -32,19 +51,104 @@ class Dispatcher:
         self.error_dir = Path(gp.get("error_dir", self.work_dir.parent / "error"))
         self._queue_triplets: List[GroupTriplet] = []
         self._last_dispatched: Optional[GroupTriplet] = None
+
+        # 预合成缓存：组 key -> (文件签名, payload)；reload()（ingress 线程）与出队（TX 线程）共用锁
+        try:
+            self._prefetch_depth = max(0, int(disp.get("prefetch_depth", 2)))
+        except Exception:
+            self._prefetch_depth = 2
+        self._lock = threading.Lock()
+        self._prefetched: Dict[Tuple[Tuple[str, str], ...], Tuple[FileSignature, RequestPayload]] = {}
+        self._prefetch_evt = threading.Event()
+        self._prefetch_stop = threading.Event()
+        self._prefetch_thread: Optional[threading.Thread] = None
+        # close() 之后不再启动预合成线程（在途的 request_next_payload/reload 仍可能调用 _kick_prefetch）
+        self._closed = False
+        self.prefetch_hits = 0
+        self.prefetch_misses = 0
         self.reload()
 
     def reload(self) -> None:
-        self._queue_triplets = self.grouping.group(self.work_dir)
+        groups = self.grouping.group(self.work_dir)
+        with self._lock:
+            self._queue_triplets = groups
+        self._kick_prefetch()
 
     def request_next_payload(self) -> RequestPayload:
-        if not self._queue_triplets:
-            return [], None, None
-        g = self._queue_triplets.pop(0)
-        self._last_dispatched = g
+        with self._lock:
+            if not self._queue_triplets:
+                return [], None, None
+            g = self._queue_triplets.pop(0)
+            self._last_dispatched = g
+            cached = self._prefetched.pop(_group_key(g), None)
+        self._kick_prefetch()
+        if cached is not None and cached[0] == _group_signature(g):
+            self.prefetch_hits += 1
+            return cached[1]
+        self.prefetch_misses += 1
         indices, attrs, colors = self.mapping.compose_indices_attrs_and_colors_for_group(g)
         return indices, attrs, colors
 
+    def _kick_prefetch(self) -> None:
+        """唤醒预合成线程（首次调用时启动；prefetch_depth=0 或已 close() 时不启用）"""
+        if self._prefetch_depth <= 0:
+            return
+        with self._lock:
+            if self._closed:
+                return
+            th = self._prefetch_thread
+            if th is None or not th.is_alive():
+                self._prefetch_stop.clear()
+                th = threading.Thread(target=self._prefetch_runner, name="dispatcher-prefetch", daemon=True)
+                self._prefetch_thread = th
+                th.start()
+        self._prefetch_evt.set()
+
+    def _prefetch_runner(self) -> None:
+        while not self._prefetch_stop.is_set():
+            self._prefetch_evt.wait()
+            self._prefetch_evt.clear()
+            if self._prefetch_stop.is_set():
+                break
+            try:
+                self._prefetch_once()
+            except Exception as e:
+                self.logger.debug(f"prefetch failed: {e}")
+
+    def _prefetch_once(self) -> None:
+        """合成队首 N 组中缺失或文件已变化的项；不在队首窗口内的旧结果丢弃"""
+        with self._lock:
+            head = list(self._queue_triplets[: self._prefetch_depth])
+            keep = {_group_key(g) for g in head}
+            for k in [k for k in self._prefetched if k not in keep]:
+                del self._prefetched[k]
+            have = {k: sig for k, (sig, _p) in self._prefetched.items()}
+        for g in head:
+            if self._prefetch_evt.is_set() or self._prefetch_stop.is_set():
+                # 队列已变化：交给下一轮按新队首处理
+                return
+            key = _group_key(g)
+            sig = _group_signature(g)
+            if sig is None or have.get(key) == sig:
+                continue
+            try:
+                payload = self.mapping.compose_indices_attrs_and_colors_for_group(g)
+            except Exception as e:
+                # 解析失败不缓存：出队时现场合成，按原路径报错
+                self.logger.debug(f"prefetch compose failed key={g.key}: {e}")
+                continue
+            with self._lock:
+                if any(_group_key(q) == key for q in self._queue_triplets[: self._prefetch_depth]):
+                    self._prefetched[key] = (sig, payload)
+
+    def close(self) -> None:
+        """停止预合成线程（此后的 _kick_prefetch 不再重启）"""
+        with self._lock:
+            self._closed = True
+            self._prefetch_thread = None
+        self._prefetch_stop.set()
+        self._prefetch_evt.set()
+
     def archive_group(self, group: GroupTriplet, success: bool = True) -> None:
         """
         归档最近一次任务（仅 triplet）。
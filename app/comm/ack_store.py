@@ -0,0 +1,120 @@
+from __future__ import annotations
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+# SEQ 为 16 位且循环使用：同一 SEQ 在 65536 次发送后会被复用，超过半个空间的旧记录不再可信
+SEQ_SPACE = 0x10000
+SEQ_HALF = SEQ_SPACE // 2
+
+PENDING = "pending"
+ACKED = "acked"
+EXPIRED = "expired"
+
+class _Record:
+    __slots__ = ("state", "code", "send_no", "ts")
+
+    def __init__(self, state: str, code: Optional[int], send_no: int, ts: float) -> None:
+        self.state = state
+        self.code = code
+        self.send_no = send_no
+        self.ts = ts
+
+class AckStore:
+    """
+    有界 ACK 记录（按 16 位 SEQ 索引）：
+    - 记录近期发送过的 SEQ 及其结局（acked/expired），用于识别未匹配待应答项的 BF：
+      expired → 迟到（late）；acked → 重复（duplicate）；无记录 → 未请求（unsolicited）；
+    - 淘汰：按最近更新顺序，超出 max_entries 或超过 ttl_sec 的记录从最旧端移除；
+    - 回绕安全：记录携带发送序号，距今发送次数达到半个 SEQ 空间的记录视为不存在。
+    线程安全：RX 线程（BF）与 TX 线程（超时）都会调用。
+    """
+    def __init__(self, ttl_sec: float = 60.0, max_entries: int = 256, clock: Callable[[], float] = time.monotonic) -> None:
+        self.ttl_sec = float(ttl_sec)
+        self.max_entries = max(1, int(max_entries))
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._recs: "OrderedDict[int, _Record]" = OrderedDict()
+        self._sends = 0
+        self._counters: Dict[str, int] = {
+            "late_acks": 0,
+            "duplicate_acks": 0,
+            "unsolicited_acks": 0,
+            "evicted": 0,
+        }
+
+    def _put(self, seq: int, state: str, code: Optional[int], send_no: int, now: float) -> None:
+        recs = self._recs
+        recs[seq] = _Record(state, code, send_no, now)
+        recs.move_to_end(seq)
+        # 最旧端淘汰：超量或超时
+        limit = now - self.ttl_sec
+        while recs:
+            _seq, oldest = next(iter(recs.items()))
+            if len(recs) > self.max_entries or oldest.ts < limit:
+                recs.popitem(last=False)
+                self._counters["evicted"] += 1
+            else:
+                break
+
+    def _lookup(self, seq: int, now: float) -> Optional[_Record]:
+        rec = self._recs.get(seq)
+        if rec is None:
+            return None
+        if rec.ts < now - self.ttl_sec or self._sends - rec.send_no >= SEQ_HALF:
+            del self._recs[seq]
+            self._counters["evicted"] += 1
+            return None
+        return rec
+
+    def note_sent(self, seq: int) -> None:
+        """登记一次发送（进入待应答）。"""
+        with self._lock:
+            self._sends += 1
+            self._put(seq & 0xFFFF, PENDING, None, self._sends, self._clock())
+
+    def note_resolved(self, seq: int, acked: bool, code: Optional[int] = None) -> None:
+        """登记待应答项的结局：收到 BF（acked）或重试耗尽（expired）。"""
+        with self._lock:
+            now = self._clock()
+            rec = self._lookup(seq & 0xFFFF, now)
+            send_no = rec.send_no if rec is not None else self._sends
+            self._put(seq & 0xFFFF, ACKED if acked else EXPIRED, code, send_no, now)
+
+    def classify_unmatched(self, seq: int, code: int) -> str:
+        """
+        对未匹配任何待应答项的 BF 分类并计数，返回 "late"/"duplicate"/"unsolicited"。
+        迟到的 BF 会把记录改为 acked，此后同 SEQ 的 BF 计为重复。
+        """
+        seq &= 0xFFFF
+        with self._lock:
+            now = self._clock()
+            rec = self._lookup(seq, now)
+            if rec is None:
+                kind = "unsolicited"
+                self._counters["unsolicited_acks"] += 1
+                return kind
+            if rec.state == ACKED:
+                kind = "duplicate"
+                self._counters["duplicate_acks"] += 1
+            else:
+                kind = "late"
+                self._counters["late_acks"] += 1
+            self._put(seq, ACKED, code, rec.send_no, now)
+            return kind
+
+    def last_code(self, seq: int) -> Optional[int]:
+        """最近一次收到的该 SEQ 的结果码（记录已淘汰或未应答时为 None）。"""
+        with self._lock:
+            rec = self._lookup(seq & 0xFFFF, self._clock())
+            return rec.code if rec is not None else None
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            out = dict(self._counters)
+            out["entries"] = len(self._recs)
+            return out
+
+    def __len__(self) -> int:
+        return len(self._recs)
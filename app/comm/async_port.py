@@ -0,0 +1,183 @@
+from __future__ import annotations
+import asyncio
+import os
+from typing import List, Optional
+
+try:
+    import serial  # pyserial
+except Exception:  # defer ImportError until open() is called
+    serial = None  # type: ignore
+
+from app.comm.serial_port import SerialPortBase
+from app.logs.logger import get_logger
+
+
+class MemoryAsyncPort(SerialPortBase):
+    """
+    事件循环内的内存双端口（FakeSerialPort 的异步版本），便于测试 AsyncSerialSession。
+    write_bytes 通过 loop.call_soon 投递到 peer，回调总在下一轮事件循环执行，不会在写调用内重入。
+    """
+    def __init__(self, loop: Optional[asyncio.AbstractEventLoop] = None) -> None:
+        super().__init__()
+        self._loop = loop
+        self._peer: Optional["MemoryAsyncPort"] = None
+        self.tx_log: List[bytes] = []
+        self.rx_log: List[bytes] = []
+        self.is_open: bool = True
+
+    def connect_peer(self, peer: "MemoryAsyncPort") -> None:
+        self._peer = peer
+        peer._peer = self
+
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+        return self._loop
+
+    def write_bytes(self, data: bytes) -> None:
+        data = bytes(data)
+        self.tx_log.append(data)
+        peer = self._peer
+        if peer is not None and peer.is_open:
+            self._get_loop().call_soon(peer._deliver, data)
+
+    def _deliver(self, data: bytes) -> None:
+        if not self.is_open:
+            return
+        self.rx_log.append(data)
+        cb = self._rx_cb
+        if cb:
+            cb(data)
+
+    def open(self, port: str | None = None, baud: int = 115200) -> None:
+        self.is_open = True
+
+    def close(self) -> None:
+        self.is_open = False
+
+
+class PySerialAsyncPort(SerialPortBase):
+    """
+    基于事件循环的真实串口（pyserial 仅负责打开与配置，读写直接使用非阻塞 fd）：
+    - 读：loop.add_reader 就绪回调内 os.read，无接收线程、无轮询；
+    - 写：先尝试立即写出，写不完的部分暂存并由 loop.add_writer 在可写时续写；
+    - 读到 EOF 或读写出现 OSError（设备拔出等）：注销 fd、关闭串口并经 set_lost_callback 通知（lost=True），同 PySerialPort；
+    依赖 POSIX 可 select 的串口 fd（Linux/macOS）；Windows 下请使用 PySerialPort + SerialSession。
+    """
+    READ_CHUNK = 4096
+
+    def __init__(self, loop: Optional[asyncio.AbstractEventLoop] = None) -> None:
+        super().__init__()
+        self._loop = loop
+        self._ser: Optional["serial.Serial"] = None  # type: ignore[name-defined]
+        self._fd: Optional[int] = None
+        self._wbuf = bytearray()
+        self._logger = get_logger("pyserial-async")
+
+    def open(self, port: str | None = None, baud: int = 115200, timeout_ms: int = 0) -> None:
+        """打开串口并注册到事件循环（需在事件循环线程内调用或构造时传入 loop）。timeout_ms 仅为接口兼容保留。"""
+        if port is None:
+            raise ValueError("PySerialAsyncPort.open requires a 'port' string (e.g., '/dev/ttyUSB0')")
+        if serial is None:
+            raise ImportError("pyserial is not installed. Please install 'pyserial>=3.5'")
+        loop = self._loop or asyncio.get_running_loop()
+        self._loop = loop
+        try:
+            self._ser = serial.Serial(port=port, baudrate=int(baud), timeout=0)  # type: ignore[attr-defined]
+            fd = self._ser.fileno()
+            os.set_blocking(fd, False)
+            self._fd = fd
+            loop.add_reader(fd, self._on_readable)
+            self._logger.info(f"Serial opened (async): port={port} baud={baud}")
+        except Exception as e:
+            self._logger.error(f"Serial open failed: {e}")
+            raise
+
+    def _on_readable(self) -> None:
+        fd = self._fd
+        if fd is None:
+            return
+        try:
+            data = os.read(fd, self.READ_CHUNK)
+        except (BlockingIOError, InterruptedError):
+            return
+        except Exception as e:
+            self._on_lost(f"Serial read failed: {e}")
+            return
+        if not data:
+            # 可读却读到 0 字节：对端关闭/设备拔出；不注销则事件循环会持续就绪空转
+            self._on_lost("Serial read returned EOF")
+            return
+        if self._rx_cb:
+            try:
+                self._rx_cb(data)
+            except Exception as e:
+                self._logger.error(f"RX callback error: {e}")
+
+    def write_bytes(self, data: bytes) -> None:
+        """写入字节流；内核缓冲区满时暂存剩余部分，异常记录日志但不抛出。"""
+        try:
+            if not isinstance(data, (bytes, bytearray, memoryview)):
+                raise TypeError("write_bytes expects bytes or bytearray")
+            fd = self._fd
+            if fd is None:
+                raise RuntimeError("Serial port is not open")
+            if self._wbuf:
+                self._wbuf += data
+                return
+            try:
+                n = os.write(fd, data)
+            except (BlockingIOError, InterruptedError):
+                n = 0
+            except OSError as e:
+                self._on_lost(f"Serial write failed: {e}")
+                return
+            if n < len(data):
+                self._wbuf += memoryview(data)[n:]
+                self._loop.add_writer(fd, self._on_writable)  # type: ignore[union-attr]
+        except Exception as e:
+            self._logger.error(f"Serial write failed: {e}")
+
+    def _on_writable(self) -> None:
+        fd = self._fd
+        if fd is None:
+            return
+        try:
+            n = os.write(fd, self._wbuf)
+        except (BlockingIOError, InterruptedError):
+            return
+        except Exception as e:
+            self._on_lost(f"Serial write failed: {e}")
+            return
+        del self._wbuf[:n]
+        if not self._wbuf:
+            self._loop.remove_writer(fd)  # type: ignore[union-attr]
+
+    def _on_lost(self, reason: str) -> None:
+        """设备丢失：从事件循环注销读写回调并关闭串口（只报一次错），由监管者以新实例重开"""
+        if self.lost:
+            return
+        self._logger.error(f"{reason}; port lost")
+        self._release()
+        self._notify_lost(reason)
+
+    def _release(self) -> None:
+        fd = self._fd
+        self._fd = None
+        if fd is not None and self._loop is not None:
+            self._loop.remove_reader(fd)
+            self._loop.remove_writer(fd)
+        self._wbuf.clear()
+        if self._ser is not None:
+            try:
+                self._ser.close()
+            except Exception:
+                pass
+            self._ser = None
+
+    def close(self) -> None:
+        try:
+            self._release()
+            self._logger.info("Serial closed")
+        except Exception as e:
+            self._logger.error(f"Serial close failed: {e}")
@@ -0,0 +1,370 @@
+from __future__ import annotations
+import asyncio
+from typing import Callable, Dict, List, Optional, Union
+
+from app.comm.ack_store import AckStore
+from app.comm.protocol import (
+    AckCode,
+    FrameType,
+    ProtocolFrame,
+    StreamDecoder,
+    build_a0,
+    build_a1_packed,
+    decoder_limits,
+    encode_af,
+    encode_frame,
+    next_seq_after,
+)
+from app.comm.session import RequestHandler, SessionState
+from app.logs.logger import get_device_info_logger, get_logger, hex_dump
+from app.storage.config import ConfigRepo
+
+
+class AsyncSerialSession:
+    """
+    单事件循环的会话实现（与 SerialSession 协议语义一致，不占用线程）：
+    - B1 → AF（接收回调内立即写出）→ A1（合成后发送）→ 等待 BF；同一时刻仅一个 A1 在途；
+    - 重复 B1 仅重发 AF（duplicate_code / echo_last），乱序 B1 回 SEQ_TOO_SMALL/LARGE；
+    - 心跳 A0 按固定周期单次尝试，失败累计达到 offline_failure_threshold 置 OFFLINE；
+    - 重试/超时由 comm.retry.* 驱动，定时用 loop 计时器而非 sleep 轮询；
+    - 同一轮事件循环内写出的帧合并为一次 port.write_bytes（comm.tx.coalesce_enabled）。
+    port 需在同一事件循环内回调（MemoryAsyncPort / PySerialAsyncPort）；一个事件循环可驱动任意多个会话。
+    """
+    def __init__(
+        self,
+        port,
+        request_handler: Optional[RequestHandler] = None,
+        name: str = "async-session",
+        ack_timeout_ms: int = 1000,
+        cmd_timeout_ms: int = 2000,
+    ) -> None:
+        self.port = port
+        self.logger = get_logger(name)
+        self._request_handler: RequestHandler = request_handler or (lambda: ([], None))
+        self._seq = 0
+        self.state = SessionState.DISCONNECTED
+        self._offline_failures = 0
+        self._last_b1_seq: Optional[int] = None
+        self._last_b1_ack_code: int = int(AckCode.OK)
+        self.last_remote_seq: Optional[int] = None
+        self.expected_remote_seq: Optional[int] = None
+        self.on_a1_result: Optional[Callable[[bool], None]] = None
+
+        # 待应答表：seq -> (TYPE, Future)
+        self._outstanding: Dict[int, "tuple[FrameType, asyncio.Future[bool]]"] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._tasks: "set[asyncio.Task]" = set()
+        self._hb_task: Optional[asyncio.Task] = None
+        self._a1_lock: Optional[asyncio.Lock] = None
+        self._tx_buf = bytearray()
+        self._tx_flush_scheduled = False
+
+        cfg = ConfigRepo().load()
+        comm_cfg = cfg.get("comm", {})
+        self.ack_timeout_ms = int(ack_timeout_ms)
+        self.cmd_timeout_ms = int(comm_cfg.get("cmd_timeout_ms", cmd_timeout_ms))
+        self.heartbeat_interval_sec: float = float(comm_cfg.get("heartbeat_interval_seconds", 10))
+        self.offline_threshold: int = int(comm_cfg.get("offline_failure_threshold", 10))
+        self._enable_heartbeat = bool(comm_cfg.get("enable_heartbeat", True))
+        self._hb_skip_on_traffic = bool(comm_cfg.get("heartbeat_skip_on_traffic", True))
+        self._last_traffic_at = float("-inf")
+        self.heartbeats_sent = 0
+        self.heartbeats_skipped = 0
+        rty = comm_cfg.get("retry", {})
+        self.retry_enabled: bool = bool(rty.get("enabled", True))
+        self.retry_max_attempts: int = int(rty.get("max_attempts", 3))
+        self.retry_backoff_ms: int = int(rty.get("backoff_ms", 50))
+        # 与 SerialSession 相同：构造参数保持默认时由配置覆盖
+        if int(ack_timeout_ms) == 1000 and "ack_timeout_ms" in rty:
+            self.ack_timeout_ms = int(rty["ack_timeout_ms"])
+        self._duplicate_ack_mode = str(comm_cfg.get("duplicate_ack_mode", "duplicate_code"))
+        self._tx_coalesce = bool((comm_cfg.get("tx", {}) or {}).get("coalesce_enabled", True))
+
+        _hx = (cfg.get("logging", {}).get("hex") or {})
+        self._hex_capture = bool(_hx.get("capture", False))
+        self._hex_max_bytes = int(_hx.get("max_bytes", 1024))
+
+        ack_cfg = comm_cfg.get("ack_store", {}) or {}
+        self._ack_store = AckStore(
+            ttl_sec=float(ack_cfg.get("ttl_seconds", 60)),
+            max_entries=int(ack_cfg.get("max_entries", 256)),
+        )
+        self._decoder = StreamDecoder(
+            on_error=self._on_decode_error,
+            on_garbage=self._on_device_info,
+            max_len=decoder_limits(comm_cfg.get("decoder", {}) or {}),
+        )
+        self.port.set_rx_callback(self._on_bytes)
+
+    # ---- 生命周期 ----
+    async def start(self) -> None:
+        """绑定当前事件循环，并按配置启动心跳任务"""
+        self._loop = asyncio.get_running_loop()
+        self._a1_lock = asyncio.Lock()
+        if self._enable_heartbeat:
+            self.start_heartbeat()
+
+    def start_heartbeat(self, interval_sec: Optional[float] = None) -> None:
+        if self._hb_task is not None and not self._hb_task.done():
+            return
+        itv = float(interval_sec if interval_sec is not None else self.heartbeat_interval_sec)
+        self._hb_task = self._get_loop().create_task(self._heartbeat_loop(itv))
+        self.logger.info(f"Heartbeat scheduler started interval={itv}s")
+
+    async def _heartbeat_loop(self, itv: float) -> None:
+        # 固定周期：一次发送耗时超过周期时不额外等待；周期内有业务流量则跳过（同 SerialSession）
+        loop = self._get_loop()
+        next_time = loop.time()
+        while True:
+            if self._hb_skip_on_traffic and loop.time() - self._last_traffic_at < itv:
+                self.heartbeats_skipped += 1
+            else:
+                self.heartbeats_sent += 1
+                self._spawn(self.send_with_ack(build_a0(), single_try=True))
+            next_time += itv
+            delay = next_time - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            else:
+                next_time = loop.time()
+
+    async def close(self, close_port: bool = False) -> None:
+        """停止心跳与在途任务，待应答项以 False 结束"""
+        tasks = list(self._tasks)
+        if self._hb_task is not None:
+            tasks.append(self._hb_task)
+            self._hb_task = None
+        for t in tasks:
+            t.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        for _t, fut in self._outstanding.values():
+            if not fut.done():
+                fut.set_result(False)
+        self._outstanding.clear()
+        self._flush_tx()
+        if close_port:
+            try:
+                self.port.close()
+            except Exception as e:
+                self.logger.debug(f"port close failed: {e}")
+
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+        return self._loop
+
+    def _spawn(self, coro) -> "asyncio.Task":
+        task = self._get_loop().create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    def _set_state(self, new_state: SessionState) -> None:
+        if new_state != self.state:
+            self.logger.info(f"Session state {self.state.value} -> {new_state.value}")
+            self.state = new_state
+
+    def next_seq(self) -> int:
+        """下一个 A1 SEQ（跳过空包专用的 0xFFFF，参见 next_seq_after）"""
+        s = self._seq
+        self._seq = next_seq_after(s)
+        return s
+
+    def decoder_stats(self) -> Dict[str, float]:
+        return self._decoder.stats()
+
+    def ack_stats(self) -> Dict[str, int]:
+        return self._ack_store.stats()
+
+    # ---- TX ----
+    def _write_blob(self, blob: bytes, ftype: int, seq: int, val_len: int) -> None:
+        """写出整帧；合并开启时暂存到本轮缓冲，由 call_soon 在本轮回调结束后一次写出"""
+        if self._hex_capture:
+            self.logger.debug(f"TX HEX: {hex_dump(blob, limit=self._hex_max_bytes)}")
+        if self._tx_coalesce:
+            self._tx_buf += blob
+            if not self._tx_flush_scheduled:
+                self._tx_flush_scheduled = True
+                self._get_loop().call_soon(self._flush_tx)
+        else:
+            self.port.write_bytes(blob)
+        try:
+            tname = FrameType(ftype).name
+        except Exception:
+            tname = f"0x{int(ftype):02X}"
+        self.logger.debug(f"TX {tname} seq={seq} len={val_len}")
+
+    def _flush_tx(self) -> None:
+        self._tx_flush_scheduled = False
+        if not self._tx_buf:
+            return
+        blob = bytes(self._tx_buf)
+        self._tx_buf.clear()
+        try:
+            self.port.write_bytes(blob)
+        except Exception as e:
+            self.logger.debug(f"tx write error: {e}")
+
+    def _send_frame(self, frame: ProtocolFrame) -> None:
+        self._write_blob(encode_frame(frame), frame.type, frame.seq, len(frame.val))
+
+    def _send_af(self, seq: int, code: Union[int, AckCode]) -> None:
+        self._write_blob(encode_af(seq, code), FrameType.AF, seq, 1)
+
+    async def send_with_ack(self, frame: ProtocolFrame, timeout_ms: Optional[int] = None, single_try: bool = False) -> bool:
+        """
+        发送并等待 BF，返回 BF 结果码是否为 OK：
+        - 重试策略 comm.retry.*（enabled/ack_timeout_ms/max_attempts/backoff_ms）；A0 指定 single_try 时仅一次；
+        - 次数用尽：失败计数 +1，达到阈值置 OFFLINE；
+        - 同一 SEQ、同一 TYPE 已在等待时不重复发送，直接等待已有结果。
+        """
+        cur = self._outstanding.get(frame.seq)
+        if cur is not None and cur[0] == frame.type:
+            return await asyncio.shield(cur[1])
+        attempts = max(1, self.retry_max_attempts) if self.retry_enabled else 1
+        backoff = self.retry_backoff_ms / 1000.0 if self.retry_enabled else 0.0
+        if frame.type == FrameType.A0 and single_try:
+            attempts, backoff = 1, 0.0
+        per_try = int(timeout_ms if timeout_ms is not None else self.ack_timeout_ms) / 1000.0
+
+        fut: "asyncio.Future[bool]" = self._get_loop().create_future()
+        if cur is not None and not cur[1].done():
+            # 同 SEQ 的其他类型仍在等待（BF 只携带 SEQ，无法区分）：旧项按失败结束，其等待方随即返回
+            self.logger.warning(f"{cur[0].name} seq={frame.seq} superseded by {frame.type.name} before its BF")
+            cur[1].set_result(False)
+        self._outstanding[frame.seq] = (frame.type, fut)
+        self._ack_store.note_sent(frame.seq)
+        try:
+            for i in range(attempts):
+                if i:
+                    self.logger.debug(f"ack timeout, resend {frame.type.name} seq={frame.seq} left={attempts - i - 1}")
+                    if backoff > 0:
+                        await asyncio.sleep(backoff)
+                    if fut.done():
+                        break
+                self._send_frame(frame)
+                try:
+                    return await asyncio.wait_for(asyncio.shield(fut), per_try)
+                except asyncio.TimeoutError:
+                    continue
+            if fut.done():
+                return bool(fut.result())
+        finally:
+            ent = self._outstanding.get(frame.seq)
+            if ent is not None and ent[1] is fut:
+                del self._outstanding[frame.seq]
+        # 最后一次仍超时：计入失败并按阈值置 OFFLINE
+        self._ack_store.note_resolved(frame.seq, acked=False)
+        self._offline_failures += 1
+        if self._offline_failures >= self.offline_threshold:
+            self._set_state(SessionState.OFFLINE)
+        if not fut.done():
+            fut.set_result(False)
+        return False
+
+    async def send_heartbeat(self, timeout_ms: Optional[int] = None) -> bool:
+        return await self.send_with_ack(build_a0(), timeout_ms=timeout_ms)
+
+    async def _send_a1_payload(self, indices: List[int], attrs: Optional[List[int]] = None, colors: Optional[List[int]] = None) -> bool:
+        seq = self.next_seq()
+        frame = build_a1_packed(indices=indices, seq=seq, attrs=attrs, colors=colors)
+        return await self.send_with_ack(frame, timeout_ms=self.cmd_timeout_ms)
+
+    async def _serve_b1(self, b1_seq: int) -> None:
+        """合成并下发一次 A1；锁保证同一时刻仅一个 A1 在途，派发与 on_a1_result 一一对应"""
+        lock = self._a1_lock
+        if lock is None:
+            lock = self._a1_lock = asyncio.Lock()
+        async with lock:
+            try:
+                result = self._request_handler()
+                colors: Optional[List[int]] = None
+                if isinstance(result, tuple) and len(result) == 3:
+                    indices, attrs, colors = result
+                else:
+                    indices, attrs = result  # type: ignore
+                ok = await self._send_a1_payload(indices, attrs=attrs, colors=colors)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.logger.debug(f"A1 job error for B1 seq={b1_seq}: {e}")
+                return
+            if self.on_a1_result:
+                try:
+                    self.on_a1_result(ok)
+                except Exception as e:
+                    self.logger.debug(f"on_a1_result callback error: {e}")
+
+    # ---- RX ----
+    def _on_decode_error(self, code: AckCode, seq: int) -> None:
+        self.logger.debug(f"decode error -> AF code=0x{int(code):02X} seq={seq}")
+        self._send_af(seq, code)
+
+    def _on_device_info(self, chunk: bytes) -> None:
+        try:
+            get_device_info_logger().info(chunk.decode("ascii", errors="replace"))
+        except Exception as e:
+            self.logger.debug(f"device-info log failed: {e}")
+
+    def _on_bytes(self, data: bytes) -> None:
+        if self._hex_capture:
+            self.logger.debug(f"RX HEX: {hex_dump(data, limit=self._hex_max_bytes)}")
+        for fr in self._decoder.feed(data):
+            self._handle_frame(fr)
+
+    def _mark_online(self) -> None:
+        self._offline_failures = 0
+        if self.state != SessionState.CONNECTED:
+            self._set_state(SessionState.CONNECTED)
+
+    def _handle_frame(self, fr: ProtocolFrame) -> None:
+        self.last_remote_seq = fr.seq
+
+        if fr.type == FrameType.BF:
+            code = fr.val[0] if fr.val else 0
+            ent = self._outstanding.get(fr.seq)
+            if ent is None or ent[0] != FrameType.A0:
+                self._last_traffic_at = self._get_loop().time()
+            if ent is not None and not ent[1].done():
+                self._ack_store.note_resolved(fr.seq, acked=True, code=code)
+                ent[1].set_result(code == int(AckCode.OK))
+            else:
+                kind = self._ack_store.classify_unmatched(fr.seq, code)
+                self.logger.debug(f"unmatched BF seq={fr.seq} code={code} ({kind})")
+            self._mark_online()
+            return
+
+        self._last_traffic_at = self._get_loop().time()
+
+        if fr.type == FrameType.B0:
+            self._send_af(fr.seq, AckCode.OK)
+            self._mark_online()
+            return
+
+        if fr.type == FrameType.B1:
+            if self._last_b1_seq is not None and fr.seq == self._last_b1_seq:
+                if self._duplicate_ack_mode == "echo_last":
+                    self._send_af(fr.seq, self._last_b1_ack_code)
+                else:
+                    self._send_af(fr.seq, AckCode.DUPLICATE)
+                self.logger.debug(f"dup B1 seq={fr.seq}")
+                return
+
+            if self._last_b1_seq is not None:
+                expected = (self._last_b1_seq + 1) & 0xFFFF
+                if fr.seq != expected:
+                    code = AckCode.SEQ_TOO_SMALL if fr.seq < expected else AckCode.SEQ_TOO_LARGE
+                    self._send_af(fr.seq, code)
+                    self._last_b1_ack_code = int(code)
+                    self.logger.debug(f"ooB1 seq={fr.seq} expected={expected} code=0x{int(code):02X}")
+                    return
+
+            self._last_b1_seq = fr.seq
+            self.expected_remote_seq = (fr.seq + 1) & 0xFFFF
+            self._send_af(fr.seq, AckCode.OK)
+            self._last_b1_ack_code = int(AckCode.OK)
+            self._spawn(self._serve_b1(fr.seq))
+            return
+
+        # 其他 TYPE 最小实现暂不处理
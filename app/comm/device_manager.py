@@ -1,22 +1,302 @@
 from __future__ import annotations
-from typing import Dict, Callable, Optional, Tuple, List
+import bisect
+import threading
+import time
+import queue
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, Callable, Optional, Tuple, List, Set
 
-from app.comm.session import SerialSession
+from app.comm.metrics import LatencyHistogram
+from app.comm.protocol import build_a0
+from app.comm.session import RequestHandler, SerialSession
 from app.comm.serial_port import SerialPortBase
+from app.logs.logger import get_logger
+from app.storage.config import ConfigRepo
 
-RequestHandler = Callable[[], Tuple[List[int], Optional[List[int]]]]
+SubPayload = Tuple[List[int], Optional[List[int]], Optional[List[int]]]
+
+@dataclass(frozen=True)
+class CabinetRoute:
+    """
+    一个柜子（一块单片机）的 LED 归属：
+    - led_ranges：该柜拥有的全局 LED ID 闭区间（由 sp_groups 按 block_size×leds_per_slot 推导，或显式给出）；
+    - led_offset：下发前从全局 ID 中减去的基数（缺省为最小区间起点 - 1，即本柜首灯重排为 1）；
+    - ports / usb：打开本柜串口的候选设备名与 USB 匹配条件（同 serial.ports / serial.usb）。
+    """
+    name: str
+    led_ranges: Tuple[Tuple[int, int], ...]
+    led_offset: int = 0
+    ports: Tuple[str, ...] = ()
+    usb: Dict[str, object] = field(default_factory=dict, compare=False, hash=False)
+
+def cabinet_routes(cfg: Optional[dict] = None) -> List[CabinetRoute]:
+    """
+    读取 mapping.cabinets：每项 {"name", "ports", "usb", "sp_groups": [组 id], "led_ranges": [[起, 止]], "led_offset"}；
+    sp_groups 中组 g 的全局 LED 区间为 [(g-1)×block_size×leds_per_slot + 1, g×block_size×leds_per_slot]（同 MappingService）。
+    非法项跳过；未配置时返回空表（单串口模式）。
+    """
+    cfg = cfg if cfg is not None else ConfigRepo().load()
+    spm = (cfg.get("sp_mapping", {}) or {})
+    try:
+        span = int(spm.get("block_size", 100)) * int(spm.get("leds_per_slot", 3))
+    except Exception:
+        span = 300
+    out: List[CabinetRoute] = []
+    for i, cab in enumerate(((cfg.get("mapping", {}) or {}).get("cabinets") or [])):
+        try:
+            ranges: List[Tuple[int, int]] = []
+            for gid in cab.get("sp_groups") or []:
+                g = int(gid)
+                ranges.append(((g - 1) * span + 1, g * span))
+            for r in cab.get("led_ranges") or []:
+                s, e = int(r[0]), int(r[1])
+                if s <= e:
+                    ranges.append((s, e))
+            if not ranges:
+                continue
+            ranges.sort()
+            offset = cab.get("led_offset")
+            out.append(CabinetRoute(
+                name=str(cab.get("name") or f"cabinet{i + 1}"),
+                led_ranges=tuple(ranges),
+                led_offset=int(offset) if offset is not None else ranges[0][0] - 1,
+                ports=tuple(str(p) for p in (cab.get("ports") or [])),
+                usb=dict(cab.get("usb") or {}),
+            ))
+        except Exception:
+            continue
+    return out
+
+class _Dispatch:
+    """一次多柜派发：等待中的柜子集合与汇总结果"""
+    __slots__ = ("waiting", "ok", "failed", "t0")
+
+    def __init__(self, waiting: Set[str]) -> None:
+        self.waiting = waiting
+        self.ok = True
+        self.failed: List[str] = []
+        self.t0 = time.monotonic()
 
 class DeviceManager:
-    def __init__(self) -> None:
+    """
+    多柜设备管理（每柜一块单片机、一个串口会话）：
+    - attach(name, port)：为柜子建立会话；构造时给出 request_handler 则由本管理器统一响应各柜 B1；
+    - 任一柜发来 B1：会话只回 AF 并经 on_b1 把请求排入管理线程（会话的 RX/TX 线程从不等待）；
+      管理线程逐个处理：取一次三色组载荷，按 CabinetRoute 拆分为各柜子载荷（LED ID 减去 led_offset 重排），
+      经 push_a1 同时下发到所有相关柜（含触发柜；各会话 TX 线程各自写出、各自等 BF），
+      上一次点亮而本次不涉及的柜子下发空 A1 熄灯；
+    - 各柜 BF 结果汇总为一次成功/失败，按派发顺序回调 on_result（用于 Dispatcher.archive_pending），
+      派发耗时取决于最慢的柜子而非各柜之和；
+    - 不属于任何柜子的 LED 计入 unrouted_leds 并记日志，已配置但未连接的柜子使本次派发失败。
+    上一次派发汇总完成后才开始下一次（保持与 Dispatcher 最近派发组一一对应）；
+    等待超过 dispatcher.cabinet_wait_ms（如会话已关闭、结果不会再来）时上一次按失败结束。
+    """
+    def __init__(self, routes: Optional[List[CabinetRoute]] = None, request_handler: Optional[RequestHandler] = None) -> None:
         self.sessions: Dict[str, SerialSession] = {}
+        self.routes: List[CabinetRoute] = list(routes or [])
+        self._request_handler = request_handler
+        self.on_result: Optional[Callable[[bool], None]] = None
+        self.logger = get_logger("device-manager")
+        # 区间起点有序表：bisect 定位 LED 所属柜子
+        spans = sorted(((s, e, r) for r in self.routes for (s, e) in r.led_ranges), key=lambda t: t[0])
+        self._span_starts = [s for (s, _e, _r) in spans]
+        self._spans = spans
+        try:
+            wait_ms = float((ConfigRepo().load().get("dispatcher", {}) or {}).get("cabinet_wait_ms", 5000))
+        except Exception:
+            wait_ms = 5000.0
+        self._wait_sec = max(0.0, wait_ms / 1000.0)
+        # _pending/_lit/_late 由管理线程与各会话的结果回调共同访问，均在 _lock 内读写
+        self._lock = threading.Lock()
+        self._pending: Deque[_Dispatch] = deque()
+        self._idle = threading.Event()
+        self._idle.set()
+        self._lit: Set[str] = set()
+        # 超时结束的派发中未回结果的柜子：其迟到的结果不计入后续派发
+        self._late: Dict[str, int] = {}
+        # 待处理的 B1（触发柜名）；None 为停止标记
+        self._requests: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._th: Optional[threading.Thread] = None
+        self.dispatch_latency = LatencyHistogram()
+        self.dispatches = 0
+        self.dispatch_failures = 0
+        self.unrouted_leds = 0
 
     def attach(self, name: str, port: SerialPortBase, request_handler: Optional[RequestHandler] = None) -> SerialSession:
-        sess = SerialSession(port, request_handler, name=f"session:{name}")
-        self.sessions[name] = sess
+        if request_handler is None and self._request_handler is not None:
+            sess = SerialSession(port, None, name=f"session:{name}")
+            sess.on_b1 = lambda n=name: self._requests.put(n)
+            sess.on_a1_result = lambda ok, n=name: self._on_device_result(n, ok)
+            self._start()
+        else:
+            sess = SerialSession(port, request_handler, name=f"session:{name}")
+        # 各柜的串口由各自的打开线程接入，登记与派发线程读取 sessions 同在锁内
+        with self._lock:
+            self.sessions[name] = sess
         return sess
 
+    def _start(self) -> None:
+        if self._th is None or not self._th.is_alive():
+            self._th = threading.Thread(target=self._run, name="device-manager", daemon=True)
+            self._th.start()
+
     def broadcast_heartbeat(self) -> Dict[str, bool]:
+        """向所有柜子同时发出 A0 并等待各自 BF（总耗时为最慢的一柜）"""
+        futs = {name: sess.send_with_ack(build_a0()) for name, sess in list(self.sessions.items())}
         results: Dict[str, bool] = {}
-        for name, sess in self.sessions.items():
-            results[name] = sess.send_heartbeat()
-        return results
\ No newline at end of file
+        for name, fut in futs.items():
+            try:
+                results[name] = bool(fut.result())
+            except Exception:
+                results[name] = False
+        return results
+
+    def route_of(self, led: int) -> Optional[CabinetRoute]:
+        i = bisect.bisect_right(self._span_starts, led) - 1
+        if i >= 0:
+            s, e, r = self._spans[i]
+            if s <= led <= e:
+                return r
+        return None
+
+    def split_payload(self, indices: List[int], attrs: Optional[List[int]] = None, colors: Optional[List[int]] = None) -> Dict[str, SubPayload]:
+        """按柜拆分载荷：保持原有顺序，LED ID 重排为柜内编号，attrs/colors 随项对齐（原为 None 的保持 None）"""
+        parts: Dict[str, SubPayload] = {}
+        unrouted = 0
+        for i, led in enumerate(indices):
+            r = self.route_of(int(led))
+            if r is None:
+                unrouted += 1
+                continue
+            p = parts.get(r.name)
+            if p is None:
+                p = parts[r.name] = ([], [] if attrs is not None else None, [] if colors is not None else None)
+            p[0].append(int(led) - r.led_offset)
+            if attrs is not None:
+                p[1].append(attrs[i])  # type: ignore[union-attr]
+            if colors is not None:
+                p[2].append(colors[i])  # type: ignore[union-attr]
+        if unrouted:
+            self.unrouted_leds += unrouted
+            self.logger.warning(f"{unrouted} LED(s) not owned by any cabinet; check mapping.cabinets")
+        return parts
+
+    def _run(self) -> None:
+        while True:
+            trigger = self._requests.get()
+            if trigger is None:
+                break
+            # 上一次派发未汇总完成：仅管理线程等待，各会话照常收发
+            if not self._idle.wait(self._wait_sec):
+                self._expire_pending()
+            try:
+                self._dispatch(trigger)
+            except Exception as e:
+                self.logger.error(f"dispatch for B1 from {trigger} failed: {e}")
+
+    def _dispatch(self, trigger: str) -> None:
+        """处理一次 B1：拆分载荷并同时下发到相关各柜（含触发柜）"""
+        result = self._request_handler() if self._request_handler is not None else ([], None)
+        if isinstance(result, tuple) and len(result) == 3:
+            indices, attrs, colors = result
+        else:
+            indices, attrs = result  # type: ignore
+            colors = None
+        parts = self.split_payload(list(indices or []), attrs, colors)
+        with self._lock:
+            targets = (set(parts) | self._lit | {trigger}) & set(self.sessions)
+            missing = set(parts) - set(self.sessions)
+            self._lit = set(parts)
+            d = _Dispatch(set(targets))
+            if missing:
+                d.ok = False
+                d.failed.extend(sorted(missing))
+            self._pending.append(d)
+            self._idle.clear()
+        if missing:
+            self.logger.error(f"cabinets not connected: {sorted(missing)}")
+        self.dispatches += 1
+        for name in targets:
+            ids, a, c = parts.get(name, ([], None, None))
+            self.sessions[name].push_a1(ids, attrs=a, colors=c)
+        if not targets:
+            self._finish_ready()
+
+    def _on_device_result(self, name: str, ok: bool) -> None:
+        with self._lock:
+            if self._late.get(name, 0) > 0:
+                self._late[name] -= 1
+                return
+            for d in self._pending:
+                if name in d.waiting:
+                    d.waiting.discard(name)
+                    if not ok:
+                        d.ok = False
+                        d.failed.append(name)
+                    break
+        self._finish_ready()
+
+    def _finish_ready(self) -> None:
+        """按派发顺序回调：较早的派发未完成时，后完成的等待其结束"""
+        done: List[_Dispatch] = []
+        with self._lock:
+            while self._pending and not self._pending[0].waiting:
+                done.append(self._pending.popleft())
+            if not self._pending:
+                self._idle.set()
+        for d in done:
+            self._finish(d)
+
+    def _expire_pending(self) -> None:
+        """上一次派发等待超时（某柜未回结果）：按失败结束"""
+        with self._lock:
+            stale = list(self._pending)
+            self._pending.clear()
+            self._idle.set()
+            for d in stale:
+                for name in d.waiting:
+                    self._late[name] = self._late.get(name, 0) + 1
+                d.ok = False
+                d.failed.extend(sorted(d.waiting))
+                d.waiting.clear()
+        for d in stale:
+            self._finish(d)
+
+    def _finish(self, d: _Dispatch) -> None:
+        self.dispatch_latency.record(time.monotonic() - d.t0)
+        if not d.ok:
+            self.dispatch_failures += 1
+            self.logger.warning(f"dispatch failed on cabinets {d.failed}")
+        if self.on_result:
+            try:
+                self.on_result(d.ok)
+            except Exception as e:
+                self.logger.debug(f"on_result callback error: {e}")
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            pending = len(self._pending)
+        return {
+            "dispatches": self.dispatches,
+            "dispatch_failures": self.dispatch_failures,
+            "unrouted_leds": self.unrouted_leds,
+            "pending": pending,
+            "queued_requests": self._requests.qsize(),
+            "dispatch": self.dispatch_latency.snapshot(),
+            "sessions": {name: sess.stats() for name, sess in list(self.sessions.items())},
+        }
+
+    def close(self) -> None:
+        """停止管理线程并关闭各柜会话（底层串口由各自的 PortSupervisor 关闭）"""
+        th = self._th
+        if th is not None and th.is_alive():
+            self._requests.put(None)
+            if th is not threading.current_thread():
+                th.join(timeout=1.0)
+        self._th = None
+        for sess in list(self.sessions.values()):
+            try:
+                sess.close()
+            except Exception:
+                pass
@@ -0,0 +1,35 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Any, Dict
+
+@dataclass(frozen=True)
+class UartLinkModel:
+    """
+    UART 线路时间模型：每字节 = 1 起始位 + 数据位 + 校验位(N 时为 0) + 停止位。
+    例：115200 8N1 → 10 bit/字节 → 约 86.8 µs/字节，1 KB 约 89 ms。
+    """
+    baud: int = 115200
+    data_bits: int = 8
+    parity: str = "N"
+    stop_bits: float = 1.0
+
+    @classmethod
+    def from_config(cls, serial_cfg: Dict[str, Any]) -> "UartLinkModel":
+        """由配置 serial.{baud,data_bits,parity,stop_bits} 构造；非法值回退为 115200 8N1"""
+        try:
+            return cls(
+                baud=max(1, int(serial_cfg.get("baud", 115200))),
+                data_bits=int(serial_cfg.get("data_bits", 8)),
+                parity=str(serial_cfg.get("parity", "N")).upper()[:1] or "N",
+                stop_bits=float(serial_cfg.get("stop_bits", 1)),
+            )
+        except Exception:
+            return cls()
+
+    @property
+    def bits_per_byte(self) -> float:
+        return 1 + self.data_bits + (0 if self.parity == "N" else 1) + self.stop_bits
+
+    def wire_time_sec(self, nbytes: int) -> float:
+        """nbytes 字节在线路上的传输时长（秒，不含对端处理）"""
+        return max(0, int(nbytes)) * self.bits_per_byte / float(self.baud)
@@ -0,0 +1,194 @@
+from __future__ import annotations
+import time
+from bisect import bisect_left
+from typing import Dict, List, Optional, Sequence
+
+def _default_bounds_us() -> List[int]:
+    """桶上界（微秒）：1-2-5 序列，50 µs ~ 20 s"""
+    out: List[int] = []
+    base = 10
+    while base <= 10_000_000:
+        for m in (1, 2, 5):
+            v = base * m
+            if 50 <= v <= 20_000_000:
+                out.append(v)
+        base *= 10
+    return out
+
+DEFAULT_BOUNDS_US: Sequence[int] = tuple(_default_bounds_us())
+
+class LatencyHistogram:
+    """
+    固定分桶时延直方图：记录为一次二分查找 + 计数累加，无锁、无分配；
+    分位数取所在桶的上界（精度为桶宽，1-2-5 序列下误差不超过 2.5 倍相邻比）。
+    RX/TX 线程并发记录时计数可能有极少量丢失，作为观测统计可接受。
+    """
+    __slots__ = ("bounds", "counts", "count", "total_us", "max_us")
+
+    def __init__(self, bounds_us: Sequence[int] = DEFAULT_BOUNDS_US) -> None:
+        self.bounds = list(bounds_us)
+        self.counts = [0] * (len(self.bounds) + 1)  # 末桶为溢出
+        self.count = 0
+        self.total_us = 0
+        self.max_us = 0
+
+    def record(self, seconds: float) -> None:
+        us = int(seconds * 1_000_000)
+        if us < 0:
+            us = 0
+        self.counts[bisect_left(self.bounds, us)] += 1
+        self.count += 1
+        self.total_us += us
+        if us > self.max_us:
+            self.max_us = us
+
+    def percentile_us(self, q: float) -> int:
+        if self.count <= 0:
+            return 0
+        rank = max(1, int(q * self.count + 0.999999))
+        acc = 0
+        for i, c in enumerate(self.counts):
+            acc += c
+            if acc >= rank:
+                return min(self.bounds[i], self.max_us) if i < len(self.bounds) else self.max_us
+        return self.max_us
+
+    def snapshot(self) -> Dict[str, float]:
+        n = self.count
+        return {
+            "count": n,
+            "mean_ms": (self.total_us / n / 1000.0) if n else 0.0,
+            "p50_ms": self.percentile_us(0.50) / 1000.0,
+            "p95_ms": self.percentile_us(0.95) / 1000.0,
+            "p99_ms": self.percentile_us(0.99) / 1000.0,
+            "max_ms": self.max_us / 1000.0,
+        }
+
+    def reset(self) -> None:
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total_us = 0
+        self.max_us = 0
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        """累加另一直方图（桶边界须一致，用于多会话汇总）"""
+        if other.bounds != self.bounds:
+            raise ValueError("histogram bounds differ")
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.total_us += other.total_us
+        if other.max_us > self.max_us:
+            self.max_us = other.max_us
+
+# SerialSession 统计的交互区间
+LATENCY_NAMES = ("b1_to_af", "b1_to_a1", "a1_to_bf", "a0_to_bf", "rx_to_decode", "rx_to_handled")
+
+class SessionMetrics:
+    """会话级观测：各交互区间的时延直方图 + 计数器（重试/超时/状态迁移等）"""
+    def __init__(self, names: Sequence[str] = LATENCY_NAMES) -> None:
+        self.latency: Dict[str, LatencyHistogram] = {n: LatencyHistogram() for n in names}
+        self.counters: Dict[str, int] = {}
+        self.started_at = time.monotonic()
+
+    def record(self, name: str, seconds: float) -> None:
+        h = self.latency.get(name)
+        if h is None:
+            h = self.latency[name] = LatencyHistogram()
+        h.record(seconds)
+
+    def inc(self, name: str, n: int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def snapshot(self) -> Dict[str, object]:
+        return {
+            "uptime_sec": time.monotonic() - self.started_at,
+            "latency": {k: h.snapshot() for k, h in self.latency.items()},
+            "counters": dict(self.counters),
+        }
+
+    def reset(self, names: Optional[Sequence[str]] = None) -> None:
+        for k, h in self.latency.items():
+            if names is None or k in names:
+                h.reset()
+        if names is None:
+            self.counters.clear()
+
+class RateWindow:
+    """按秒分桶的滑动窗口计数（环形缓冲，最长 horizon_sec 秒），add 为 O(1)"""
+    __slots__ = ("horizon", "_buckets", "_stamps")
+
+    def __init__(self, horizon_sec: int = 60) -> None:
+        self.horizon = max(1, int(horizon_sec))
+        self._buckets = [0] * self.horizon
+        self._stamps = [-1] * self.horizon
+
+    def add(self, n: int, now: float) -> None:
+        sec = int(now)
+        i = sec % self.horizon
+        if self._stamps[i] != sec:
+            self._stamps[i] = sec
+            self._buckets[i] = 0
+        self._buckets[i] += n
+
+    def total(self, window_sec: int, now: float) -> int:
+        """最近 window_sec 秒（含当前未满的一秒）内的累计值"""
+        sec = int(now)
+        lo = sec - min(int(window_sec), self.horizon)
+        return sum(b for b, s in zip(self._buckets, self._stamps) if lo < s <= sec)
+
+# 链路利用率的滑动窗口（秒）
+UTILIZATION_WINDOWS = (1, 10, 60)
+
+class LinkAccounting:
+    """
+    串口字节记账与链路时间利用率：
+    - TX/RX 按帧类型累计字节，另计重发字节（TX 的子集）；
+    - 利用率 = 窗口内线路占用时间（字节数 × 每字节位数 / 波特率）/ 窗口时长，TX 与 RX 分别计算（UART 全双工）。
+    """
+    def __init__(self, seconds_per_byte: float, windows: Sequence[int] = UTILIZATION_WINDOWS, clock=time.monotonic) -> None:
+        self.seconds_per_byte = float(seconds_per_byte)
+        self.windows = tuple(int(w) for w in windows)
+        self._clock = clock
+        self.tx_by_type: Dict[str, int] = {}
+        self.rx_by_type: Dict[str, int] = {}
+        self.tx_bytes = 0
+        self.rx_bytes = 0
+        self.retransmit_bytes = 0
+        horizon = max(self.windows) if self.windows else 60
+        self._tx_win = RateWindow(horizon)
+        self._rx_win = RateWindow(horizon)
+
+    def tx(self, tname: str, n: int) -> None:
+        self.tx_by_type[tname] = self.tx_by_type.get(tname, 0) + n
+        self.tx_bytes += n
+        self._tx_win.add(n, self._clock())
+
+    def retransmit(self, n: int) -> None:
+        self.retransmit_bytes += n
+
+    def rx_raw(self, n: int) -> None:
+        """串口读到的原始字节（含设备日志与坏帧），用于 RX 利用率"""
+        self.rx_bytes += n
+        self._rx_win.add(n, self._clock())
+
+    def rx_frame(self, tname: str, n: int) -> None:
+        self.rx_by_type[tname] = self.rx_by_type.get(tname, 0) + n
+
+    def utilization(self) -> Dict[str, Dict[str, float]]:
+        now = self._clock()
+        spb = self.seconds_per_byte
+        out: Dict[str, Dict[str, float]] = {"tx": {}, "rx": {}}
+        for w in self.windows:
+            out["tx"][f"{w}s"] = self._tx_win.total(w, now) * spb / w
+            out["rx"][f"{w}s"] = self._rx_win.total(w, now) * spb / w
+        return out
+
+    def snapshot(self) -> Dict[str, object]:
+        return {
+            "tx_bytes": self.tx_bytes,
+            "rx_bytes": self.rx_bytes,
+            "tx_by_type": dict(self.tx_by_type),
+            "rx_by_type": dict(self.rx_by_type),
+            "retransmit_bytes": self.retransmit_bytes,
+            "utilization": self.utilization(),
+        }
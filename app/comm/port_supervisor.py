@@ -0,0 +1,204 @@
+from __future__ import annotations
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+try:
+    from serial.tools import list_ports  # pyserial
+except Exception:  # USB 匹配为可选能力
+    list_ports = None  # type: ignore
+
+from app.comm.metrics import LatencyHistogram
+from app.comm.serial_port import SerialPortBase
+from app.logs.logger import get_logger
+from app.storage.config import ConfigRepo
+
+def find_usb_ports(serial_number: str = "", vid: Optional[int] = None, pid: Optional[int] = None) -> List[str]:
+    """按 USB 序列号 / VID / PID 匹配当前枚举到的串口设备路径（条件为空则不参与匹配；全空返回空表）"""
+    if list_ports is None or not (serial_number or vid is not None or pid is not None):
+        return []
+    out: List[str] = []
+    try:
+        for info in list_ports.comports():
+            if serial_number and (info.serial_number or "") != serial_number:
+                continue
+            if vid is not None and info.vid != vid:
+                continue
+            if pid is not None and info.pid != pid:
+                continue
+            out.append(info.device)
+    except Exception:
+        return []
+    return out
+
+def _usb_id(v) -> Optional[int]:
+    if v is None or v == "":
+        return None
+    return int(v, 16) if isinstance(v, str) else int(v)
+
+def candidate_ports(usb: Optional[Dict[str, object]], ports: Optional[List[str]]) -> List[str]:
+    """候选设备名：USB 条件匹配到的设备优先，其次为显式列出的设备名（去重）"""
+    usb = usb or {}
+    out = find_usb_ports(str(usb.get("serial_number", "") or ""), _usb_id(usb.get("vid")), _usb_id(usb.get("pid")))
+    for name in ports or []:
+        if str(name) not in out:
+            out.append(str(name))
+    return out
+
+class PortSupervisor:
+    """
+    串口热插拔监管：
+    - open_port()：按候选设备（serial.usb 匹配到的设备优先，其次 serial.ports）依次尝试打开，失败按指数退避重试；
+    - 端口报告丢失（set_lost_callback）或健康检查发现 port.lost 时：通知会话 OFFLINE，关闭旧端口，
+      以新端口实例重开（USB 重新枚举为其他设备名时按序列号找回），再 session.rebind_port() 换绑；
+      会话、待应答表与派发队列不重建，进程无需重启；
+    - 恢复时长（丢失 → 重开成功）记入 recovery 直方图及会话指标 port_recovery。
+    配置：serial.supervisor.backoff_initial_ms / backoff_max_ms / health_check_ms，serial.usb.serial_number / vid / pid。
+    """
+    def __init__(
+        self,
+        port_factory: Callable[[], SerialPortBase],
+        candidates: Optional[Callable[[], List[str]]] = None,
+        baud: Optional[int] = None,
+    ) -> None:
+        self._factory = port_factory
+        self._candidates = candidates or self._configured_candidates
+        self._logger = get_logger("port-supervisor")
+        sc = (ConfigRepo().load().get("serial", {}) or {})
+        sup = sc.get("supervisor", {}) or {}
+        try:
+            self.backoff_initial_sec = max(0.01, float(sup.get("backoff_initial_ms", 200)) / 1000.0)
+            self.backoff_max_sec = max(self.backoff_initial_sec, float(sup.get("backoff_max_ms", 5000)) / 1000.0)
+            self.health_check_sec = max(0.05, float(sup.get("health_check_ms", 500)) / 1000.0)
+        except Exception:
+            self.backoff_initial_sec, self.backoff_max_sec, self.health_check_sec = 0.2, 5.0, 0.5
+        self.baud = int(baud if baud is not None else sc.get("baud", 115200))
+        self.port: Optional[SerialPortBase] = None
+        self.port_name: Optional[str] = None
+        self.session = None
+        self._lost = threading.Event()
+        self._lost_reason = ""
+        self._stop = threading.Event()
+        self._th: Optional[threading.Thread] = None
+        self.recovery = LatencyHistogram()
+        self.lost_count = 0
+        self.recovered_count = 0
+        self.open_failures = 0
+        self.last_recovery_sec: Optional[float] = None
+
+    def _configured_candidates(self) -> List[str]:
+        sc = (ConfigRepo().load().get("serial", {}) or {})
+        try:
+            return candidate_ports(sc.get("usb", {}), sc.get("ports"))
+        except Exception as e:
+            self._logger.error(f"USB port match failed: {e}")
+            return [str(name) for name in sc.get("ports") or []]
+
+    def open_port(self) -> Optional[SerialPortBase]:
+        """依次尝试候选设备直至成功（失败按 backoff_initial → backoff_max 指数退避）；stop() 后返回 None"""
+        backoff = self.backoff_initial_sec
+        while not self._stop.is_set():
+            names = self._candidates()
+            if not names:
+                self._logger.warning("No serial port candidates; configure serial.ports or serial.usb.")
+            for name in names:
+                p = self._factory()
+                try:
+                    p.set_lost_callback(self._on_port_lost)
+                    p.open(name, baud=self.baud)
+                    self.port, self.port_name = p, name
+                    self._logger.info(f"Serial opened on {name} baud={self.baud}")
+                    return p
+                except Exception as e:
+                    self.open_failures += 1
+                    self._logger.error(f"Open serial {name} failed: {e}")
+                    try:
+                        p.close()
+                    except Exception:
+                        pass
+            self._stop.wait(backoff)
+            backoff = min(backoff * 2.0, self.backoff_max_sec)
+        return None
+
+    def attach(self, session) -> None:
+        """绑定会话并启动监管线程"""
+        self.session = session
+        if self._th is None or not self._th.is_alive():
+            self._stop.clear()
+            self._th = threading.Thread(target=self._run, name="port-supervisor", daemon=True)
+            self._th.start()
+
+    def _on_port_lost(self, reason: str) -> None:
+        # 端口 I/O 线程内调用：仅置事件，恢复在监管线程完成
+        self._lost_reason = reason
+        self._lost.set()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._lost.wait(self.health_check_sec)
+            if self._stop.is_set():
+                break
+            port = self.port
+            if not self._lost.is_set() and (port is None or not getattr(port, "lost", False)):
+                continue
+            self._lost.clear()
+            self._recover(port, self._lost_reason or "port reported lost")
+
+    def _recover(self, old: Optional[SerialPortBase], reason: str) -> None:
+        t0 = time.monotonic()
+        self.lost_count += 1
+        self._logger.warning(f"Serial port {self.port_name} lost ({reason}); reopening")
+        sess = self.session
+        if sess is not None:
+            try:
+                sess.on_port_lost(reason)
+            except Exception as e:
+                self._logger.error(f"session.on_port_lost failed: {e}")
+        if old is not None:
+            try:
+                old.set_lost_callback(None)
+                old.close()
+            except Exception:
+                pass
+        new = self.open_port()
+        if new is None:
+            return
+        if sess is not None:
+            try:
+                sess.rebind_port(new)
+            except Exception as e:
+                self._logger.error(f"session.rebind_port failed: {e}")
+        dt = time.monotonic() - t0
+        self.recovered_count += 1
+        self.last_recovery_sec = dt
+        self.recovery.record(dt)
+        if sess is not None:
+            try:
+                sess.metrics.record("port_recovery", dt)
+            except Exception:
+                pass
+        self._logger.info(f"Serial recovered on {self.port_name} in {dt * 1000.0:.0f} ms")
+
+    def stop(self, close_port: bool = True) -> None:
+        self._stop.set()
+        self._lost.set()
+        th = self._th
+        if th is not None and th.is_alive() and th is not threading.current_thread():
+            th.join(timeout=1.0)
+        self._th = None
+        if close_port and self.port is not None:
+            try:
+                self.port.set_lost_callback(None)
+                self.port.close()
+            except Exception:
+                pass
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "port": self.port_name,
+            "lost": self.lost_count,
+            "recovered": self.recovered_count,
+            "open_failures": self.open_failures,
+            "last_recovery_sec": self.last_recovery_sec,
+            "recovery": self.recovery.snapshot(),
+        }
@@ -6,9 +6,16 @@
 - 字节序：小端
 """
 from __future__ import annotations
-from dataclasses import dataclass
+import struct
+import time
+from dataclasses import dataclass, field
 from enum import IntEnum
-from typing import List, Optional, Callable
+from typing import Dict, List, Optional, Callable, Sequence, Tuple
+
+try:
+    import numpy as _np  # 可选：大批量 A1 打包的向量化路径
+except Exception:  # numpy 非依赖项，缺失时使用 struct 路径
+    _np = None  # type: ignore
 
 HEADER = b"\xF2\xF8\xF1\xF2"
 MIN_FRAME_LEN = 10  # 4(HDR)+1(TYPE)+2(LEN)+2(SEQ)+1(CHECK)
@@ -39,17 +46,21 @@ class AckCode(IntEnum):
     VAL_ERROR = 0x05
     CHECKSUM_ERROR = 0x06
 
-@dataclass
+@dataclass(slots=True)
 class ProtocolFrame:
     type: FrameType
     seq: int
     val: bytes
+    # 预编码的整帧字节（可选）：由构造器一次性生成，encode_frame() 直接复用；不参与相等比较
+    raw: Optional[bytes] = field(default=None, compare=False, repr=False)
 
 def _calc_check(ftype: int, length: int, seq: int, val: bytes) -> int:
     data = bytes([ftype]) + length.to_bytes(2, "little") + seq.to_bytes(2, "little") + (val or b"")
     return sum(data) & 0xFF
 
 def encode_frame(frame: ProtocolFrame) -> bytes:
+    if frame.raw is not None:
+        return frame.raw
     val = frame.val or b""
     length = 2 + len(val) + 1  # SEQ(2) + VAL(N) + CHECK(1)
     chk = _calc_check(int(frame.type), length, frame.seq, val)
@@ -62,10 +73,70 @@ def encode_frame(frame: ProtocolFrame) -> bytes:
         + bytes([chk])
     )
 
+def _accepts_val(ft: FrameType, val_len: int) -> bool:
+    """VAL 语义长度校验：A0/B0/B1 无 VAL；AF/BF 为 1 字节结果码；A1 为 2B/项位域。"""
+    if ft in (FrameType.A0, FrameType.B0, FrameType.B1):
+        return val_len == 0
+    if ft in (FrameType.AF, FrameType.BF):
+        return val_len == 1
+    if ft == FrameType.A1:
+        return (val_len % 2) == 0
+    return True
+
+A1_MAX_ITEMS = 0x1FFF  # 13 位 ID 空间：单帧 A1 的最大合法项数
+MAX_LEN_UNKNOWN = 256  # 未知 TYPE 的 LEN 上限（仍允许解析出 UNKNOWN_TYPE 以回 AF）
+
+def default_max_len(a1_max_items: int = A1_MAX_ITEMS, unknown: int = MAX_LEN_UNKNOWN) -> Dict[int, int]:
+    """
+    各 TYPE 合法 LEN 的上限（LEN = SEQ2 + VAL + CHECK1）：
+    A0/B0/B1 无 VAL → 3；AF/BF 1 字节结果码 → 4；A1 2B/项 → 3 + 2*a1_max_items；其余 TYPE → unknown。
+    """
+    limits = {int(t): 3 for t in (FrameType.A0, FrameType.B0, FrameType.B1)}
+    limits.update({int(t): 4 for t in (FrameType.AF, FrameType.BF)})
+    limits[int(FrameType.A1)] = 3 + 2 * max(0, int(a1_max_items))
+    limits[-1] = int(unknown)
+    return limits
+
+def decoder_limits(dec_cfg: Dict) -> Dict[int, int]:
+    """配置 comm.decoder → 各 TYPE 的 LEN 上限：a1_max_items/max_len_unknown 派生默认值，max_len 按 TYPE 名覆盖"""
+    limits = default_max_len(
+        a1_max_items=int(dec_cfg.get("a1_max_items", A1_MAX_ITEMS)),
+        unknown=int(dec_cfg.get("max_len_unknown", MAX_LEN_UNKNOWN)),
+    )
+    for name, v in (dec_cfg.get("max_len") or {}).items():
+        try:
+            limits[int(FrameType[str(name).upper()])] = int(v)
+        except Exception:
+            continue
+    return limits
+
+def next_seq_after(seq: int) -> int:
+    """上位机 SEQ 递增：跳过空包专用的 0xFFFF（0xFFFE 之后回到 0，对端按“首包”接收），避免与 A0 心跳共用待应答项"""
+    nxt = (seq + 1) & 0xFFFF
+    return 0 if nxt == 0xFFFF else nxt
+
+def _limits_table(overrides: Optional[Dict[int, int]] = None) -> List[int]:
+    """按 TYPE 字节索引的 LEN 上限表（256 项）；键 -1 表示未知 TYPE 的上限。"""
+    limits = default_max_len()
+    if overrides:
+        limits.update({int(k): int(v) for k, v in overrides.items()})
+    unknown = limits.get(-1, MAX_LEN_UNKNOWN)
+    return [limits.get(t, unknown) for t in range(256)]
+
+_DEFAULT_LIMITS: List[int] = _limits_table()
+
+def _header_tail(buf: bytearray, end: int) -> int:
+    """返回 buf[:end] 末尾可能构成 HEADER 前缀的字节数（0..3），用于跨分片的 HEADER 拼接。"""
+    for k in range(min(len(HEADER) - 1, end), 0, -1):
+        if buf[end - k:end] == HEADER[:k]:
+            return k
+    return 0
+
 def decode_stream(
     buf: bytearray,
     on_error: Optional[Callable[[AckCode, int], None]] = None,
     on_garbage: Optional[Callable[[bytes], None]] = None,
+    max_len: Optional[Dict[int, int]] = None,
 ) -> List[ProtocolFrame]:
     """就地解析：从流缓冲区提取尽可能多的完整帧，余量保留在 buf 中。
     错误处理（当提供 on_error 时）参见文档。
@@ -73,111 +144,234 @@ def decode_stream(
     A1 的 VAL 语义仅允许 2B/项位域：
       - 位域：bit15=闪烁；bit14..13=颜色：00红/01绿/10蓝/11预留；bit12..0=ID(13位)
     其他长度触发 VAL_ERROR。
+    max_len：各 TYPE 的 LEN 上限（默认 default_max_len()），超限即判为非法帧并立即重同步。
+    长连接场景请使用 StreamDecoder（游标 + 惰性压缩），避免每次调用重新传入回调。
     """
+    dec = StreamDecoder(on_error=on_error, on_garbage=on_garbage, max_len=max_len)
     frames: List[ProtocolFrame] = []
-    while True:
-        idx = buf.find(HEADER)
-        if idx == -1:
-            # 缓冲中无 HEADER，认为全部为“杂散字节”
-            if on_garbage and len(buf) > 0:
-                try:
-                    on_garbage(bytes(buf))
-                except Exception:
-                    pass
-            buf.clear()
-            break
-        if idx > 0:
-            # 丢弃 HEADER 之前的杂散字节
-            if on_garbage:
-                try:
-                    on_garbage(bytes(buf[:idx]))
-                except Exception:
-                    pass
-            del buf[:idx]
-        if len(buf) < 7:  # 4(HDR)+1(TYPE)+2(LEN)
-            break
-        ftype = buf[4]
-        length = int.from_bytes(buf[5:7], "little")
-        # 语义长度校验：最小为 3（SEQ2 + CHECK1）
-        if length < 3:
-            seq = int.from_bytes(buf[7:9], "little") if len(buf) >= 9 else 0
-            if on_error is not None:
-                try:
-                    on_error(AckCode.LEN_ERROR, seq)
-                except Exception:
-                    pass
-            total_bad = 4 + 1 + 2 + length
-            if len(buf) >= total_bad:
-                del buf[:total_bad]
-            else:
-                # 若长度不足以跳过，丢弃 header 以避免死循环
-                del buf[:4]
-            continue
+    pos = dec._scan(buf, 0, frames)
+    if pos:
+        del buf[:pos]
+    return frames
+
+class StreamDecoder:
+    """
+    有状态流式解码器（单线程使用，通常为串口接收线程）：
+    - 内部维护可复用接收缓冲与读游标，逐帧仅移动游标，不做头部删除；
+    - 缓冲全部消费时直接清空；游标超过 compact_threshold 时才压缩一次；
+    - on_error/on_garbage 在构造时绑定一次，语义同 decode_stream()。
+    重同步：
+    - LEN 小于 3 或超过该 TYPE 上限（max_len）的帧不可能合法，立即回 LEN_ERROR 并从下一个可能的 HEADER 继续，
+      不再等待凑满 LEN 字节；其后字节按杂散字节上送（可能是下位机日志）；
+    - CHECK 失败时若坏帧区间内还有 HEADER，则从该处继续，避免吞掉藏在其中的合法帧。
+    stats() 提供帧/错误/重同步计数与“半帧停顿”时长（跨多次 feed 才凑齐或被判废的帧）。
+    """
+    def __init__(
+        self,
+        on_error: Optional[Callable[[AckCode, int], None]] = None,
+        on_garbage: Optional[Callable[[bytes], None]] = None,
+        compact_threshold: int = 4096,
+        max_len: Optional[Dict[int, int]] = None,
+    ) -> None:
+        self.on_error = on_error
+        self.on_garbage = on_garbage
+        self.compact_threshold = int(compact_threshold)
+        self._max_len: List[int] = _limits_table(max_len) if max_len else _DEFAULT_LIMITS
+        self._buf = bytearray()
+        self._pos = 0
+        self._base = 0  # 已压缩掉的字节数，用于以绝对偏移识别同一个半帧
+        self._stall_at: Optional[int] = None
+        self._stall_since = 0.0
+        self._stats: Dict[str, float] = {
+            "frames": 0,
+            "errors": 0,
+            "len_rejects": 0,
+            "checksum_resyncs": 0,
+            "garbage_bytes": 0,
+            "dropped_bytes": 0,
+            "stalls": 0,
+            "stall_total_ms": 0.0,
+            "stall_max_ms": 0.0,
+        }
 
-        total = 4 + 1 + 2 + length
-        if len(buf) < total:
-            break
-        seq = int.from_bytes(buf[7:9], "little")
-        val_len = max(0, length - 3)  # 减去 SEQ(2) 与 CHECK(1)
-        vstart = 9
-        vend = vstart + val_len
-        val = bytes(buf[vstart:vend])
-        chk = buf[vend]
-        calc = _calc_check(ftype, length, seq, val)
-        if chk == calc:
+    def _error(self, code: AckCode, seq: int) -> None:
+        self._stats["errors"] += 1
+        if self.on_error is not None:
             try:
-                ft = FrameType(ftype)
-                # VAL 语义长度校验
-                if ft in (FrameType.A0, FrameType.B0, FrameType.B1):
-                    if val_len != 0:
-                        if on_error is not None:
-                            try:
-                                on_error(AckCode.VAL_ERROR, seq)
-                            except Exception:
-                                pass
-                    else:
-                        frames.append(ProtocolFrame(ft, seq, val))
-                elif ft in (FrameType.AF, FrameType.BF):
-                    if val_len != 1:
-                        if on_error is not None:
-                            try:
-                                on_error(AckCode.VAL_ERROR, seq)
-                            except Exception:
-                                pass
-                    else:
-                        frames.append(ProtocolFrame(ft, seq, val))
-                elif ft == FrameType.A1:
-                    # 仅允许 2 字节/项位域
-                    if (val_len % 2) != 0:
-                        if on_error is not None:
-                            try:
-                                on_error(AckCode.VAL_ERROR, seq)
-                            except Exception:
-                                pass
+                self.on_error(code, seq)
+            except Exception:
+                pass
+
+    def _garbage(self, chunk: bytes) -> None:
+        self._stats["garbage_bytes"] += len(chunk)
+        if self.on_garbage is not None:
+            try:
+                self.on_garbage(chunk)
+            except Exception:
+                pass
+
+    def _scan(self, buf: bytearray, pos: int, frames: List[ProtocolFrame]) -> int:
+        """
+        从 buf[pos:] 起解析完整帧并追加到 frames，返回新的读游标。
+        - 仅移动游标，不修改 buf（由调用方决定何时压缩）；
+        - CHECK 直接在 memoryview 上求和，VAL 仅在帧校验通过后才复制为 bytes。
+        """
+        n = len(buf)
+        max_len = self._max_len
+        with memoryview(buf) as mv:
+            while pos < n:
+                idx = buf.find(HEADER, pos)
+                if idx == -1:
+                    # 缓冲中无 HEADER：除末尾可能的 HEADER 前缀外，其余视为“杂散字节”
+                    end = n - _header_tail(buf, n)
+                    if end > pos:
+                        self._garbage(bytes(mv[pos:end]))
+                    pos = end
+                    break
+                if idx > pos:
+                    # 丢弃 HEADER 之前的杂散字节
+                    self._garbage(bytes(mv[pos:idx]))
+                    pos = idx
+                if n - pos < 7:  # 4(HDR)+1(TYPE)+2(LEN)
+                    break
+                ftype = buf[pos + 4]
+                length = buf[pos + 5] | (buf[pos + 6] << 8)
+                # 语义长度校验：最小为 3（SEQ2 + CHECK1），最大为该 TYPE 的合法上限
+                if length < 3 or length > max_len[ftype]:
+                    seq = (buf[pos + 7] | (buf[pos + 8] << 8)) if n - pos >= 9 else 0
+                    self._stats["len_rejects"] += 1
+                    self._error(AckCode.LEN_ERROR, seq)
+                    # HEADER 末字节 F2 可能是下一个 HEADER 的首字节，故仅跳过 3 字节后重新查找
+                    pos += 3
+                    continue
+
+                total = 4 + 1 + 2 + length
+                if n - pos < total:
+                    break
+                seq = buf[pos + 7] | (buf[pos + 8] << 8)
+                val_len = length - 3  # 减去 SEQ(2) 与 CHECK(1)
+                vstart = pos + 9
+                vend = vstart + val_len
+                chk = buf[vend]
+                calc = sum(mv[pos + 4:vend]) & 0xFF
+                if chk != calc:
+                    # CHECK 校验失败：回调错误；坏帧区间内若有 HEADER，则从该处继续
+                    self._error(AckCode.CHECKSUM_ERROR, seq)
+                    nxt = buf.find(HEADER, pos + 1, min(n, pos + total + len(HEADER) - 1))
+                    if nxt == -1 and pos + total + len(HEADER) - 1 > n:
+                        # 坏帧区间延伸到缓冲末尾：末尾若是 HEADER 前缀，停在该处等待后续字节，避免随坏帧一起丢弃
+                        tail = _header_tail(buf, n)
+                        if tail and n - tail < pos + total:
+                            nxt = n - tail
+                    if nxt != -1:
+                        self._stats["checksum_resyncs"] += 1
+                        self._stats["dropped_bytes"] += nxt - pos
+                        pos = nxt
                     else:
-                        frames.append(ProtocolFrame(ft, seq, val))
-                else:
-                    frames.append(ProtocolFrame(ft, seq, val))
-            except ValueError:
-                # 未知 TYPE：可回调错误
-                if on_error is not None:
-                    try:
-                        on_error(AckCode.UNKNOWN_TYPE, seq)
-                    except Exception:
-                        pass
-        else:
-            # CHECK 校验失败：可回调错误
-            if on_error is not None:
+                        self._stats["dropped_bytes"] += total
+                        pos += total
+                    continue
                 try:
-                    on_error(AckCode.CHECKSUM_ERROR, seq)
-                except Exception:
-                    pass
-        # 无论校验是否通过，都跳过该段，继续向后解析
-        del buf[:total]
-    return frames
+                    ft = FrameType(ftype)
+                except ValueError:
+                    # 未知 TYPE：可回调错误
+                    self._error(AckCode.UNKNOWN_TYPE, seq)
+                    self._stats["dropped_bytes"] += total
+                else:
+                    if _accepts_val(ft, val_len):
+                        frames.append(ProtocolFrame(ft, seq, bytes(mv[vstart:vend]) if val_len else b""))
+                    else:
+                        self._error(AckCode.VAL_ERROR, seq)
+                        self._stats["dropped_bytes"] += total
+                pos += total
+        return pos
+
+    def _track_stall(self, buf: bytearray, pos: int) -> None:
+        """记录跨 feed 的半帧：同一 HEADER 位置从首次挂起到被解析/判废的时长。"""
+        at: Optional[int] = None
+        if len(buf) - pos >= len(HEADER) and buf.startswith(HEADER, pos):
+            at = self._base + pos
+        if at == self._stall_at:
+            return
+        now = time.monotonic()
+        if self._stall_at is not None:
+            ms = (now - self._stall_since) * 1000.0
+            st = self._stats
+            st["stalls"] += 1
+            st["stall_total_ms"] += ms
+            if ms > st["stall_max_ms"]:
+                st["stall_max_ms"] = ms
+        self._stall_at = at
+        self._stall_since = now
+
+    def feed(self, data: bytes | bytearray | memoryview) -> List[ProtocolFrame]:
+        """追加一段接收字节并返回其中完整的帧（可能为空列表）。"""
+        buf = self._buf
+        buf += data
+        frames: List[ProtocolFrame] = []
+        pos = self._scan(buf, self._pos, frames)
+        self._stats["frames"] += len(frames)
+        if self._stall_at is not None or len(buf) - pos >= len(HEADER):
+            self._track_stall(buf, pos)
+        if pos >= len(buf):
+            self._base += len(buf)
+            buf.clear()
+            pos = 0
+        elif pos >= self.compact_threshold:
+            self._base += pos
+            del buf[:pos]
+            pos = 0
+        self._pos = pos
+        return frames
+
+    def pending(self) -> int:
+        """尚未构成完整帧的缓冲字节数。"""
+        return len(self._buf) - self._pos
+
+    def stats(self) -> Dict[str, float]:
+        """解码统计快照（计数为累计值；stall_* 单位毫秒）。"""
+        return dict(self._stats)
+
+    def reset(self) -> None:
+        """丢弃全部未解析字节（如串口重开后）。"""
+        self._base += len(self._buf)
+        self._buf.clear()
+        self._pos = 0
+        self._stall_at = None
+
+# 预编码帧模板：A0 心跳恒为 SEQ=FFFF 的同一串字节；AF 仅随结果码与 SEQ 变化
+_A0_IDLE: bytes = encode_frame(ProtocolFrame(FrameType.A0, 0xFFFF, b""))
+_AF_TEMPLATES: Dict[int, Tuple[bytes, int]] = {}  # code -> (SEQ=0 的整帧, TYPE+LEN+VAL 字节和)
+
+def encode_a0(seq: int = 0xFFFF) -> bytes:
+    """A0 整帧字节；默认 SEQ=FFFF 时直接返回缓存的常量帧。"""
+    if seq == 0xFFFF:
+        return _A0_IDLE
+    return encode_frame(ProtocolFrame(FrameType.A0, seq, b""))
+
+def encode_af(seq: int, code: int | AckCode = 0) -> bytearray:
+    """
+    AF 整帧字节：按结果码取模板，仅回填 SEQ(2) 与 CHECK(1)。
+    CHECK = 模板基础和 + SEQ 低/高字节，结果与 encode_frame(build_af(...)) 一致。
+    """
+    c = int(code) & 0xFF
+    tpl = _AF_TEMPLATES.get(c)
+    if tpl is None:
+        base = encode_frame(ProtocolFrame(FrameType.AF, 0, bytes([c])))
+        tpl = _AF_TEMPLATES[c] = (base, base[-1])
+    lo = seq & 0xFF
+    hi = (seq >> 8) & 0xFF
+    out = bytearray(tpl[0])
+    out[7] = lo
+    out[8] = hi
+    out[10] = (tpl[1] + lo + hi) & 0xFF
+    return out
+
+for _code in AckCode:  # 预热全部已定义结果码的模板
+    encode_af(0, _code)
 
 def build_a0(seq: int = 0xFFFF) -> ProtocolFrame:
-    return ProtocolFrame(FrameType.A0, seq, b"")
+    return ProtocolFrame(FrameType.A0, seq, b"", raw=encode_a0(seq))
 
 def build_a1(
     indices: List[int],
@@ -206,10 +400,90 @@ def build_a1(
     val = b"".join(items)
     return ProtocolFrame(FrameType.A1, seq, val)
 
+A1_NUMPY_MIN_ITEMS = 64  # 低于该项数时 numpy 的转换开销大于收益
+
+def _a1_words(
+    indices: Sequence[int],
+    attrs: Optional[Sequence[int]],
+    colors: Optional[Sequence[int]],
+) -> List[int]:
+    """按位域合成 A1 各项（纯 Python 单遍）；attrs/colors 不足部分按 0 处理。"""
+    m = len(indices)
+    if attrs is None and colors is None:
+        return [int(i) & 0x1FFF for i in indices]
+    a = list(attrs[:m]) if attrs is not None else []
+    c = list(colors[:m]) if colors is not None else []
+    if len(a) < m:
+        a.extend([0] * (m - len(a)))
+    if len(c) < m:
+        c.extend([0] * (m - len(c)))
+    return [
+        ((int(b) & 0x01) << 15) | ((int(k) & 0x03) << 13) | (int(i) & 0x1FFF)
+        for i, b, k in zip(indices, a, c)
+    ]
+
+def _a1_words_numpy(
+    indices: Sequence[int],
+    attrs: Optional[Sequence[int]],
+    colors: Optional[Sequence[int]],
+) -> bytes:
+    """numpy 向量化路径：返回小端 2B/项的 VAL 字节。"""
+    m = len(indices)
+    words = _np.asarray(indices, dtype=_np.uint32) & 0x1FFF
+    if attrs is not None:
+        a = _np.zeros(m, dtype=_np.uint32)
+        src = _np.asarray(attrs[:m], dtype=_np.uint32)
+        a[: len(src)] = src
+        words |= (a & 0x01) << 15
+    if colors is not None:
+        c = _np.zeros(m, dtype=_np.uint32)
+        src = _np.asarray(colors[:m], dtype=_np.uint32)
+        c[: len(src)] = src
+        words |= (c & 0x03) << 13
+    return words.astype("<u2").tobytes()
+
+def encode_a1(
+    indices: Sequence[int],
+    seq: int = 0,
+    attrs: Optional[Sequence[int]] = None,
+    colors: Optional[Sequence[int]] = None,
+) -> bytearray:
+    """
+    批量编码整帧 A1，字节与 encode_frame(build_a1(...)) 完全一致：
+    - indices/attrs/colors 可为 list 或 array('H')、memoryview 等支持 len/切片/迭代的序列；
+    - VAL 一次性打包（struct '<%dH'；安装 numpy 且项数较多时走向量化路径）；
+    - HEADER/TYPE/LEN/SEQ/VAL/CHECK 直接写入一块预分配 bytearray。
+    """
+    m = len(indices)
+    length = 2 + 2 * m + 1  # SEQ(2) + VAL(2m) + CHECK(1)
+    out = bytearray(4 + 1 + 2 + length)
+    out[0:4] = HEADER
+    struct.pack_into("<BHH", out, 4, int(FrameType.A1), length, seq & 0xFFFF)
+    if m:
+        if _np is not None and m >= A1_NUMPY_MIN_ITEMS:
+            out[9:9 + 2 * m] = _a1_words_numpy(indices, attrs, colors)
+        else:
+            struct.pack_into(f"<{m}H", out, 9, *_a1_words(indices, attrs, colors))
+    out[-1] = sum(out[4:-1]) & 0xFF
+    return out
+
+def build_a1_packed(
+    indices: Sequence[int],
+    seq: int = 0,
+    attrs: Optional[Sequence[int]] = None,
+    colors: Optional[Sequence[int]] = None,
+) -> ProtocolFrame:
+    """
+    与 build_a1() 等价的 A1 帧，但整帧已由 encode_a1() 预编码：
+    frame.raw 为整帧字节，frame.val 为其 VAL 段的只读视图（不额外复制）。
+    """
+    raw = encode_a1(indices, seq=seq, attrs=attrs, colors=colors)
+    return ProtocolFrame(FrameType.A1, seq, memoryview(raw)[9:-1].toreadonly(), raw=raw)
+
 def build_af(seq: int, code: int | AckCode = 0) -> ProtocolFrame:
     """构造 AF 应答帧。
     VAL 字段为 1 字节结果码（参见 [docs/通信约定.md](docs/通信约定.md:47)）：
     00：处理成功；01：未知TYPE；03：SEQ过小；04：SEQ过大；06：CHECK错误。
     仅填充 VAL（不要误放到 CHECK 字段）。
     """
-    return ProtocolFrame(FrameType.AF, seq, bytes([int(code) & 0xFF]))
\ No newline at end of file
+    return ProtocolFrame(FrameType.AF, seq, bytes([int(code) & 0xFF]), raw=encode_af(seq, code))
\ No newline at end of file
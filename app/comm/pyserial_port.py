@@ -1,15 +1,26 @@
 from __future__ import annotations
+import os
+import select
 import threading
 import time
-from typing import Callable, Optional
+from typing import Callable, Dict, Optional
 
 try:
     import serial  # pyserial
 except Exception:  # defer ImportError until open() is called
     serial = None  # type: ignore
 
+from app.comm.link_model import UartLinkModel
+from app.comm.metrics import LinkAccounting
 from app.comm.serial_port import SerialPortBase
+from app.comm.tx_buffer import tx_buffer_from_config
 from app.logs.logger import get_logger
+from app.storage.config import ConfigRepo
+
+# 接收循环模式：select=阻塞于 fd（POSIX）；blocking=阻塞 read(1) + in_waiting；poll=in_waiting 轮询（兼容回退）
+RX_MODES = ("auto", "select", "blocking", "poll")
+# 阻塞等待的最长时长：仅用于周期性检查停止标志，不影响收包时延
+_RX_IDLE_WAKE_SEC = 0.2
 
 
 class PySerialPort(SerialPortBase):
@@ -17,8 +28,13 @@ class PySerialPort(SerialPortBase):
     真实串口适配（pyserial），继承 SerialPortBase:
     - open(port, baud, timeout_ms): 打开串口并启动接收线程
     - close(): 停止接收线程并关闭串口
-    - write_bytes(data): 写入字节流，异常记录日志
-    接收线程使用 in_waiting 低延迟轮询，将读到的数据直接回调上层（会话层负责协议解析和“设备信息”日志）。
+    - write_bytes(data): 放入有界发送缓冲（serial.tx.*），由端口 I/O 循环排空；缓冲满时至多等待 write_timeout，异常记录日志
+    接收线程阻塞等待数据（serial.rx.mode，默认 auto：Linux 上 select 于串口 fd，其他平台阻塞 read），
+    首批字节到达后在 coalesce_max_us 内继续收取紧随其后的字节（相邻字节间隔超过 inter_byte_chars 个字符时间即停止），
+    合并为一次回调；poll 模式保留原 in_waiting 轮询作为回退。会话层负责协议解析和“设备信息”日志。
+    发送：select 模式由接收循环在 fd 可写时非阻塞写出（自管道唤醒）；blocking/poll 模式由独立 TX 线程以
+    ser.write_timeout 写出。write_timeout 内无进展即丢弃缓冲并计数，调用方可经 tx_backpressure() 推迟合成新帧。
+    读写出现 OSError（设备拔出等）时停止收发并经 set_lost_callback 通知（lost=True），由 PortSupervisor 重开。
     """
 
     def __init__(self) -> None:
@@ -27,6 +43,32 @@ class PySerialPort(SerialPortBase):
         self._rx_th: Optional[threading.Thread] = None
         self._rx_stop = threading.Event()
         self._logger = get_logger("pyserial")
+        # 端口级字节计数与利用率（不区分帧类型；按 8N1 与打开时的波特率折算）
+        self._acct = LinkAccounting(UartLinkModel().wire_time_sec(1))
+        self.tx_writes = 0
+        self.rx_reads = 0
+        self.rx_callbacks = 0
+        self.rx_mode = "auto"
+        self.coalesce_max_sec = 0.001
+        self.inter_byte_chars = 3.0
+        self.read_size = 4096
+        try:
+            rx = ((ConfigRepo().load().get("serial", {}) or {}).get("rx", {}) or {})
+            mode = str(rx.get("mode", "auto")).lower()
+            self.rx_mode = mode if mode in RX_MODES else "auto"
+            self.coalesce_max_sec = max(0.0, float(rx.get("coalesce_max_us", 1000)) / 1_000_000.0)
+            self.inter_byte_chars = max(0.0, float(rx.get("inter_byte_chars", 3)))
+            self.read_size = max(1, int(rx.get("read_size", 4096)))
+        except Exception:
+            pass
+        self._byte_sec = UartLinkModel().wire_time_sec(1)
+        self._active_mode = "poll"
+        self._txbuf = tx_buffer_from_config(on_data=self._wake_io)
+        self._tx_th: Optional[threading.Thread] = None
+        self._wake_r: Optional[int] = None
+        self._wake_w: Optional[int] = None
+        self._wake_lock = threading.Lock()
+        self.port_name: Optional[str] = None
 
     def set_rx_callback(self, cb: Callable[[bytes], None]) -> None:
         super().set_rx_callback(cb)
@@ -47,10 +89,29 @@ class PySerialPort(SerialPortBase):
                 baudrate=int(baud),
                 timeout=float(timeout_ms) / 1000.0,
             )
+            self.port_name = str(port)
+            self._byte_sec = UartLinkModel(baud=max(1, int(baud))).wire_time_sec(1)
+            self._acct.seconds_per_byte = self._byte_sec
+            self._active_mode = self._resolve_rx_mode(self._ser)
+            loop = self._rx_loop
+            if self._active_mode == "select":
+                loop = self._rx_loop_select
+                self._wake_r, self._wake_w = os.pipe()
+                os.set_blocking(self._wake_r, False)
+                os.set_blocking(self._wake_w, False)
+            elif self._active_mode == "blocking":
+                # 阻塞 read：首字节最多等待 _RX_IDLE_WAKE_SEC 后返回以检查停止标志
+                self._ser.timeout = _RX_IDLE_WAKE_SEC
+                loop = self._rx_loop_blocking
             self._rx_stop.clear()
-            self._rx_th = threading.Thread(target=self._rx_loop, name=f"pyserial-{port}-rx", daemon=True)
+            self._txbuf.clear()
+            self._rx_th = threading.Thread(target=loop, name=f"pyserial-{port}-rx", daemon=True)
             self._rx_th.start()
-            self._logger.info(f"Serial opened: port={port} baud={baud} timeout_ms={timeout_ms}")
+            if self._active_mode != "select":
+                self._ser.write_timeout = self._txbuf.write_timeout_sec or None
+                self._tx_th = threading.Thread(target=self._tx_loop, name=f"pyserial-{port}-tx", daemon=True)
+                self._tx_th.start()
+            self._logger.info(f"Serial opened: port={port} baud={baud} timeout_ms={timeout_ms} rx_mode={self._active_mode}")
         except Exception as e:
             self._logger.error(f"Serial open failed: {e}")
             raise
@@ -61,9 +122,12 @@ class PySerialPort(SerialPortBase):
         """
         try:
             self._rx_stop.set()
+            self._wake_io()
+            self._txbuf.clear()
             if self._rx_th and self._rx_th.is_alive():
                 # 不阻塞太久，接收线程会在下一个轮询周期退出
                 self._rx_th = None
+            self._tx_th = None
             if self._ser:
                 try:
                     if getattr(self._ser, "is_open", False):
@@ -77,7 +141,7 @@ class PySerialPort(SerialPortBase):
 
     def write_bytes(self, data: bytes) -> None:
         """
-        写入字节流；异常时记录日志但不抛出致命错误。
+        写入字节流：放入发送缓冲后立即返回（缓冲满时至多等待 write_timeout）；异常时记录日志但不抛出致命错误。
         """
         try:
             if not isinstance(data, (bytes, bytearray)):
@@ -85,13 +149,245 @@ class PySerialPort(SerialPortBase):
             ser = self._ser
             if ser is None or not getattr(ser, "is_open", False):
                 raise RuntimeError("Serial port is not open")
-            ser.write(data)
+            if not self._txbuf.put(data):
+                raise TimeoutError(f"TX buffer full for {self._txbuf.write_timeout_sec:.3f}s, {len(data)} bytes dropped")
+            self.tx_writes += 1
         except Exception as e:
             self._logger.error(f"Serial write failed: {e}")
 
+    def tx_pending(self) -> int:
+        return len(self._txbuf)
+
+    def tx_backpressure(self) -> bool:
+        return self._txbuf.backpressure()
+
+    def wait_tx_drained(self, timeout_sec: float = 1.0) -> bool:
+        return self._txbuf.wait_drained(timeout_sec)
+
+    def _wake_io(self) -> None:
+        with self._wake_lock:
+            w = self._wake_w
+            if w is not None:
+                try:
+                    os.write(w, b"\x00")
+                except OSError:
+                    # 管道已满说明已有未处理的唤醒
+                    pass
+
+    def _tx_done(self, n: int) -> None:
+        self._txbuf.consume(n)
+        self._acct.tx("bytes", n)
+
+    def _tx_loop(self) -> None:
+        """
+        blocking/poll 模式的发送线程：等待缓冲有数据后以 ser.write（受 write_timeout 约束）写出；
+        写超时即丢弃缓冲并计数，不让调用方阻塞在 pyserial 内。
+        """
+        ser = self._ser
+        buf = self._txbuf
+        if ser is None:
+            return
+        while not self._rx_stop.is_set():
+            if not buf.wait_data(_RX_IDLE_WAKE_SEC):
+                continue
+            chunk = buf.peek(self.read_size)
+            try:
+                n = ser.write(chunk)
+                self._tx_done(len(chunk) if n is None else int(n))
+            except Exception as e:
+                if self._rx_stop.is_set():
+                    break
+                if serial is not None and isinstance(e, serial.SerialTimeoutException):  # type: ignore[attr-defined]
+                    buf.abort()
+                    self._logger.error(f"Serial write timed out after {buf.write_timeout_sec:.3f}s; pending TX dropped")
+                elif isinstance(e, OSError):
+                    self._on_lost(f"Serial write failed: {e}")
+                    break
+                else:
+                    self._logger.error(f"Serial write failed: {e}")
+                    time.sleep(0.010)
+                    if buf.check_stall():
+                        self._logger.error("Serial write stalled; pending TX dropped")
+
+    def _on_lost(self, reason: str) -> None:
+        """
+        设备丢失（拔出、EIO、空读等 OSError/SerialException）：停止收发线程并通知监管者（set_lost_callback），
+        不再每 10ms 重复报错；端口实例随后由 PortSupervisor 关闭并以新实例重开。
+        """
+        if self.lost:
+            return
+        self._logger.error(f"{reason}; port {self.port_name} lost")
+        self._rx_stop.set()
+        self._wake_io()
+        self._txbuf.clear()
+        self._notify_lost(reason)
+
+    def _drain_tx_fd(self, fd: int) -> None:
+        """select 模式：fd 可写时非阻塞写出一段缓冲"""
+        try:
+            n = os.write(fd, self._txbuf.peek(self.read_size))
+        except (BlockingIOError, InterruptedError):
+            return
+        self._tx_done(n)
+
+    def stats(self) -> Dict[str, object]:
+        """端口级计数：读写字节与调用次数、1s/10s/60s 的 TX/RX 线路时间利用率，以及发送缓冲深度/排空速率/丢弃与写超时"""
+        return {
+            "tx_bytes": self._acct.tx_bytes,
+            "rx_bytes": self._acct.rx_bytes,
+            "tx_writes": self.tx_writes,
+            "rx_reads": self.rx_reads,
+            "rx_callbacks": self.rx_callbacks,
+            "rx_mode": self._active_mode,
+            "utilization": self._acct.utilization(),
+            **self._txbuf.stats(),
+        }
+
+    def _resolve_rx_mode(self, ser) -> str:
+        mode = self.rx_mode
+        if mode == "auto":
+            mode = "select" if os.name == "posix" else "blocking"
+        if mode == "select":
+            try:
+                ser.fileno()
+            except Exception:
+                # 非 fd 型端口（如 URL 端口）：退回阻塞 read
+                mode = "blocking"
+        return mode
+
+    def _inter_byte_sec(self) -> float:
+        return min(self.coalesce_max_sec, self.inter_byte_chars * self._byte_sec)
+
+    def _deliver(self, data: bytes) -> None:
+        self.rx_callbacks += 1
+        cb = self._rx_cb
+        if cb:
+            try:
+                cb(data)
+            except Exception as e:
+                self._logger.error(f"RX callback error: {e}")
+
+    def _rx_loop_select(self) -> None:
+        """
+        事件驱动收发（POSIX）：select 阻塞于串口 fd（及唤醒管道），空闲时不占 CPU；发送缓冲非空时同时关注可写并非阻塞写出；
+        首次读到数据后，在 coalesce_max_sec 内继续等待紧随其后的字节（单次等待不超过 inter_byte 间隔），合并为一次回调。
+        """
+        ser = self._ser
+        if ser is None:
+            return
+        try:
+            fd = ser.fileno()
+        except Exception as e:
+            self._logger.error(f"Serial fileno failed, fallback to polling: {e}")
+            self._close_wake_pipe(self._wake_r, self._wake_w)
+            self._tx_th = threading.Thread(target=self._tx_loop, name=f"pyserial-{self.port_name}-tx", daemon=True)
+            self._tx_th.start()
+            self._rx_loop()
+            return
+        size = self.read_size
+        wake, wake_w = self._wake_r, self._wake_w
+        rlist = [fd] if wake is None else [fd, wake]
+        txbuf = self._txbuf
+        while not self._rx_stop.is_set():
+            try:
+                r, w, _x = select.select(rlist, [fd] if txbuf else [], [], _RX_IDLE_WAKE_SEC)
+                if wake is not None and wake in r:
+                    try:
+                        while os.read(wake, 512):
+                            pass
+                    except OSError:
+                        pass
+                if w:
+                    self._drain_tx_fd(fd)
+                if txbuf and txbuf.check_stall():
+                    self._logger.error(f"Serial write stalled for {txbuf.write_timeout_sec:.3f}s; pending TX dropped")
+                if fd not in r:
+                    continue
+                data = os.read(fd, size)
+                if not data:
+                    # 可读但无数据：设备已拔出/端口失效
+                    raise OSError("device reports readiness to read but returned no data (device disconnected?)")
+                self.rx_reads += 1
+                deadline = time.monotonic() + self.coalesce_max_sec
+                gap = self._inter_byte_sec()
+                while len(data) < size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or not select.select([fd], [], [], min(gap, remaining))[0]:
+                        break
+                    more = os.read(fd, size - len(data))
+                    if not more:
+                        break
+                    self.rx_reads += 1
+                    data += more
+                self._acct.rx_raw(len(data))
+                self._deliver(data)
+            except Exception as e:
+                if self._rx_stop.is_set():
+                    break
+                if isinstance(e, OSError):
+                    self._on_lost(f"Serial read failed: {e}")
+                    break
+                self._logger.error(f"Serial read failed: {e}")
+                time.sleep(0.010)
+        self._close_wake_pipe(wake, wake_w)
+
+    def _close_wake_pipe(self, r: Optional[int], w: Optional[int]) -> None:
+        # 仅关闭本循环自己的管道：close() 后立即 open() 时新循环的管道已替换属性
+        with self._wake_lock:
+            if self._wake_w == w:
+                self._wake_r = self._wake_w = None
+        for fd_ in (r, w):
+            if fd_ is not None:
+                try:
+                    os.close(fd_)
+                except OSError:
+                    pass
+
+    def _rx_loop_blocking(self) -> None:
+        """
+        阻塞 read 接收（无可 select 的 fd 时，如 Windows）：read(1) 阻塞等待首字节（最多 _RX_IDLE_WAKE_SEC），
+        随后收取 in_waiting 中已到达的字节，并在 coalesce_max_sec 内按 inter_byte 间隔检查后续字节，合并为一次回调。
+        注：pyserial 的 POSIX 实现不支持 inter_byte_timeout，故合并等待由本循环完成，不依赖该参数。
+        """
+        ser = self._ser
+        if ser is None:
+            return
+        size = self.read_size
+        while not self._rx_stop.is_set():
+            try:
+                data = ser.read(1)
+                if not data:
+                    continue
+                self.rx_reads += 1
+                deadline = time.monotonic() + self.coalesce_max_sec
+                gap = self._inter_byte_sec()
+                waited = False
+                while len(data) < size:
+                    waiting = int(getattr(ser, "in_waiting", 0))
+                    if waiting > 0:
+                        data += ser.read(min(waiting, size - len(data)))
+                        self.rx_reads += 1
+                        waited = False
+                        continue
+                    remaining = deadline - time.monotonic()
+                    if waited or remaining <= 0 or gap <= 0:
+                        break
+                    time.sleep(min(gap, remaining))
+                    waited = True
+                self._acct.rx_raw(len(data))
+                self._deliver(data)
+            except Exception as e:
+                if self._rx_stop.is_set():
+                    break
+                if isinstance(e, OSError):
+                    self._on_lost(f"Serial read failed: {e}")
+                    break
+                self._logger.error(f"Serial read failed: {e}")
+                time.sleep(0.010)
+
     def _rx_loop(self) -> None:
         """
-        轮询读取串口数据：
+        轮询读取串口数据（serial.rx.mode=poll 的回退路径）：
         - 优先读取 in_waiting 的全部字节；
         - 若无数据，短暂 sleep 以降低 CPU 占用；
         - 将读取到的数据原样上送回调（上层负责协议解析与设备信息日志）。
@@ -104,16 +400,20 @@ class PySerialPort(SerialPortBase):
                 waiting = int(getattr(ser, "in_waiting", 0))
                 if waiting > 0:
                     data = ser.read(waiting)
-                    if data and  self._rx_cb:
-                        try:
-                             self._rx_cb(data)
-                        except Exception as e:
-                            self._logger.error(f"RX callback error: {e}")
+                    if data:
+                        self.rx_reads += 1
+                        self._acct.rx_raw(len(data))
+                        self._deliver(data)
                 else:
                     # 适度休眠，避免忙等
                     time.sleep(0.001)
             except Exception as e:
-                # 读异常：记录并继续尝试（串口可能短暂不可用）
+                if self._rx_stop.is_set():
+                    break
+                if isinstance(e, OSError):
+                    self._on_lost(f"Serial read failed: {e}")
+                    break
+                # 其他读异常：记录并继续尝试
                 self._logger.error(f"Serial read failed: {e}")
                 time.sleep(0.010)
         # 退出前不做额外处理；close() 会负责资源清理
\ No newline at end of file
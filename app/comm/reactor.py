@@ -0,0 +1,397 @@
+from __future__ import annotations
+import os
+import selectors
+import threading
+from collections import deque
+from typing import Callable, Deque, Dict, Optional, Set
+
+try:
+    import serial  # pyserial
+except Exception:  # defer ImportError until open() is called
+    serial = None  # type: ignore
+
+from app.comm.link_model import UartLinkModel
+from app.comm.metrics import LinkAccounting
+from app.comm.serial_port import SerialPortBase
+from app.comm.tx_buffer import tx_buffer_from_config
+from app.logs.logger import get_logger
+from app.storage.config import ConfigRepo
+
+# 有待写端口时 select 的最长等待：用于按 serial.tx.write_timeout_ms 检查写停滞
+_STALL_CHECK_SEC = 0.2
+
+
+class PortReactor:
+    """
+    单线程串口反应器：多个串口 fd 注册到同一个 selectors 循环，非阻塞读写均在反应器线程完成：
+    - 可读：os.read 后在本线程直接调用端口的 RX 回调（回调应尽快返回，慢回调会推迟其他端口的收发）；
+    - 可写：仅在端口发送缓冲非空时关注 EVENT_WRITE，写完即撤销；此期间按 _STALL_CHECK_SEC 检查写停滞；
+    - 注册/注销/修改关注事件经 call_soon 投递到反应器线程执行，自管道唤醒 select。
+    端口数量增加时线程数与上下文切换保持不变（对比 PySerialPort 每端口一个接收线程）。
+    """
+    def __init__(self, name: str = "serial-reactor") -> None:
+        self.name = name
+        self._sel = selectors.DefaultSelector()
+        self._wake_r, self._wake_w = os.pipe()
+        os.set_blocking(self._wake_r, False)
+        os.set_blocking(self._wake_w, False)
+        self._sel.register(self._wake_r, selectors.EVENT_READ, None)
+        self._calls: Deque[Callable[[], None]] = deque()
+        self._stop = threading.Event()
+        self._th: Optional[threading.Thread] = None
+        self._ports: Dict[int, "ReactorSerialPort"] = {}
+        self._writers: Set[int] = set()
+        self._logger = get_logger("serial-reactor")
+        self.loops = 0
+        self.wakeups = 0
+
+    def start(self) -> None:
+        if self._th is not None and self._th.is_alive():
+            return
+        self._stop.clear()
+        self._th = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._th.start()
+
+    def stop(self, timeout_sec: float = 1.0) -> None:
+        """停止反应器线程并关闭仍注册的端口"""
+        self._stop.set()
+        self._wake()
+        th = self._th
+        if th is not None and th is not threading.current_thread():
+            th.join(timeout=timeout_sec)
+        self._th = None
+        for fd, port in list(self._ports.items()):
+            self._detach(fd)
+            port._on_detached()
+        self._run_calls()
+        try:
+            self._sel.close()
+        except Exception:
+            pass
+        for fd in (self._wake_r, self._wake_w):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+    def is_running(self) -> bool:
+        th = self._th
+        return th is not None and th.is_alive() and not self._stop.is_set()
+
+    def in_reactor_thread(self) -> bool:
+        return self._th is threading.current_thread()
+
+    def call_soon(self, fn: Callable[[], None]) -> None:
+        """线程安全：在反应器线程的下一轮循环执行 fn"""
+        self._calls.append(fn)
+        if not self.in_reactor_thread():
+            self._wake()
+
+    def run_sync(self, fn: Callable[[], None], timeout_sec: float = 1.0) -> bool:
+        """在反应器线程执行 fn 并等待完成；已在反应器线程或反应器未运行时直接执行"""
+        if self.in_reactor_thread() or not self.is_running():
+            fn()
+            return True
+        done = threading.Event()
+
+        def _call() -> None:
+            try:
+                fn()
+            finally:
+                done.set()
+        self.call_soon(_call)
+        return done.wait(timeout_sec)
+
+    def _wake(self) -> None:
+        try:
+            os.write(self._wake_w, b"\x00")
+        except (BlockingIOError, OSError):
+            # 管道已满说明已有未处理的唤醒
+            pass
+
+    # ---- 以下仅在反应器线程调用 ----
+    def _attach(self, fd: int, port: "ReactorSerialPort") -> None:
+        self._ports[fd] = port
+        self._sel.register(fd, selectors.EVENT_READ, port)
+
+    def _detach(self, fd: int) -> None:
+        self._writers.discard(fd)
+        if self._ports.pop(fd, None) is None:
+            return
+        try:
+            self._sel.unregister(fd)
+        except Exception:
+            pass
+
+    def _want_write(self, fd: int, on: bool) -> None:
+        port = self._ports.get(fd)
+        if port is None or (fd in self._writers) == on:
+            return
+        if on:
+            self._writers.add(fd)
+        else:
+            self._writers.discard(fd)
+        events = selectors.EVENT_READ | (selectors.EVENT_WRITE if on else 0)
+        try:
+            self._sel.modify(fd, events, port)
+        except Exception as e:
+            self._logger.error(f"Reactor modify failed: fd={fd} err={e}")
+
+    def _run_calls(self) -> None:
+        calls = self._calls
+        while calls:
+            fn = calls.popleft()
+            try:
+                fn()
+            except Exception as e:
+                self._logger.error(f"Reactor call failed: {e}")
+
+    def _run(self) -> None:
+        sel = self._sel
+        while not self._stop.is_set():
+            self._run_calls()
+            try:
+                events = sel.select(_STALL_CHECK_SEC if self._writers else None)
+            except Exception as e:
+                self._logger.error(f"Reactor select failed: {e}")
+                continue
+            self.loops += 1
+            for key, mask in events:
+                port = key.data
+                if port is None:
+                    self.wakeups += 1
+                    try:
+                        while os.read(self._wake_r, 512):
+                            pass
+                    except (BlockingIOError, OSError):
+                        pass
+                    continue
+                if mask & selectors.EVENT_READ:
+                    port._on_readable()
+                if mask & selectors.EVENT_WRITE and port._fd is not None:
+                    port._on_writable()
+            for fd in list(self._writers):
+                port = self._ports.get(fd)
+                if port is not None:
+                    port._check_tx_stall()
+        self._run_calls()
+
+    def stats(self) -> Dict[str, int]:
+        return {"ports": len(self._ports), "loops": self.loops, "wakeups": self.wakeups}
+
+
+class ReactorSerialPort(SerialPortBase):
+    """
+    反应器驱动的真实串口（pyserial 仅负责打开与配置，读写直接使用非阻塞 fd），接口与 PySerialPort 一致：
+    - 读：反应器线程在 fd 可读时 os.read（至多 serial.rx.read_size 字节）并调用 RX 回调，无独立接收线程；
+    - 写：放入有界发送缓冲（serial.tx.*）后返回，由反应器在 fd 可写时非阻塞排空；缓冲满时至多等待 write_timeout，
+      write_timeout 内无进展即丢弃缓冲并计数，调用方可经 tx_backpressure() 推迟合成新帧；
+    - 读到 EOF/IO 错误视为设备断开：自动注销并关闭，is_open 置 False，并经 set_lost_callback 通知（lost=True）。
+    依赖 POSIX 可 select 的串口 fd（Linux/macOS）；Windows 下请使用 PySerialPort。
+    """
+    def __init__(self, reactor: Optional[PortReactor] = None) -> None:
+        super().__init__()
+        self._reactor = reactor
+        self._ser: Optional["serial.Serial"] = None  # type: ignore[name-defined]
+        self._fd: Optional[int] = None
+        self._txbuf = tx_buffer_from_config(on_data=self._on_tx_data)
+        # 已投递尚未执行的 _start_write：连续小块写入只唤醒反应器一次
+        self._write_scheduled = False
+        self._logger = get_logger("serial-reactor")
+        self._acct = LinkAccounting(UartLinkModel().wire_time_sec(1))
+        self.port_name: Optional[str] = None
+        self.is_open = False
+        self.tx_writes = 0
+        self.rx_reads = 0
+        self.rx_callbacks = 0
+        self.read_size = 4096
+        try:
+            rx = ((ConfigRepo().load().get("serial", {}) or {}).get("rx", {}) or {})
+            self.read_size = max(1, int(rx.get("read_size", 4096)))
+        except Exception:
+            pass
+
+    def open(self, port: str | None = None, baud: int = 115200, timeout_ms: int = 0) -> None:
+        """打开串口并注册到反应器（未指定时使用进程级共享反应器）。timeout_ms 仅为接口兼容保留。"""
+        if port is None:
+            raise ValueError("ReactorSerialPort.open requires a 'port' string (e.g., '/dev/ttyUSB0')")
+        if serial is None:
+            raise ImportError("pyserial is not installed. Please install 'pyserial>=3.5'")
+        reactor = self._reactor or get_reactor()
+        self._reactor = reactor
+        try:
+            ser = serial.Serial(port=port, baudrate=int(baud), timeout=0)  # type: ignore[attr-defined]
+            fd = ser.fileno()
+            os.set_blocking(fd, False)
+            self._ser, self._fd = ser, fd
+            self.port_name = str(port)
+            self._acct.seconds_per_byte = UartLinkModel(baud=max(1, int(baud))).wire_time_sec(1)
+            self.is_open = True
+            self._txbuf.clear()
+            reactor.run_sync(lambda: reactor._attach(fd, self))
+            self._logger.info(f"Serial opened (reactor): port={port} baud={baud}")
+        except Exception as e:
+            self._logger.error(f"Serial open failed: {e}")
+            raise
+
+    def write_bytes(self, data: bytes) -> None:
+        """写入字节流：放入发送缓冲交由反应器写出（缓冲满时至多等待 write_timeout），异常记录日志但不抛出。"""
+        try:
+            if not isinstance(data, (bytes, bytearray, memoryview)):
+                raise TypeError("write_bytes expects bytes or bytearray")
+            if self._fd is None:
+                raise RuntimeError("Serial port is not open")
+            reactor = self._reactor
+            # 反应器线程内（如 RX 回调中写）不能等待自己排空
+            timeout = 0.0 if reactor is not None and reactor.in_reactor_thread() else None
+            if not self._txbuf.put(bytes(data), timeout=timeout):
+                raise TimeoutError(f"TX buffer full for {self._txbuf.write_timeout_sec:.3f}s, {len(data)} bytes dropped")
+            self.tx_writes += 1
+        except Exception as e:
+            self._logger.error(f"Serial write failed: {e}")
+
+    def tx_pending(self) -> int:
+        return len(self._txbuf)
+
+    def tx_backpressure(self) -> bool:
+        return self._txbuf.backpressure()
+
+    def wait_tx_drained(self, timeout_sec: float = 1.0) -> bool:
+        return self._txbuf.wait_drained(timeout_sec)
+
+    def _on_tx_data(self) -> None:
+        reactor, fd = self._reactor, self._fd
+        if reactor is not None and fd is not None and not self._write_scheduled:
+            self._write_scheduled = True
+            reactor.call_soon(lambda: self._start_write(fd))
+
+    def _on_readable(self) -> None:
+        fd = self._fd
+        if fd is None:
+            return
+        try:
+            data = os.read(fd, self.read_size)
+        except (BlockingIOError, InterruptedError):
+            return
+        except Exception as e:
+            self._on_disconnect(f"Serial read failed: {e}")
+            return
+        if not data:
+            self._on_disconnect("device reports readiness to read but returned no data (device disconnected?)")
+            return
+        self.rx_reads += 1
+        self.rx_callbacks += 1
+        self._acct.rx_raw(len(data))
+        cb = self._rx_cb
+        if cb:
+            try:
+                cb(data)
+            except Exception as e:
+                self._logger.error(f"RX callback error: {e}")
+
+    def _start_write(self, fd: int) -> None:
+        # 反应器线程：先直接写一次，写不完再关注 EVENT_WRITE
+        self._write_scheduled = False
+        if self._fd != fd:
+            return
+        self._on_writable()
+        if self._txbuf and self._fd == fd and self._reactor is not None:
+            self._reactor._want_write(fd, True)
+
+    def _on_writable(self) -> None:
+        fd = self._fd
+        if fd is None:
+            return
+        buf = self._txbuf
+        while buf:
+            try:
+                n = os.write(fd, buf.peek(65536))
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError as e:
+                # 与 PySerialPort 一致：真实写错误视为设备丢失，注销 fd 并通知监管者重开
+                self._on_disconnect(f"Serial write failed: {e}")
+                return
+            except Exception as e:
+                self._logger.error(f"Serial write failed: {e}")
+                buf.abort()
+                break
+            buf.consume(n)
+            self._acct.tx("bytes", n)
+        if self._reactor is not None:
+            self._reactor._want_write(fd, False)
+
+    def _check_tx_stall(self) -> None:
+        if self._txbuf.check_stall():
+            self._logger.error(f"Serial write stalled for {self._txbuf.write_timeout_sec:.3f}s; pending TX dropped port={self.port_name}")
+            if self._fd is not None and self._reactor is not None:
+                self._reactor._want_write(self._fd, False)
+
+    def _on_disconnect(self, reason: str) -> None:
+        self._logger.error(f"{reason} port={self.port_name}")
+        fd = self._fd
+        if fd is not None and self._reactor is not None:
+            self._reactor._detach(fd)
+        self._on_detached()
+        self._notify_lost(reason)
+
+    def _on_detached(self) -> None:
+        self._fd = None
+        self._txbuf.clear()
+        self.is_open = False
+        ser, self._ser = self._ser, None
+        if ser is not None:
+            try:
+                ser.close()
+            except Exception:
+                pass
+
+    def close(self) -> None:
+        """从反应器注销并关闭串口（在反应器线程完成，避免 fd 复用时与 select 冲突）"""
+        try:
+            fd = self._fd
+            reactor = self._reactor
+            if fd is not None and reactor is not None:
+                def _close() -> None:
+                    reactor._detach(fd)
+                    self._on_detached()
+                if not reactor.run_sync(_close):
+                    self._logger.warning(f"Reactor did not confirm close in time: port={self.port_name}")
+            else:
+                self._on_detached()
+            self._logger.info("Serial closed")
+        except Exception as e:
+            self._logger.error(f"Serial close failed: {e}")
+
+    def stats(self) -> Dict[str, object]:
+        """端口级计数：读写字节与调用次数、1s/10s/60s 的 TX/RX 线路时间利用率，以及发送缓冲深度/排空速率/丢弃与写超时"""
+        return {
+            "tx_bytes": self._acct.tx_bytes,
+            "rx_bytes": self._acct.rx_bytes,
+            "tx_writes": self.tx_writes,
+            "rx_reads": self.rx_reads,
+            "rx_callbacks": self.rx_callbacks,
+            "rx_mode": "reactor",
+            "utilization": self._acct.utilization(),
+            **self._txbuf.stats(),
+        }
+
+
+_reactor: Optional[PortReactor] = None
+_reactor_lock = threading.Lock()
+
+def get_reactor() -> PortReactor:
+    """进程级共享反应器（首次调用时创建并启动）"""
+    global _reactor
+    with _reactor_lock:
+        if _reactor is None or not _reactor.is_running():
+            _reactor = PortReactor()
+            _reactor.start()
+        return _reactor
+
+def close_reactor() -> None:
+    global _reactor
+    with _reactor_lock:
+        if _reactor is not None:
+            _reactor.stop()
+            _reactor = None
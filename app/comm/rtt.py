@@ -0,0 +1,67 @@
+from __future__ import annotations
+from typing import Dict, Optional
+
+class RttEstimator:
+    """
+    往返时延估计（Jacobson/Karels，同 TCP RTO 算法）：
+    - 首个样本：SRTT=R，RTTVAR=R/2；之后 RTTVAR=(1-β)·RTTVAR+β·|SRTT-R|，SRTT=(1-α)·SRTT+α·R；
+    - 超时 RTO=SRTT+max(granularity, k·RTTVAR)，限制在 [floor, ceiling]；
+    - 无样本时返回 initial（即配置的固定超时）；
+    - Karn 规则由调用方保证：重发过的交互不采样；每次尝试超时（含同一交互的各次重发）RTO 按 2 倍退避，
+      收到有效样本后复位。
+    单位均为秒；仅在 TX/RX 线程内以简单赋值更新，读取允许轻微竞争。
+    """
+    def __init__(
+        self,
+        initial_sec: float,
+        floor_sec: float = 0.02,
+        ceiling_sec: float = 3.0,
+        alpha: float = 0.125,
+        beta: float = 0.25,
+        k: float = 4.0,
+        granularity_sec: float = 0.001,
+    ) -> None:
+        self.initial_sec = float(initial_sec)
+        self.floor_sec = float(floor_sec)
+        self.ceiling_sec = max(self.floor_sec, float(ceiling_sec))
+        self.alpha = float(alpha)
+        self.beta = float(beta)
+        self.k = float(k)
+        self.granularity_sec = float(granularity_sec)
+        self.srtt: Optional[float] = None
+        self.rttvar: float = 0.0
+        self.samples = 0
+        self.timeouts = 0
+        self._backoff = 1
+
+    def sample(self, rtt_sec: float) -> None:
+        r = max(0.0, float(rtt_sec))
+        if self.srtt is None:
+            self.srtt = r
+            self.rttvar = r / 2.0
+        else:
+            self.rttvar += self.beta * (abs(self.srtt - r) - self.rttvar)
+            self.srtt += self.alpha * (r - self.srtt)
+        self.samples += 1
+        self._backoff = 1
+
+    def on_timeout(self) -> None:
+        """一次尝试超时（会话在每次重发前调用，不只是交互最终失败时）：后续 RTO 翻倍（上限 ceiling）"""
+        self.timeouts += 1
+        if self.srtt is not None and self.rto_sec() < self.ceiling_sec:
+            self._backoff *= 2
+
+    def rto_sec(self) -> float:
+        if self.srtt is None:
+            return self.initial_sec
+        rto = (self.srtt + max(self.granularity_sec, self.k * self.rttvar)) * self._backoff
+        return min(self.ceiling_sec, max(self.floor_sec, rto))
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "srtt_ms": (self.srtt or 0.0) * 1000.0,
+            "rttvar_ms": self.rttvar * 1000.0,
+            "rto_ms": self.rto_sec() * 1000.0,
+            "samples": self.samples,
+            "timeouts": self.timeouts,
+        }
@@ -0,0 +1,117 @@
+from __future__ import annotations
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Optional, Tuple, Union
+
+Item = Tuple[float, Union[bytes, Callable[[], None]]]
+
+class RxHandoff:
+    """
+    串口读线程 → 解码线程的有界单生产者/单消费者交接：
+    - push(data)：读线程调用，仅记录读到时刻并入队（deque.append 在 GIL 下原子，无锁）；
+      超过 max_chunks 或 max_bytes 时丢弃本分片并计入 overflow（解码器随后按帧头重同步，丢失的交互由 ACK 重试恢复）；
+    - 解码线程按序取出并调用 consumer(data, t_read)，读线程从不执行解码、HEX 格式化或日志写入；
+    - push_call(fn)：把控制操作（如换绑端口时重置解码器）排入同一顺序，在解码线程执行；
+      仅在生产者空闲时使用（例如旧端口已关闭、新端口尚未绑定），以保持单生产者约束。
+    深度按生产/消费两侧各自累加的计数之差得出，两侧互不写对方的字段。
+    """
+    def __init__(
+        self,
+        consumer: Callable[[bytes, float], None],
+        max_chunks: int = 4096,
+        max_bytes: int = 1 << 20,
+        name: str = "rx-decode",
+        on_error: Optional[Callable[[Exception], None]] = None,
+    ) -> None:
+        self._consumer = consumer
+        self.max_chunks = max(1, int(max_chunks))
+        self.max_bytes = max(1, int(max_bytes))
+        self._on_error = on_error
+        self._q: Deque[Item] = deque()
+        self._evt = threading.Event()
+        self._stop = False
+        # 生产者侧
+        self.pushed_chunks = 0
+        self.pushed_bytes = 0
+        self.overflow_chunks = 0
+        self.overflow_bytes = 0
+        self.peak_chunks = 0
+        # 消费者侧
+        self.popped_chunks = 0
+        self.popped_bytes = 0
+        self._th = threading.Thread(target=self._run, name=name, daemon=True)
+        self._th.start()
+
+    def push(self, data: bytes) -> None:
+        n = len(data)
+        depth = self.pushed_chunks - self.popped_chunks
+        if depth >= self.max_chunks or self.pushed_bytes - self.popped_bytes + n > self.max_bytes:
+            self.overflow_chunks += 1
+            self.overflow_bytes += n
+            return
+        self.pushed_chunks += 1
+        self.pushed_bytes += n
+        self._q.append((time.monotonic(), data))
+        if depth + 1 > self.peak_chunks:
+            self.peak_chunks = depth + 1
+        if not self._evt.is_set():
+            self._evt.set()
+
+    def push_call(self, fn: Callable[[], None]) -> None:
+        self._q.append((time.monotonic(), fn))
+        self._evt.set()
+
+    def _run(self) -> None:
+        q = self._q
+        evt = self._evt
+        while not self._stop:
+            try:
+                t_read, item = q.popleft()
+            except IndexError:
+                evt.clear()
+                if q:
+                    continue
+                evt.wait(0.2)
+                continue
+            try:
+                if callable(item):
+                    item()
+                else:
+                    try:
+                        self._consumer(item, t_read)
+                    finally:
+                        # 处理完成后再计为已消费：depth 含正在解码的分片，wait_idle 据此判断
+                        self.popped_chunks += 1
+                        self.popped_bytes += len(item)
+            except Exception as e:
+                if self._on_error is not None:
+                    self._on_error(e)
+
+    def depth(self) -> int:
+        return self.pushed_chunks - self.popped_chunks
+
+    def wait_idle(self, timeout: float = 1.0) -> bool:
+        """等待队列清空（测试与关闭前使用；轮询实现，不影响热路径）"""
+        end = time.monotonic() + timeout
+        while self._q or self.depth() > 0:
+            if time.monotonic() >= end:
+                return False
+            time.sleep(0.001)
+        return True
+
+    def close(self, timeout: float = 0.5) -> None:
+        self._stop = True
+        self._evt.set()
+        if self._th.is_alive() and self._th is not threading.current_thread():
+            self._th.join(timeout=timeout)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "depth_chunks": self.depth(),
+            "depth_bytes": self.pushed_bytes - self.popped_bytes,
+            "peak_chunks": self.peak_chunks,
+            "pushed_chunks": self.pushed_chunks,
+            "overflow_chunks": self.overflow_chunks,
+            "overflow_bytes": self.overflow_bytes,
+        }
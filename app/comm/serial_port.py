@@ -8,10 +8,25 @@ class SerialPortBase:
     """
     def __init__(self) -> None:
         self._rx_cb: Optional[Callable[[bytes], None]] = None
+        self._lost_cb: Optional[Callable[[str], None]] = None
+        # 设备丢失（拔出/IO 错误）后置 True，端口不再可用，需由 PortSupervisor 换用新实例
+        self.lost: bool = False
 
     def set_rx_callback(self, cb: Callable[[bytes], None]) -> None:
         self._rx_cb = cb
 
+    def set_lost_callback(self, cb: Optional[Callable[[str], None]]) -> None:
+        self._lost_cb = cb
+
+    def _notify_lost(self, reason: str) -> None:
+        self.lost = True
+        cb = self._lost_cb
+        if cb:
+            try:
+                cb(reason)
+            except Exception:
+                pass
+
     def open(self, port: str | None = None, baud: int = 115200) -> None:
         # 占位：Fake 实现不需要
         pass
@@ -23,6 +38,16 @@ class SerialPortBase:
     def write_bytes(self, data: bytes) -> None:
         raise NotImplementedError("write_bytes must be implemented")
 
+    # 发送缓冲观测（带 TxBuffer 的实现覆盖；直写实现无缓冲，恒为空闲）
+    def tx_pending(self) -> int:
+        return 0
+
+    def tx_backpressure(self) -> bool:
+        return False
+
+    def wait_tx_drained(self, timeout_sec: float = 1.0) -> bool:
+        return True
+
 class FakeSerialPort(SerialPortBase):
     """
     内存中双端口，便于测试。使用 connect_peer 连接两端。
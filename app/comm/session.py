@@ -2,24 +2,51 @@ from __future__ import annotations
 import time
 import threading
 from enum import Enum
-from typing import Callable, Optional, Tuple, List, Dict, Set, Union
-from queue import Queue, Empty
+from typing import Callable, Optional, Tuple, List, Dict, Union
+from concurrent.futures import Future, wait as wait_futures
 
 from app.comm.protocol import (
     FrameType,
     ProtocolFrame,
     encode_frame,
-    decode_stream,
-    build_af,
-    build_a1,
+    encode_af,
+    StreamDecoder,
+    decoder_limits,
+    next_seq_after,
+    build_a1_packed,
     build_a0,
     AckCode,
+    MIN_FRAME_LEN,
 )
+from app.comm.link_model import UartLinkModel
+from app.comm.metrics import LinkAccounting, SessionMetrics
+from app.comm.ack_store import AckStore
+from app.comm.rtt import RttEstimator
+from app.comm.rx_handoff import RxHandoff
+from app.comm.tx_scheduler import TxScheduler, PRIO_AF, PRIO_HEARTBEAT, PRIO_NORMAL
 from app.logs.logger import get_logger, hex_dump, get_device_info_logger
+from app.logs.capture import get_capture_writer
 from app.storage.config import ConfigRepo
 
 RequestHandler = Callable[[], Union[Tuple[List[int], Optional[List[int]]], Tuple[List[int], Optional[List[int]], Optional[List[int]]]]]
 
+class _Outstanding:
+    """待应答表项：已发送、等待 BF 的帧及其重试/超时状态"""
+    __slots__ = ("frame", "future", "attempts_left", "timeout_sec", "backoff_sec", "deadline", "in_backoff", "sent_at", "resent", "adaptive", "extra_sec")
+
+    def __init__(self, frame: ProtocolFrame, attempts: int, timeout_sec: float, backoff_sec: float, adaptive: bool = False) -> None:
+        self.frame = frame
+        self.future: "Future[bool]" = Future()
+        self.attempts_left = attempts
+        self.timeout_sec = timeout_sec
+        self.backoff_sec = backoff_sec
+        self.deadline = 0.0
+        self.in_backoff = False
+        self.sent_at = 0.0
+        self.resent = False  # Karn 规则：重发过的交互不做 RTT 采样
+        self.adaptive = adaptive  # 超时取自 RTT 估计（未由调用方显式指定）
+        self.extra_sec = 0.0  # 与帧长相关的固定耗时（线路传输 + 逐灯处理），RTT 采样前扣除
+
 class SessionState(Enum):
     """会话状态机"""
     DISCONNECTED = "DISCONNECTED"
@@ -43,11 +70,18 @@ class SerialSession:
         cmd_timeout_ms: int = 2000,
     ) -> None:
         self.port = port
-        self.port.set_rx_callback(self._on_bytes)
         self.logger = get_logger(name)
-        self._rx_buf = bytearray()
-        self._awaiting: Set[int] = set()
-        self._acked: Dict[int, int] = {}  # seq -> code
+        # 待应答表：seq -> _Outstanding（Future + 重试/超时状态），由 TX 线程定时检查
+        self._outstanding: Dict[int, _Outstanding] = {}
+        self._out_lock = threading.Lock()
+        # 观测：交互时延直方图与计数器（stats() 读取；comm.metrics.log_interval_seconds>0 时周期写日志）
+        self.metrics = SessionMetrics()
+        # 二进制收发捕获（logging.capture.*）：原始 RX 分片与 TX 写出块交由后台线程落盘，端口标签为会话名
+        self._capture = get_capture_writer()
+        # TX 调度器：AF/心跳/A1 等全部出站任务按优先级与到期时刻串行执行（早于 RX 回调与心跳创建）
+        self._tx_sched = TxScheduler()
+        # 在途 A1：同一时刻仅一个 A1 交互，保证 on_a1_result 与 Dispatcher 最近派发组一一对应
+        self._a1_inflight: Optional["Future[bool]"] = None
         self._seq = 0
         self._request_handler: RequestHandler = request_handler or (lambda: ([], None))
         self.last_remote_seq: Optional[int] = None
@@ -64,6 +98,30 @@ class SerialSession:
         self._offline_failures: int = 0
         cfg = ConfigRepo().load()
         comm_cfg = cfg.get("comm", {})
+        # 流式解码器：回调在此绑定一次，RX 分片只做 feed；LEN 上限由 comm.decoder.* 配置
+        self._decoder = StreamDecoder(
+            on_error=self._on_decode_error,
+            on_garbage=self._on_device_info,
+            max_len=decoder_limits(comm_cfg.get("decoder", {}) or {}),
+        )
+        # 近期 ACK 记录（有界）：识别迟到/重复/未请求的 BF；容量与 TTL 由 comm.ack_store.* 配置
+        ack_cfg = comm_cfg.get("ack_store", {}) or {}
+        self._ack_store = AckStore(
+            ttl_sec=float(ack_cfg.get("ttl_seconds", 60)),
+            max_entries=int(ack_cfg.get("max_entries", 256)),
+        )
+        # RX 交接（comm.rx_handoff.*）：端口读线程只把原始分片压入有界 SPSC 队列，解码/HEX/设备日志/帧处理在独立解码线程执行
+        hand_cfg = comm_cfg.get("rx_handoff", {}) or {}
+        self._rx_handoff: Optional[RxHandoff] = None
+        if bool(hand_cfg.get("enabled", True)):
+            self._rx_handoff = RxHandoff(
+                self._process_rx,
+                max_chunks=int(hand_cfg.get("max_chunks", 4096)),
+                max_bytes=int(hand_cfg.get("max_bytes", 1 << 20)),
+                name=f"{name}-rx-decode",
+                on_error=lambda e: self.logger.debug(f"rx decode error: {e}"),
+            )
+        self.port.set_rx_callback(self._rx_entry())
         # 周期和阈值以配置驱动，避免硬编码；仅使用 comm.*（参见 [docs/通信约定.md](docs/通信约定.md:68)）
         self.heartbeat_interval_sec: float = float(comm_cfg.get("heartbeat_interval_seconds", 10))
         self.offline_threshold: int = int(comm_cfg.get("offline_failure_threshold", 10))
@@ -92,6 +150,31 @@ class SerialSession:
             # 保守兜底，不影响主流程
             pass
 
+        # 自适应超时：按帧类型统计 A0→BF、A1→BF 往返时延（comm.rtt.*）；
+        # 无样本前沿用固定值（A0=ack_timeout_ms，A1=cmd_timeout_ms）
+        rtt_cfg = comm_cfg.get("rtt", {}) or {}
+        self._rtt_enabled: bool = bool(rtt_cfg.get("enabled", True))
+        try:
+            _floor = float(rtt_cfg.get("floor_ms", 20)) / 1000.0
+            _ceiling = float(rtt_cfg.get("ceiling_ms", 3000)) / 1000.0
+        except Exception:
+            _floor, _ceiling = 0.02, 3.0
+        self._rtt: Dict[FrameType, RttEstimator] = {
+            FrameType.A0: RttEstimator(self.ack_timeout_ms / 1000.0, floor_sec=_floor, ceiling_sec=_ceiling),
+            FrameType.A1: RttEstimator(self.cmd_timeout_ms / 1000.0, floor_sec=_floor, ceiling_sec=_ceiling),
+        }
+
+        # A1 的 BF 截止时间按帧长放宽：线路传输（serial.baud/data_bits/parity/stop_bits）+ 逐灯处理余量（comm.a1_deadline.*）
+        self._link = UartLinkModel.from_config(cfg.get("serial", {}) or {})
+        # 字节记账与链路利用率（按上述线路模型折算占用时间）
+        self.link_stats = LinkAccounting(self._link.wire_time_sec(1))
+        a1d = comm_cfg.get("a1_deadline", {}) or {}
+        self._a1_deadline_enabled: bool = bool(a1d.get("enabled", True))
+        try:
+            self._per_led_sec: float = max(0.0, float(a1d.get("per_led_us", 30))) / 1e6
+        except Exception:
+            self._per_led_sec = 30e-6
+
         # 最近一次 B1 的 AF code（用于 echo_last）
         self._last_b1_ack_code: int = int(AckCode.OK)
 
@@ -106,8 +189,15 @@ class SerialSession:
         except Exception:
             self._hex_max_bytes = 1024
 
-        self._hb_stop = threading.Event()
-        self._hb_thread: Optional[threading.Thread] = None
+        # 心跳：作为 TX 调度器的定时任务（key="heartbeat"，至多一个待发）；
+        # 最近一个心跳周期内收到过有效帧（心跳自身的 BF 除外）则跳过本次 A0
+        self._hb_active = False
+        self._hb_interval_sec: float = self.heartbeat_interval_sec
+        self._hb_next: float = 0.0
+        self._hb_skip_on_traffic: bool = bool(comm_cfg.get("heartbeat_skip_on_traffic", True))
+        self._last_traffic_at: float = float("-inf")
+        self.heartbeats_sent = 0
+        self.heartbeats_skipped = 0
         # 默认按配置启用心跳调度（幂等防重复）
         if bool(comm_cfg.get("enable_heartbeat", True)):
             try:
@@ -120,27 +210,186 @@ class SerialSession:
 
         # 可选派发结果钩子（成功派发后归档用）
         self.on_a1_result: Optional[Callable[[bool], None]] = None
+        # 设置后，正常顺序的 B1 只回 AF 并调用此回调（RX 解码线程内，须立即返回），A1 由外部经 push_a1 下发（如 DeviceManager）
+        self.on_b1: Optional[Callable[[], None]] = None
+
+        # TX 合并写：同一轮已就绪（或在窗口内就绪）的帧拼成一次 port.write_bytes（comm.tx.*）
+        tx_cfg = comm_cfg.get("tx", {}) or {}
+        self._tx_coalesce: bool = bool(tx_cfg.get("coalesce_enabled", True))
+        self._tx_coalesce_window_sec: float = max(0.0, float(tx_cfg.get("coalesce_window_ms", 5)) / 1000.0)
+        self._tx_coalesce_max_bytes: int = int(tx_cfg.get("coalesce_max_bytes", 4096))
+        self._tx_batch: Optional[bytearray] = None
+        self._tx_batch_frames: int = 0
+        self._tx_batch_since: float = 0.0
+        # 端口发送缓冲背压（port.tx_backpressure()）时推迟合成 A1 的重查间隔
+        self._tx_backpressure_retry_sec: float = max(0.001, float(tx_cfg.get("backpressure_retry_ms", 5)) / 1000.0)
+        # request_handler 耗时的指数滑动平均：预计超过合并窗口时先发出已缓冲的 AF，避免 AF 等待 A1 合成
+        self._compose_ewma_sec: float = 0.0
 
         # 发送工作线程：统一出站路径（AF/A0/A1 等），避免在串口接收回调线程内执行业务与阻塞等待ACK
-        # 高优先级队列用于 AF 等“即时应答”帧，普通队列用于 A1 下发与心跳等
-        self._tx_queue_high: "Queue[Callable[[], None]]" = Queue()
-        self._tx_queue: "Queue[Callable[[], None]]" = Queue()
         self._tx_stop = threading.Event()
         self._tx_thread: Optional[threading.Thread] = None
         self._start_tx_worker()
 
+        # 周期统计日志（0=关闭）
+        try:
+            self._metrics_log_interval_sec: float = float((comm_cfg.get("metrics", {}) or {}).get("log_interval_seconds", 0))
+        except Exception:
+            self._metrics_log_interval_sec = 0.0
+        if self._metrics_log_interval_sec > 0:
+            self._tx_sched.put(self._log_stats_job, PRIO_NORMAL, at=time.monotonic() + self._metrics_log_interval_sec, key="metrics")
+
+    def decoder_stats(self) -> Dict[str, float]:
+        """RX 解码统计（帧/错误/LEN 超限重同步/半帧停顿时长等），参见 StreamDecoder.stats()"""
+        return self._decoder.stats()
+
+    def ack_stats(self) -> Dict[str, int]:
+        """未匹配 BF 统计：late_acks/duplicate_acks/unsolicited_acks，以及 ACK 记录条数与淘汰数"""
+        return self._ack_store.stats()
+
+    def stats(self) -> Dict[str, object]:
+        """
+        会话观测快照：
+        - latency：b1_to_af / b1_to_a1 / a1_to_bf / a0_to_bf / rx_to_decode / rx_to_handled 的 count/mean/p50/p95/p99/max（毫秒），
+          rx_to_decode 为端口读到分片 → 解码线程开始处理（仅启用 RX 交接时记录）；
+        - counters：retries / ack_timeouts / ack_failures / b1_duplicates / b1_out_of_order / state_*_to_* 等；
+        - 另附 state、心跳发送/跳过数，以及解码、未匹配 BF、RTT、RX 交接队列（rx_handoff）统计。
+        """
+        snap = self.metrics.snapshot()
+        snap["state"] = self.state.value
+        snap["heartbeats"] = {"sent": self.heartbeats_sent, "skipped": self.heartbeats_skipped}
+        snap["decoder"] = self.decoder_stats()
+        snap["acks"] = self.ack_stats()
+        snap["rtt"] = self.rtt_stats()
+        snap["rx_handoff"] = self.rx_handoff_stats()
+        snap["link"] = self.link_usage()
+        return snap
+
+    def link_usage(self) -> Dict[str, object]:
+        """
+        链路字节记账：TX/RX 按帧类型字节数、重发字节、设备日志（garbage）字节、坏帧丢弃字节，
+        以及 1s/10s/60s 窗口的 TX/RX 线路时间利用率（0~1，按 serial.baud 与帧格式折算）；
+        底层端口提供 stats() 时一并附上（port）。
+        """
+        snap = self.link_stats.snapshot()
+        dec = self._decoder.stats()
+        snap["garbage_bytes"] = int(dec.get("garbage_bytes", 0))
+        snap["decode_error_bytes"] = int(dec.get("dropped_bytes", 0))
+        port_stats = getattr(self.port, "stats", None)
+        if callable(port_stats):
+            try:
+                snap["port"] = port_stats()
+            except Exception:
+                pass
+        return snap
+
+    def _log_stats_job(self) -> None:
+        """周期统计日志（TX 调度器定时任务，key="metrics"）"""
+        itv = self._metrics_log_interval_sec
+        try:
+            snap = self.stats()
+            lat = snap["latency"]  # type: ignore[index]
+            parts = [
+                f"{k} n={v['count']} p50={v['p50_ms']:.1f} p95={v['p95_ms']:.1f} p99={v['p99_ms']:.1f} max={v['max_ms']:.1f}"
+                for k, v in lat.items() if v["count"]  # type: ignore[union-attr]
+            ]
+            self.logger.info(f"stats state={snap['state']} counters={snap['counters']} latency_ms: " + "; ".join(parts))
+        except Exception as e:
+            self.logger.debug(f"stats log failed: {e}")
+        finally:
+            if itv > 0 and not self._tx_stop.is_set():
+                self._tx_sched.put(self._log_stats_job, PRIO_NORMAL, at=time.monotonic() + itv, key="metrics")
+
+    def rtt_stats(self) -> Dict[str, Dict[str, float]]:
+        """按帧类型的 RTT 估计：srtt_ms/rttvar_ms/rto_ms/samples/timeouts"""
+        return {ft.name: est.stats() for ft, est in self._rtt.items()}
+
+    def _size_allowance_sec(self, frame: ProtocolFrame) -> float:
+        """A1 与帧长相关的耗时：A1 整帧 + BF 应答的线路时间，加逐灯处理余量；其他帧为 0"""
+        if frame.type != FrameType.A1 or not self._a1_deadline_enabled:
+            return 0.0
+        n = len(frame.raw) if frame.raw is not None else MIN_FRAME_LEN + len(frame.val)
+        wire = self._link.wire_time_sec(n) + self._link.wire_time_sec(MIN_FRAME_LEN + 1)
+        return wire + self._per_led_sec * (len(frame.val) // 2)
+
+    def expected_timeout_ms(self, frame: ProtocolFrame) -> int:
+        """未显式指定超时时该帧的单次等待时长：default_timeout_ms(TYPE) + 帧长相关余量"""
+        return self.default_timeout_ms(frame.type) + int(round(self._size_allowance_sec(frame) * 1000.0))
+
+    def default_timeout_ms(self, ftype: FrameType) -> int:
+        """未显式指定超时时的单次等待时长：RTT 估计的 RTO（启用时），否则 A1 用 cmd_timeout_ms、其余用 ack_timeout_ms"""
+        est = self._rtt.get(ftype) if self._rtt_enabled else None
+        if est is not None:
+            return max(1, int(round(est.rto_sec() * 1000.0)))
+        return self.cmd_timeout_ms if ftype == FrameType.A1 else self.ack_timeout_ms
+
+    def reset_rx(self) -> None:
+        """
+        串口重开后重置接收侧状态：丢弃解码器中的半帧字节，清空 B1 序号记录
+        （设备可能随拔插复位，下一个 B1 按新序列处理而非判为重复/乱序）。待应答表与 TX 队列保持不变。
+        启用 RX 交接时在解码线程按序执行（排在旧端口已入队的分片之后）。
+        """
+        def _reset() -> None:
+            self._decoder.reset()
+            self._last_b1_seq = None
+            self.expected_remote_seq = None
+        if self._rx_handoff is not None:
+            self._rx_handoff.push_call(_reset)
+        else:
+            _reset()
+
+    def _rx_entry(self) -> Callable[[bytes], None]:
+        """端口 RX 回调：启用交接时仅入队，否则在端口线程内直接解码"""
+        return self._rx_handoff.push if self._rx_handoff is not None else self._on_bytes
+
+    def wait_rx_idle(self, timeout: float = 1.0) -> bool:
+        """等待已读到的分片全部解码完毕（未启用交接时立即返回 True）"""
+        return self._rx_handoff.wait_idle(timeout) if self._rx_handoff is not None else True
+
+    def rx_handoff_stats(self) -> Dict[str, int]:
+        """RX 交接队列：当前/峰值深度、入队与溢出丢弃的分片/字节数（未启用时为空）"""
+        return self._rx_handoff.stats() if self._rx_handoff is not None else {}
+
+    def on_port_lost(self, reason: str = "") -> None:
+        """底层串口丢失（由 PortSupervisor 调用）：置 OFFLINE 并计数，等待 rebind_port()"""
+        self.metrics.inc("port_lost")
+        self.logger.warning(f"port lost: {reason}")
+        self._set_state(SessionState.OFFLINE)
+
+    def rebind_port(self, port) -> None:
+        """
+        热插拔恢复：改用重开后的端口实例并重置接收侧状态；会话、待应答 Future、心跳与派发队列均不重建。
+        状态在收到对端有效帧（BF/B0）后回到 CONNECTED。
+        """
+        old = self.port
+        if old is not port:
+            try:
+                old.set_rx_callback(lambda _b: None)
+            except Exception:
+                pass
+        # 先排入重置，再绑定新端口：新端口的首个分片一定在重置之后解码
+        self.reset_rx()
+        self.port = port
+        port.set_rx_callback(self._rx_entry())
+        self.metrics.inc("port_rebinds")
+
     def _set_state(self, new_state: "SessionState") -> None:
         if new_state != self.state:
             self.logger.info(f"Session state {self.state.value} -> {new_state.value}")
+            self.metrics.inc(f"state_{self.state.value.lower()}_to_{new_state.value.lower()}")
             self.state = new_state
 
     def next_seq(self) -> int:
+        """下一个 A1 SEQ（跳过空包专用的 0xFFFF，参见 next_seq_after）"""
         s = self._seq
-        self._seq = (self._seq + 1) & 0xFFFF
+        self._seq = next_seq_after(s)
         return s
 
     def _send_frame(self, frame: ProtocolFrame) -> None:
-        blob = encode_frame(frame)
+        self._write_blob(encode_frame(frame), frame.type, frame.seq, len(frame.val))
+
+    def _write_blob(self, blob: bytes, ftype: int, seq: int, val_len: int) -> None:
+        """写出已编码整帧并记录日志（预编码帧与模板帧共用此出口）"""
         # HEX 捕获（发送）
         if getattr(self, "_hex_capture", False) and getattr(self, "_hex_outgoing", True):
             try:
@@ -148,103 +397,251 @@ class SerialSession:
                 self.logger.debug(f"TX HEX: {_hx}")
             except Exception:
                 pass
-        self.port.write_bytes(blob)
         try:
-            tname = FrameType(frame.type).name  # type: ignore[arg-type]
+            tname = FrameType(ftype).name
         except Exception:
-            tname = f"0x{int(frame.type):02X}"
-        self.logger.debug(f"TX {tname} seq={frame.seq} len={len(frame.val)}")
+            tname = f"0x{int(ftype):02X}"
+        self.link_stats.tx(tname, len(blob))
+        batch = self._tx_batch
+        if batch is not None and threading.current_thread() is self._tx_thread:
+            # TX 线程合并阶段：追加到本轮写缓冲，由 _flush_tx() 一次写出
+            if not batch:
+                self._tx_batch_since = time.monotonic()
+            batch += blob
+            self._tx_batch_frames += 1
+            if len(batch) >= self._tx_coalesce_max_bytes:
+                self._flush_tx()
+        else:
+            self._port_write(blob)
+        self.logger.debug(f"TX {tname} seq={seq} len={val_len}")
+
+    def _port_write(self, data: bytes) -> None:
+        cap = self._capture
+        if cap is not None:
+            cap.record("TX", self.logger.name, data)
+        self.port.write_bytes(data)
+
+    def _port_backpressure(self) -> bool:
+        fn = getattr(self.port, "tx_backpressure", None)
+        if not callable(fn):
+            return False
+        try:
+            return bool(fn())
+        except Exception:
+            return False
+
+    def _flush_tx(self) -> None:
+        """写出 TX 线程本轮合并缓冲（非 TX 线程或无缓冲时为空操作）"""
+        batch = self._tx_batch
+        if not batch or threading.current_thread() is not self._tx_thread:
+            return
+        self._tx_batch = bytearray()
+        n = self._tx_batch_frames
+        self._tx_batch_frames = 0
+        self._port_write(batch)
+        if n > 1:
+            self.logger.debug(f"TX coalesced frames={n} bytes={len(batch)}")
+
+    def send_with_ack(self, frame: ProtocolFrame, timeout_ms: Optional[int] = None, single_try: bool = False) -> "Future[bool]":
+        """
+        非阻塞发送并登记到待应答表，返回 Future[bool]（BF 结果码为 OK 时为 True，超时/失败为 False）：
+        - 重试策略同 send_and_wait_ack（comm.retry.*）；超时与重试由 TX 工作线程的定时检查驱动，不在任何线程内 sleep 等待；
+        - BF 到达时在 _handle_frame 中完成 Future；
+        - 同一 SEQ、同一 TYPE 已在等待时（如 SEQ=FFFF 的 A0）不重复发送，直接返回已有 Future。
+        """
+        use_retry = getattr(self, "retry_enabled", True)
+        attempts = max(1, int(getattr(self, "retry_max_attempts", 3))) if use_retry else 1
+        backoff_ms = int(getattr(self, "retry_backoff_ms", 50)) if use_retry else 0
+        # 单次尝试的等待时长：调用方显式指定优先，否则取按帧类型的自适应 RTO
+        adaptive = timeout_ms is None
+        extra_sec = self._size_allowance_sec(frame)
+        per_try_timeout = int(timeout_ms if timeout_ms is not None else self.expected_timeout_ms(frame))
+
+        # 心跳单次尝试：显式指定 single_try=True 时生效（周期心跳任务即如此调用）
+        if frame.type == FrameType.A0 and single_try:
+            attempts = 1
+            backoff_ms = 0
+
+        with self._out_lock:
+            cur = self._outstanding.get(frame.seq)
+            if cur is not None and cur.frame.type == frame.type:
+                return cur.future
+            ent = _Outstanding(frame, attempts, per_try_timeout / 1000.0, backoff_ms / 1000.0, adaptive=adaptive)
+            ent.extra_sec = extra_sec
+            # 先按入表时刻计时（BF 可能在写出调用返回前到达），写出后再校正
+            ent.sent_at = time.monotonic()
+            ent.deadline = ent.sent_at + ent.timeout_sec
+            self._outstanding[frame.seq] = ent
+        if cur is not None:
+            # 同 SEQ 的其他类型仍在等待（BF 只携带 SEQ，无法区分）：旧项按失败结束，不留下永不完成的 Future
+            self.metrics.inc("ack_superseded")
+            self.logger.warning(f"{cur.frame.type.name} seq={frame.seq} superseded by {frame.type.name} before its BF")
+            if not cur.future.done():
+                cur.future.set_result(False)
+        self._ack_store.note_sent(frame.seq)
+        ent.attempts_left -= 1
+        self._send_frame(frame)
+        # 等待 ACK 前必须落盘（含同批次的 AF 等）
+        self._flush_tx()
+        if not ent.future.done():
+            ent.sent_at = time.monotonic()
+            ent.deadline = ent.sent_at + ent.timeout_sec
+        if threading.current_thread() is not self._tx_thread:
+            # 唤醒 TX 线程，使其按新的最近截止时间重新计时
+            self._tx_sched.wake()
+        return ent.future
 
     def send_and_wait_ack(self, frame: ProtocolFrame, timeout_ms: Optional[int] = None, single_try: bool = False) -> bool:
         """
-        实现 ACK 等待重试（由 comm.retry.* 配置驱动）：
+        阻塞等待版本（供外部线程调用，如 DeviceManager 广播心跳）：send_with_ack(...).result()。
         - 参考 [docs/通信约定.md](docs/通信约定.md:64) 的在线判定：收到任何ACK视为在线，失败计数清零；
         - 重试策略为项目约定：可配置 enabled/ack_timeout_ms/max_attempts/backoff_ms。
         - 超时优先级：调用方参数 > 会话属性(self.ack_timeout_ms)。配置对 ack_timeout_ms 的影响在 __init__ 已处理，避免破坏既有语义。
         - 心跳：周期性心跳按单次尝试执行；通过参数 single_try=True 或在心跳线程内调用达到同样效果。显式调用 send_heartbeat() 可使用重试。
+        在 TX 线程内（或 TX 线程未运行时）调用会自行驱动超时检查：在 Future 上等待至最近的截止时间再检查，语义不变但会阻塞当前线程。
         """
-        use_retry = getattr(self, "retry_enabled", True)
-        attempts = max(1, int(getattr(self, "retry_max_attempts", 3))) if use_retry else 1
-        backoff_ms = int(getattr(self, "retry_backoff_ms", 50)) if use_retry else 0
-        # 单次尝试的等待时长
-        per_try_timeout = int(timeout_ms if timeout_ms is not None else getattr(self, "ack_timeout_ms", 1000))
-
-        # 心跳单次尝试：在心跳线程内或显式指定 single_try=True 时生效
-        try:
-            if frame.type == FrameType.A0 and (single_try or (self._hb_thread is not None and threading.current_thread() == self._hb_thread)):
-                attempts = 1
-                backoff_ms = 0
-        except Exception:
-            # 保守兜底，不影响主流程
-            pass
-
-        exp = frame.seq
-        for i in range(attempts):
-            self._awaiting.add(exp)
-            self._send_frame(frame)
-            deadline = time.monotonic() + (per_try_timeout / 1000.0)
-            while time.monotonic() < deadline:
-                if exp in self._acked:
-                    code = self._acked.pop(exp)
-                    self._awaiting.discard(exp)
-                    # 收到任何ACK视为在线，失败计数清零（参见文档在线判定）
-                    self._offline_failures = 0
-                    if self.state != SessionState.CONNECTED:
-                        self._set_state(SessionState.CONNECTED)
-                    return code == int(AckCode.OK)
-                time.sleep(0.001)
-            # 本次尝试超时
-            self._awaiting.discard(exp)
-            if i < (attempts - 1):
-                # backoff 间隔：确保不阻塞串口接收线程
-                if backoff_ms > 0:
-                    time.sleep(backoff_ms / 1000.0)
-                continue
+        fut = self.send_with_ack(frame, timeout_ms=timeout_ms, single_try=single_try)
+        tx = self._tx_thread
+        if tx is None or not tx.is_alive() or threading.current_thread() is tx:
+            while not fut.done():
+                # BF 由 RX 解码线程完成 Future 即返回；到期则在本线程执行重试/超时
+                wait_futures([fut], timeout=self._next_timer_delay())
+                self._service_ack_timers()
+        return bool(fut.result())
+
+    def _ack_received(self, seq: int, code: int) -> Optional[FrameType]:
+        """
+        BF 到达：完成对应的待应答项并返回其 TYPE；
+        未匹配的 BF 交由 ACK 记录分类计数（迟到/重复/未请求），返回 None
+        """
+        with self._out_lock:
+            ent = self._outstanding.pop(seq, None)
+        if ent is None:
+            kind = self._ack_store.classify_unmatched(seq, code)
+            self.logger.debug(f"unmatched BF seq={seq} code={code} ({kind})")
+            return None
+        self._ack_store.note_resolved(seq, acked=True, code=code)
+        if ent.frame.type == FrameType.A1:
+            self.metrics.record("a1_to_bf", time.monotonic() - ent.sent_at)
+        elif ent.frame.type == FrameType.A0:
+            self.metrics.record("a0_to_bf", time.monotonic() - ent.sent_at)
+        est = self._rtt.get(ent.frame.type)
+        if est is not None and not ent.resent:
+            est.sample(max(0.0, time.monotonic() - ent.sent_at - ent.extra_sec))
+        if not ent.future.done():
+            ent.future.set_result(code == int(AckCode.OK))
+        return ent.frame.type
+
+    def _next_timer_delay(self) -> Optional[float]:
+        """TX 线程的调度等待时长：距最近待应答截止时间的秒数；无待应答项时为 None（等到有任务或被唤醒）"""
+        with self._out_lock:
+            if not self._outstanding:
+                return None
+            nearest = min(e.deadline for e in self._outstanding.values())
+        return max(0.0, nearest - time.monotonic())
+
+    def _service_ack_timers(self) -> None:
+        """
+        检查待应答表的截止时间（TX 线程调用）：
+        - 本次尝试超时且仍有次数：进入 backoff（backoff=0 时立即重发）；backoff 到期后重发；
+        - 次数用尽：计入失败并按阈值置 OFFLINE，Future 置 False。
+        """
+        now = time.monotonic()
+        resend: List[_Outstanding] = []
+        failed: List[_Outstanding] = []
+        with self._out_lock:
+            for seq, ent in list(self._outstanding.items()):
+                if ent.deadline > now:
+                    continue
+                if not ent.in_backoff:
+                    self.metrics.inc("ack_timeouts")
+                    # 本次尝试超时：RTO 退避（Karn，每次尝试都退避而非仅最终失败）；自适应项的后续尝试采用退避后的 RTO
+                    est = self._rtt.get(ent.frame.type)
+                    if est is not None:
+                        est.on_timeout()
+                        if ent.adaptive and self._rtt_enabled:
+                            ent.timeout_sec = est.rto_sec() + ent.extra_sec
+                if ent.in_backoff:
+                    ent.in_backoff = False
+                    resend.append(ent)
+                elif ent.attempts_left > 0:
+                    if ent.backoff_sec > 0:
+                        ent.in_backoff = True
+                        ent.deadline = now + ent.backoff_sec
+                    else:
+                        resend.append(ent)
+                else:
+                    del self._outstanding[seq]
+                    failed.append(ent)
+            for ent in resend:
+                ent.attempts_left -= 1
+                ent.resent = True
+                ent.deadline = now + ent.timeout_sec
+        for ent in resend:
+            self.metrics.inc("retries")
+            self.link_stats.retransmit(MIN_FRAME_LEN + len(ent.frame.val))
+            self.logger.debug(f"ack timeout, resend {ent.frame.type.name} seq={ent.frame.seq} left={ent.attempts_left}")
+            self._send_frame(ent.frame)
+        if resend:
+            self._flush_tx()
+        for ent in failed:
+            self.metrics.inc("ack_failures")
+            self._ack_store.note_resolved(ent.frame.seq, acked=False)
             # 最后一次仍超时：计入失败并按阈值置 OFFLINE
             self._offline_failures += 1
             if self._offline_failures >= self.offline_threshold:
                 self._set_state(SessionState.OFFLINE)
-            return False
+            if not ent.future.done():
+                ent.future.set_result(False)
 
     def send_heartbeat(self, timeout_ms: Optional[int] = None) -> bool:
         f = build_a0()
         return self.send_and_wait_ack(f, timeout_ms=timeout_ms)
 
     def start_heartbeat(self, interval_sec: Optional[float] = None) -> None:
-        """启动心跳后台线程；默认由配置自动启用（参见 [docs/通信约定.md](docs/通信约定.md:64)）"""
+        """启动周期心跳（TX 调度器定时任务）；默认由配置自动启用（参见 [docs/通信约定.md](docs/通信约定.md:64)）"""
         itv = float(interval_sec if interval_sec is not None else self.heartbeat_interval_sec)
-        if self._hb_thread and self._hb_thread.is_alive():
+        if self._hb_active:
             return
-        self._hb_stop.clear()
-
-        def _runner() -> None:
-            # 失败计数与在线判定由 send_and_wait_ack() 统一处理，避免重复累计
-            # 心跳调度遵循固定周期（参见 [docs/通信约定.md](docs/通信约定.md:64)）：
-            # 若一次发送耗时超过周期，则不额外等待，避免“耗时+周期”叠加导致节奏过慢。
-            next_time = time.monotonic()
-            while not self._hb_stop.is_set():
-                # 通过 TX 队列串行化发送 A0，避免占用接收线程
-                self._enqueue_heartbeat()
-                next_time += itv
-                now = time.monotonic()
-                delay = next_time - now
-                if delay > 0:
-                    time.sleep(delay)
-                else:
-                    # 抢占下一周期，修正时间漂移
-                    next_time = now
-
-        self._hb_thread = threading.Thread(target=_runner, name=f"{self.logger.name}-hb", daemon=True)
-        self._hb_thread.start()
+        self._hb_active = True
+        self._hb_interval_sec = itv
+        self._hb_next = time.monotonic()
+        self._tx_sched.put(self._heartbeat_job, PRIO_HEARTBEAT, at=self._hb_next, key="heartbeat")
         self.logger.info(f"Heartbeat scheduler started interval={itv}s")
 
     def stop_heartbeat(self) -> None:
-        """停止心跳后台线程"""
-        if self._hb_thread:
-            self._hb_stop.set()
+        """停止周期心跳（撤销待发的心跳任务）"""
+        if self._hb_active:
+            self._hb_active = False
+            self._tx_sched.cancel("heartbeat")
             self.logger.info("Heartbeat scheduler stopping")
-            # 不阻断等待，避免影响串口线程
-            self._hb_thread = None
+
+    def _heartbeat_job(self) -> None:
+        """
+        周期心跳（TX 线程执行）：
+        - 最近一个周期内收到过有效帧：链路已证明在线，跳过 A0；
+        - 否则单次尝试发送 A0（上一个 A0 仍在等待 BF 时 send_with_ack 不会重复发送）；
+        - 固定周期调度：若执行滞后超过周期，则从当前时刻重新起算，避免“耗时+周期”叠加或补发。
+        """
+        if not self._hb_active:
+            return
+        itv = self._hb_interval_sec
+        now = time.monotonic()
+        try:
+            if self._hb_skip_on_traffic and now - self._last_traffic_at < itv:
+                self.heartbeats_skipped += 1
+                self.logger.debug("heartbeat skipped: link active within interval")
+            else:
+                self.heartbeats_sent += 1
+                self.send_with_ack(build_a0(), timeout_ms=None, single_try=True)
+        except Exception as e:
+            self.logger.debug(f"heartbeat tx job error: {e}")
+        finally:
+            self._hb_next += itv
+            if self._hb_next <= now:
+                self._hb_next = now + itv
+            if self._hb_active:
+                self._tx_sched.put(self._heartbeat_job, PRIO_HEARTBEAT, at=self._hb_next, key="heartbeat")
 
     def _start_tx_worker(self) -> None:
         if self._tx_thread and self._tx_thread.is_alive():
@@ -252,82 +649,101 @@ class SerialSession:
         self._tx_stop.clear()
 
         def _tx_runner() -> None:
+            sched = self._tx_sched
             while not self._tx_stop.is_set():
-                job = None
-                high = False
+                self._service_ack_timers()
+                job = sched.get(timeout=self._next_timer_delay())
+                if job is None:
+                    continue
+                if self._tx_coalesce:
+                    self._tx_batch = bytearray()
+                    self._tx_batch_frames = 0
                 try:
-                    # 优先执行高优先级任务（AF 等）
-                    job = self._tx_queue_high.get_nowait()
-                    high = True
-                except Empty:
-                    try:
-                        job = self._tx_queue.get(timeout=0.1)
-                        high = False
-                    except Empty:
-                        continue
-                try:
-                    job()
-                except Exception as e:
-                    self.logger.debug(f"tx worker job error: {e}")
+                    self._run_tx_job(job)
+                    # 合并阶段：本轮仍有未写出的帧时，继续执行已就绪（或窗口内就绪）的任务
+                    while self._tx_batch and not self._tx_stop.is_set():
+                        remain = self._tx_batch_since + self._tx_coalesce_window_sec - time.monotonic()
+                        job = sched.get(timeout=remain if remain > 0 else 0.0)
+                        if job is None:
+                            break
+                        self._run_tx_job(job)
                 finally:
                     try:
-                        if job is not None:
-                            if high:
-                                self._tx_queue_high.task_done()
-                            else:
-                                self._tx_queue.task_done()
-                    except Exception:
-                        pass
+                        self._flush_tx()
+                    except Exception as e:
+                        self.logger.debug(f"tx flush error: {e}")
+                    self._tx_batch = None
 
         self._tx_thread = threading.Thread(target=_tx_runner, name=f"{self.logger.name}-tx", daemon=True)
         self._tx_thread.start()
         self.logger.info("TX worker started")
 
+    def _run_tx_job(self, job: Callable[[], None]) -> None:
+        try:
+            job()
+        except Exception as e:
+            self.logger.debug(f"tx worker job error: {e}")
+
     def _stop_tx_worker(self, drain: bool = False, timeout_sec: float = 1.0) -> None:
-        self._tx_stop.set()
-        self.logger.info("TX worker stopping")
-        # 可选等待队列清空（尽力而为）
+        # 可选等待队列清空（尽力而为；周期心跳/统计任务不计入）
         if drain:
             end = time.monotonic() + float(timeout_sec)
-            while (not self._tx_queue_high.empty() or not self._tx_queue.empty()) and time.monotonic() < end:
+            while len(self._tx_sched) > int(self._tx_sched.pending("heartbeat")) + int(self._tx_sched.pending("metrics")) and time.monotonic() < end:
                 time.sleep(0.01)
+        self._tx_stop.set()
+        self._tx_sched.wake()
+        self.logger.info("TX worker stopping")
         try:
-            if self._tx_thread and self._tx_thread.is_alive():
+            if self._tx_thread and self._tx_thread.is_alive() and threading.current_thread() is not self._tx_thread:
                 self._tx_thread.join(timeout=0.2)
         except Exception:
             pass
         self._tx_thread = None
 
-    def _enqueue_heartbeat(self) -> None:
-        """将一次 A0 心跳发送作为 TX 任务入队（单次尝试，不重试）"""
-        def _job() -> None:
-            try:
-                f = build_a0()
-                # 通过 single_try=True 保持“心跳不重试”的既有语义
-                self.send_and_wait_ack(f, timeout_ms=None, single_try=True)
-            except Exception as e:
-                self.logger.debug(f"heartbeat tx job error: {e}")
-        try:
-            self._tx_queue.put(_job, block=False)
-            self.logger.debug("enqueued heartbeat A0 job")
-        except Exception as e:
-            self.logger.debug(f"enqueue heartbeat job failed: {e}")
-
-    def _enqueue_af(self, seq: int, code: Union[int, AckCode]) -> None:
-        """将 AF 发送作为高优先级 TX 任务入队（不等待 ACK）"""
+    def _enqueue_af(self, seq: int, code: Union[int, AckCode], b1_at: Optional[float] = None) -> None:
+        """
+        将 AF 发送作为高优先级 TX 任务入队（不等待 ACK）；整帧取自 AF 模板缓存。
+        b1_at 为触发本次 AF 的 B1 处理时刻，用于 b1_to_af 时延统计。
+        """
         def _job() -> None:
             try:
-                self._send_frame(build_af(seq=seq, code=code))
+                self._write_blob(encode_af(seq, code), FrameType.AF, seq, 1)
+                if b1_at is not None:
+                    self.metrics.record("b1_to_af", time.monotonic() - b1_at)
             except Exception as e:
                 self.logger.debug(f"AF tx job error: {e}")
         try:
-            self._tx_queue_high.put(_job, block=False)
+            self._tx_sched.put(_job, PRIO_AF)
             self.logger.debug(f"enqueued AF code=0x{int(code):02X} seq={seq}")
         except Exception as e:
             self.logger.debug(f"enqueue AF job failed: {e}")
 
+    def _on_decode_error(self, code: AckCode, seq: int) -> None:
+        """协议层错误回调：未知TYPE/CHECK失败/长度/VAL 错误时回 AF"""
+        try:
+            self.logger.debug(f"decode error -> AF code=0x{int(code):02X} seq={seq}")
+            self._enqueue_af(seq=seq, code=code)
+        except Exception as e:
+            self.logger.debug(f"send AF on decode error failed: {e}")
+
+    def _on_device_info(self, chunk: bytes) -> None:
+        """设备信息（非协议）日志：按 ASCII 写入独立日志文件"""
+        try:
+            msg = chunk.decode("ascii", errors="replace")
+        except Exception:
+            msg = repr(chunk)
+        try:
+            get_device_info_logger().info(msg)
+        except Exception as e:
+            self.logger.debug(f"device-info log failed: {e}")
+
     def _on_bytes(self, data: bytes) -> None:
-        self._rx_buf.extend(data)
+        self._process_rx(data, time.monotonic())
+
+    def _process_rx(self, data: bytes, t_rx: float) -> None:
+        """解码一段 RX 分片；t_rx 为端口读到该分片的时刻（经交接队列时含排队时间）"""
+        if self._rx_handoff is not None:
+            self.metrics.record("rx_to_decode", time.monotonic() - t_rx)
         # HEX 捕获（接收）
         if getattr(self, "_hex_capture", False) and getattr(self, "_hex_incoming", True):
             try:
@@ -336,45 +752,30 @@ class SerialSession:
             except Exception:
                 pass
 
-        # 协议层错误回调：未知TYPE/CHECK失败/长度/VAL 错误时回 AF
-        def _on_err(code: AckCode, seq: int) -> None:
-            try:
-                self.logger.debug(f"decode error -> AF code=0x{int(code):02X} seq={seq}")
-                self._enqueue_af(seq=seq, code=code)
-            except Exception as e:
-                self.logger.debug(f"send AF on decode error failed: {e}")
-
-        # 设备信息（非协议）日志：按 ASCII 写入独立日志文件
-        def _on_g(chunk: bytes) -> None:
-            try:
-                msg = chunk.decode("ascii", errors="replace")
-            except Exception:
-                msg = repr(chunk)
-            try:
-                get_device_info_logger().info(msg)
-            except Exception as e:
-                self.logger.debug(f"device-info log failed: {e}")
-
-        frames = decode_stream(
-            self._rx_buf,
-            on_error=_on_err,
-            on_garbage=_on_g,
-        )
-        for fr in frames:
+        cap = self._capture
+        if cap is not None:
+            cap.record("RX", self.logger.name, data)
+        self.link_stats.rx_raw(len(data))
+        for fr in self._decoder.feed(data):
+            self.link_stats.rx_frame(fr.type.name, MIN_FRAME_LEN + len(fr.val))
             self._handle_frame(fr)
+            self.metrics.record("rx_to_handled", time.monotonic() - t_rx)
 
     def _handle_frame(self, fr: ProtocolFrame) -> None:
         # 记录对端SEQ
         self.last_remote_seq = fr.seq
 
         if fr.type == FrameType.BF:
-            # 收到对端应答，记录结果码并视为在线
-            self._acked[fr.seq] = fr.val[0] if fr.val else 0
+            # 收到对端应答：完成待应答 Future 并视为在线；心跳自身的 BF 不计为业务流量
+            if self._ack_received(fr.seq, fr.val[0] if fr.val else 0) != FrameType.A0:
+                self._last_traffic_at = time.monotonic()
             self._offline_failures = 0
             if self.state != SessionState.CONNECTED:
                 self._set_state(SessionState.CONNECTED)
             return
 
+        self._last_traffic_at = time.monotonic()
+
         if fr.type == FrameType.B0:
             # 设备心跳，回 AF（经 TX 高优先队列）
             self._enqueue_af(seq=fr.seq, code=AckCode.OK)
@@ -386,6 +787,7 @@ class SerialSession:
         if fr.type == FrameType.B1:
             # 重复B1（同seq）幂等：仅重发AF（高优先队列），避免重复下发A1
             if self._last_b1_seq is not None and fr.seq == self._last_b1_seq:
+                self.metrics.inc("b1_duplicates")
                 if getattr(self, "_duplicate_ack_mode", "duplicate_code") == "echo_last":
                     self._enqueue_af(seq=fr.seq, code=self._last_b1_ack_code)
                     self.logger.debug(f"dup B1 seq={fr.seq} echo_last code=0x{int(self._last_b1_ack_code):02X}")
@@ -398,6 +800,7 @@ class SerialSession:
             if self._last_b1_seq is not None:
                 expected = (self._last_b1_seq + 1) & 0xFFFF
                 if fr.seq != expected:
+                    self.metrics.inc("b1_out_of_order")
                     code = AckCode.SEQ_TOO_SMALL if fr.seq < expected else AckCode.SEQ_TOO_LARGE
                     self._enqueue_af(seq=fr.seq, code=code)
                     self._last_b1_ack_code = int(code)
@@ -405,25 +808,40 @@ class SerialSession:
                     return
 
             # 正常顺序：更新并执行业务（将重活丢给 TX 工作者线程，避免占用接收线程）
+            b1_at = time.monotonic()
             self._last_b1_seq = fr.seq
             self.expected_remote_seq = (fr.seq + 1) & 0xFFFF
-            self._enqueue_af(seq=fr.seq, code=AckCode.OK)
+            self._enqueue_af(seq=fr.seq, code=AckCode.OK, b1_at=b1_at)
             self._last_b1_ack_code = int(AckCode.OK)
+            if self.on_b1 is not None:
+                try:
+                    self.on_b1()
+                except Exception as e:
+                    self.logger.debug(f"on_b1 callback error: {e}")
+                return
 
             def _job() -> None:
+                if self._defer_a1(_job):
+                    return
                 try:
+                    # 预计合成耗时超过合并窗口：先写出已缓冲的 AF，不让 AF 等待 A1 合成
+                    if self._compose_ewma_sec > self._tx_coalesce_window_sec:
+                        self._flush_tx()
+                    t0 = time.monotonic()
                     result = self._request_handler()
+                    self._compose_ewma_sec += 0.25 * ((time.monotonic() - t0) - self._compose_ewma_sec)
                     colors: Optional[List[int]] = None
                     if isinstance(result, tuple) and len(result) == 3:
                         indices, attrs, colors = result
                     else:
                         indices, attrs = result  # type: ignore
                     self._send_a1_payload(indices, attrs=attrs, colors=colors)
+                    self.metrics.record("b1_to_a1", time.monotonic() - b1_at)
                 except Exception as e:
                     self.logger.debug(f"tx job error: {e}")
 
             try:
-                self._tx_queue.put(_job, block=False)
+                self._tx_sched.put(_job, PRIO_NORMAL)
                 self.logger.debug(f"enqueued A1 payload job for B1 seq={fr.seq}")
             except Exception as e:
                 self.logger.debug(f"enqueue A1 job failed: {e}")
@@ -431,47 +849,105 @@ class SerialSession:
 
         # 其他 TYPE 最小实现暂不处理
 
-    def _send_a1_payload(self, indices: List[int], attrs: Optional[List[int]] = None, colors: Optional[List[int]] = None) -> None:
+    def _defer_a1(self, job: Callable[[], None]) -> bool:
+        """
+        A1 任务（TX 线程内）是否需要推迟，需要时已重新排队：
+        - 上一个 A1 的结果尚未回调（未得到 BF/超时，或结果回调仍在队列中）：排在其结果回调之后，保持派发与归档一一对应；
+        - 端口发送缓冲积压（适配器慢或停滞）：稍后重试，避免把更多字节压进缓冲。
+        """
+        inflight = self._a1_inflight
+        if inflight is not None:
+            if inflight.done():
+                self._tx_sched.put(job, PRIO_NORMAL)
+            else:
+                inflight.add_done_callback(lambda _f: self._tx_sched.put(job, PRIO_NORMAL))
+            return True
+        if self._port_backpressure():
+            self.metrics.inc("a1_deferred_backpressure")
+            self._tx_sched.put(job, PRIO_NORMAL, at=time.monotonic() + self._tx_backpressure_retry_sec)
+            return True
+        return False
+
+    def push_a1(self, indices: List[int], attrs: Optional[List[int]] = None, colors: Optional[List[int]] = None) -> None:
+        """
+        上位机主动下发 A1（多柜派发：各柜子载荷经此发送，含发出 B1 的柜子，参见 on_b1）：
+        与 B1 路径同样排在在途 A1 结果之后、端口积压时推迟；BF 结果经 on_a1_result 回调。
+        """
+        def _job() -> None:
+            if self._defer_a1(_job):
+                return
+            try:
+                self._send_a1_payload(indices, attrs=attrs, colors=colors)
+            except Exception as e:
+                self.logger.debug(f"push A1 error: {e}")
+                if self.on_a1_result:
+                    self.on_a1_result(False)
+
+        self._tx_sched.put(_job, PRIO_NORMAL)
+
+    def _send_a1_payload(self, indices: List[int], attrs: Optional[List[int]] = None, colors: Optional[List[int]] = None) -> "Future[bool]":
         """
         发送 A1（2B/项位域，单帧下发）：
         - 每项 2 字节：bit15=闪烁；bit14..13=颜色(00红/01绿/10蓝/11预留)；bit12..0=ID(13位)
         - attrs bit0→闪烁；colors 0/1/2 对应 R/G/B；单次请求仅发送一个 A1 seq
         - 空清单：仍发送一帧 A1 并等待 BF（保持统一时序）
+        非阻塞：返回 BF 结果 Future；结果经 TX 队列回调 on_a1_result（与原先同在 TX 线程执行）。
         """
         seq = self.next_seq()
-        frame = build_a1(indices=indices, seq=seq, attrs=attrs, colors=colors)
-        all_ok = self.send_and_wait_ack(frame, timeout_ms=self.cmd_timeout_ms)
-    
-        def close(self, drain_tx: bool = False, close_port: bool = False) -> None:
-            """关闭会话：停止心跳与 TX 工作者，可选清空队列并关闭底层串口。"""
+        frame = build_a1_packed(indices=indices, seq=seq, attrs=attrs, colors=colors)
+        # 超时取 A1 的自适应 RTO（无样本时为 cmd_timeout_ms）加帧长相关余量，参见 expected_timeout_ms()
+        fut = self.send_with_ack(frame)
+        self._a1_inflight = fut
+
+        def _report(f: "Future[bool]") -> None:
+            if self._a1_inflight is f:
+                self._a1_inflight = None
             try:
-                self.stop_heartbeat()
+                all_ok = bool(f.result())
             except Exception:
-                pass
-            try:
-                self._stop_tx_worker(drain=drain_tx)
-            except Exception:
-                pass
-            if close_port:
+                all_ok = False
+            if self.on_a1_result:
                 try:
-                    if hasattr(self.port, "close"):
-                        self.port.close()  # type: ignore[attr-defined]
+                    self.on_a1_result(all_ok)
                 except Exception as e:
-                    self.logger.debug(f"port close failed: {e}")
-    
-        def __del__(self) -> None:
+                    self.logger.debug(f"on_a1_result callback error: {e}")
+
+        fut.add_done_callback(lambda f: self._tx_sched.put(lambda: _report(f), PRIO_NORMAL))
+        return fut
+
+    def close(self, drain_tx: bool = False, close_port: bool = False) -> None:
+        """关闭会话：停止心跳、TX 工作者与 RX 解码线程，待应答项以 False 结束，可选清空队列并关闭底层串口。"""
+        try:
+            self.stop_heartbeat()
+        except Exception:
+            pass
+        try:
+            self._stop_tx_worker(drain=drain_tx)
+        except Exception:
+            pass
+        if self._rx_handoff is not None:
+            self._rx_handoff.close()
+        with self._out_lock:
+            pending = list(self._outstanding.values())
+            self._outstanding.clear()
+        for ent in pending:
+            if not ent.future.done():
+                ent.future.set_result(False)
+        if close_port:
             try:
+                if hasattr(self.port, "close"):
+                    self.port.close()  # type: ignore[attr-defined]
+            except Exception as e:
+                self.logger.debug(f"port close failed: {e}")
+
+    def __del__(self) -> None:
+        try:
+            if getattr(self, "_tx_thread", None) is not None:
                 self._stop_tx_worker(drain=False)
-            except Exception:
-                pass
-            try:
+        except Exception:
+            pass
+        try:
+            if getattr(self, "_hb_active", False):
                 self.stop_heartbeat()
-            except Exception:
-                pass
-            return
-    
-        if self.on_a1_result:
-            try:
-                self.on_a1_result(all_ok)
-            except Exception as e:
-                self.logger.debug(f"on_a1_result callback error: {e}")
+        except Exception:
+            pass
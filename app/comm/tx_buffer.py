@@ -0,0 +1,154 @@
+from __future__ import annotations
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from app.comm.metrics import RateWindow
+from app.storage.config import ConfigRepo
+
+class TxBuffer:
+    """
+    端口级有界发送缓冲（写入方线程 put，端口 I/O 循环 peek/consume 排空）：
+    - put(data, timeout)：空间不足时至多等待 timeout 秒（默认 write_timeout），仍不足则丢弃并计数，不会无限阻塞；
+      单块超过容量时仅在缓冲为空时接受，避免永远无法写入；
+    - check_stall(now)：有待写数据且 write_timeout 内未排空任何字节（适配器停滞）时丢弃缓冲并计 write_timeouts；
+    - backpressure()：待写字节达到 backpressure_bytes 时为 True，供上层推迟合成新帧；
+    - stats()：深度、峰值、1s/10s 排空速率（字节/秒）、丢弃与写超时计数。
+    on_data 在 put 成功后于调用线程执行（锁外），用于唤醒 I/O 循环。
+    """
+    def __init__(
+        self,
+        max_bytes: int = 65536,
+        write_timeout_sec: float = 1.0,
+        backpressure_bytes: int = 2048,
+        on_data: Optional[Callable[[], None]] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_bytes = max(1, int(max_bytes))
+        self.write_timeout_sec = max(0.0, float(write_timeout_sec))
+        self.backpressure_bytes = max(1, int(backpressure_bytes))
+        self.on_data = on_data
+        self._clock = clock
+        self._buf = bytearray()
+        self._cond = threading.Condition()
+        self._progress_at = clock()
+        self._rate = RateWindow(10)
+        self.peak_bytes = 0
+        self.drained_bytes = 0
+        self.dropped_writes = 0
+        self.dropped_bytes = 0
+        self.write_timeouts = 0
+
+    def __len__(self) -> int:
+        return len(self._buf)
+
+    def put(self, data: bytes, timeout: Optional[float] = None) -> bool:
+        n = len(data)
+        wait = self.write_timeout_sec if timeout is None else max(0.0, float(timeout))
+        with self._cond:
+            end = self._clock() + wait
+            while self._buf and len(self._buf) + n > self.max_bytes:
+                remaining = end - self._clock()
+                if remaining <= 0:
+                    self.dropped_writes += 1
+                    self.dropped_bytes += n
+                    return False
+                self._cond.wait(remaining)
+            if not self._buf:
+                self._progress_at = self._clock()
+            self._buf += data
+            if len(self._buf) > self.peak_bytes:
+                self.peak_bytes = len(self._buf)
+            self._cond.notify_all()
+        cb = self.on_data
+        if cb is not None:
+            cb()
+        return True
+
+    def peek(self, limit: int) -> bytes:
+        with self._cond:
+            return bytes(self._buf[:limit])
+
+    def consume(self, n: int) -> None:
+        if n <= 0:
+            return
+        now = self._clock()
+        with self._cond:
+            del self._buf[:n]
+            self._progress_at = now
+            self.drained_bytes += n
+            self._rate.add(n, now)
+            self._cond.notify_all()
+
+    def check_stall(self, now: Optional[float] = None) -> bool:
+        """write_timeout 内无排空进展：丢弃待写数据（上层由 ACK 超时重试），返回是否发生"""
+        if self.write_timeout_sec <= 0:
+            return False
+        now = self._clock() if now is None else now
+        with self._cond:
+            if not self._buf or now - self._progress_at < self.write_timeout_sec:
+                return False
+        return self.abort()
+
+    def abort(self) -> bool:
+        """写超时（停滞或底层写调用超时）：丢弃待写数据并计数"""
+        with self._cond:
+            if not self._buf:
+                return False
+            self.write_timeouts += 1
+            self.dropped_bytes += len(self._buf)
+            self._buf.clear()
+            self._cond.notify_all()
+            return True
+
+    def clear(self) -> None:
+        with self._cond:
+            self._buf.clear()
+            self._cond.notify_all()
+
+    def wait_data(self, timeout: float) -> bool:
+        """阻塞等待有待写数据（I/O 线程空闲时使用）"""
+        with self._cond:
+            if not self._buf:
+                self._cond.wait(max(0.0, float(timeout)))
+            return bool(self._buf)
+
+    def wait_drained(self, timeout: float) -> bool:
+        end = self._clock() + max(0.0, float(timeout))
+        with self._cond:
+            while self._buf:
+                remaining = end - self._clock()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            return True
+
+    def backpressure(self) -> bool:
+        return len(self._buf) >= self.backpressure_bytes
+
+    def stats(self) -> Dict[str, object]:
+        now = self._clock()
+        return {
+            "tx_pending": len(self._buf),
+            "tx_peak": self.peak_bytes,
+            "tx_capacity": self.max_bytes,
+            "tx_backpressure": self.backpressure(),
+            "tx_drain_bps": {"1s": float(self._rate.total(1, now)), "10s": self._rate.total(10, now) / 10.0},
+            "tx_drained_bytes": self.drained_bytes,
+            "tx_dropped_writes": self.dropped_writes,
+            "tx_dropped_bytes": self.dropped_bytes,
+            "tx_write_timeouts": self.write_timeouts,
+        }
+
+def tx_buffer_from_config(on_data: Optional[Callable[[], None]] = None) -> TxBuffer:
+    """按 serial.tx.*（max_bytes / write_timeout_ms / backpressure_bytes）构造"""
+    try:
+        tx = ((ConfigRepo().load().get("serial", {}) or {}).get("tx", {}) or {})
+        return TxBuffer(
+            max_bytes=int(tx.get("max_bytes", 65536)),
+            write_timeout_sec=float(tx.get("write_timeout_ms", 1000)) / 1000.0,
+            backpressure_bytes=int(tx.get("backpressure_bytes", 2048)),
+            on_data=on_data,
+        )
+    except Exception:
+        return TxBuffer(on_data=on_data)
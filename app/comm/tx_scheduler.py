@@ -0,0 +1,114 @@
+from __future__ import annotations
+import heapq
+import itertools
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+Job = Callable[[], None]
+
+# 优先级（数值越小越先执行）：AF 即时应答 > 心跳 A0 > A1 合成/结果回调等普通任务
+PRIO_AF = 0
+PRIO_HEARTBEAT = 1
+PRIO_NORMAL = 2
+
+class _Entry:
+    __slots__ = ("job", "key", "cancelled")
+
+    def __init__(self, job: Job, key: Optional[str]) -> None:
+        self.job = job
+        self.key = key
+        self.cancelled = False
+
+class TxScheduler:
+    """
+    TX 线程唯一的任务队列（替代高/普通两个 Queue）：
+    - put(job, prio, at, key)：at 为最早执行的 monotonic 时刻（None=立即）；
+      key 非空时同 key 至多一个待执行项，重复投递返回 False（用于“至多一个待发心跳”）；
+    - get(timeout)：取已到期任务中优先级最高者，同优先级按入队顺序；
+      无到期任务时阻塞到最近到期时刻、新任务入队、wake() 或超时（timeout=None 为不限时）；
+    - cancel(key)：撤销待执行项。
+    """
+    def __init__(self, clock: Callable[[], float] = time.monotonic) -> None:
+        self._clock = clock
+        self._cond = threading.Condition()
+        self._ready: List[Tuple[int, int, _Entry]] = []
+        self._timers: List[Tuple[float, int, int, _Entry]] = []
+        self._keys: Dict[str, _Entry] = {}
+        self._count = itertools.count()
+        self._size = 0
+        self._woken = False
+
+    def put(self, job: Job, prio: int = PRIO_NORMAL, at: Optional[float] = None, key: Optional[str] = None) -> bool:
+        with self._cond:
+            if key is not None and key in self._keys:
+                return False
+            ent = _Entry(job, key)
+            if key is not None:
+                self._keys[key] = ent
+            n = next(self._count)
+            if at is None or at <= self._clock():
+                heapq.heappush(self._ready, (prio, n, ent))
+            else:
+                heapq.heappush(self._timers, (at, prio, n, ent))
+            self._size += 1
+            self._cond.notify()
+            return True
+
+    def cancel(self, key: str) -> bool:
+        with self._cond:
+            ent = self._keys.pop(key, None)
+            if ent is None:
+                return False
+            ent.cancelled = True
+            self._size -= 1
+            return True
+
+    def pending(self, key: str) -> bool:
+        with self._cond:
+            return key in self._keys
+
+    def wake(self) -> None:
+        """唤醒阻塞中的 get()（例如其他线程登记了更早的 ACK 截止时间）"""
+        with self._cond:
+            self._woken = True
+            self._cond.notify()
+
+    def _pop_ready(self, now: float) -> Optional[Job]:
+        timers = self._timers
+        while timers and timers[0][0] <= now:
+            _at, prio, n, ent = heapq.heappop(timers)
+            heapq.heappush(self._ready, (prio, n, ent))
+        while self._ready:
+            _prio, _n, ent = heapq.heappop(self._ready)
+            if ent.cancelled:
+                continue
+            if ent.key is not None:
+                self._keys.pop(ent.key, None)
+            self._size -= 1
+            return ent.job
+        return None
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Job]:
+        with self._cond:
+            end = None if timeout is None else self._clock() + max(0.0, timeout)
+            while True:
+                now = self._clock()
+                job = self._pop_ready(now)
+                if job is not None:
+                    return job
+                if self._woken:
+                    self._woken = False
+                    return None
+                wait = None if end is None else end - now
+                if self._timers:
+                    due = self._timers[0][0] - now
+                    wait = due if wait is None else min(wait, due)
+                if wait is not None and wait <= 0:
+                    if end is not None and now >= end:
+                        return None
+                    continue
+                self._cond.wait(wait)
+
+    def __len__(self) -> int:
+        return self._size
@@ -0,0 +1,155 @@
+"""
+二进制收发捕获（替代逐字节 hex_dump 文本日志，且不截断）：
+文件 = MAGIC + 记录序列；记录 = 头 <BdHI>(kind, unix 时间戳, 端口号, 长度) + 数据。
+kind：1=RX 原始分片，2=TX 写出块，3=端口声明（数据为 UTF-8 端口名，端口号首次出现前写入）。
+"""
+from __future__ import annotations
+import struct
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, Deque, Dict, Iterator, Optional, Tuple
+
+from app.storage.config import ConfigRepo
+
+MAGIC = b"MIUCAP\x00\x01"
+_REC = struct.Struct("<BdHI")
+KIND_RX = 1
+KIND_TX = 2
+KIND_PORT = 3
+_DIRS = {"RX": KIND_RX, "TX": KIND_TX}
+
+@dataclass(frozen=True)
+class CaptureRecord:
+    ts: float
+    direction: str  # "RX" / "TX"
+    port: str
+    data: bytes
+
+class CaptureWriter:
+    """
+    后台写线程：record() 仅取时间戳并追加到队列（O(1)，不格式化、不做 IO）；
+    写线程每 flush_interval_sec 批量落盘。队列超过 max_queue 时丢弃新记录并计数（dropped）。
+    """
+    def __init__(self, path: str | Path, max_queue: int = 100000, flush_interval_sec: float = 0.2) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_queue = max(1, int(max_queue))
+        self.flush_interval_sec = max(0.01, float(flush_interval_sec))
+        self._q: Deque[Tuple[int, float, str, bytes]] = deque()
+        self._ports: Dict[str, int] = {}
+        self._fh: BinaryIO = open(self.path, "wb")
+        self._fh.write(MAGIC)
+        self.records = 0
+        self.bytes = 0
+        self.dropped = 0
+        self._io_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._th = threading.Thread(target=self._run, name="capture-writer", daemon=True)
+        self._th.start()
+
+    def record(self, direction: str, port: str, data: bytes) -> None:
+        if len(self._q) >= self.max_queue:
+            self.dropped += 1
+            return
+        self._q.append((_DIRS[direction], time.time(), port, bytes(data)))
+
+    def _drain(self) -> None:
+        with self._io_lock:
+            self._drain_locked()
+
+    def _drain_locked(self) -> None:
+        q = self._q
+        if not q:
+            return
+        out = bytearray()
+        while q:
+            kind, ts, port, data = q.popleft()
+            pid = self._ports.get(port)
+            if pid is None:
+                pid = self._ports[port] = len(self._ports)
+                name = port.encode("utf-8")
+                out += _REC.pack(KIND_PORT, ts, pid, len(name)) + name
+            out += _REC.pack(kind, ts, pid, len(data))
+            out += data
+            self.records += 1
+            self.bytes += len(data)
+        self._fh.write(out)
+        self._fh.flush()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.flush_interval_sec):
+            try:
+                self._drain()
+            except Exception:
+                # 捕获失败不影响收发；丢弃本批
+                self._q.clear()
+        try:
+            self._drain()
+        except Exception:
+            pass
+
+    def flush(self) -> None:
+        """同步落盘（测试/退出时使用）"""
+        self._drain()
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._th.is_alive() and threading.current_thread() is not self._th:
+            self._th.join(timeout=2.0)
+        try:
+            self._fh.close()
+        except Exception:
+            pass
+
+    def stats(self) -> Dict[str, int]:
+        return {"records": self.records, "bytes": self.bytes, "dropped": self.dropped, "queued": len(self._q)}
+
+def read_capture(path: str | Path) -> Iterator[CaptureRecord]:
+    """按写入顺序迭代捕获记录（末尾不完整的记录忽略）"""
+    ports: Dict[int, str] = {}
+    with open(path, "rb") as fh:
+        if fh.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"not a capture file: {path}")
+        while True:
+            head = fh.read(_REC.size)
+            if len(head) < _REC.size:
+                return
+            kind, ts, pid, n = _REC.unpack(head)
+            data = fh.read(n)
+            if len(data) < n:
+                return
+            if kind == KIND_PORT:
+                ports[pid] = data.decode("utf-8", errors="replace")
+            elif kind in (KIND_RX, KIND_TX):
+                yield CaptureRecord(ts, "RX" if kind == KIND_RX else "TX", ports.get(pid, str(pid)), data)
+
+_writer: Optional[CaptureWriter] = None
+_writer_lock = threading.Lock()
+
+def get_capture_writer() -> Optional[CaptureWriter]:
+    """
+    进程级捕获写入器（logging.capture.enabled=true 时创建，多个会话共用一个文件）：
+    - 路径：logging.capture.file，支持 time.strftime 占位（默认 logs/capture-%Y%m%d-%H%M%S.bin）
+    - 关闭时返回 None
+    """
+    global _writer
+    with _writer_lock:
+        if _writer is not None:
+            return _writer
+        cfg = ConfigRepo().load()
+        cap = (cfg.get("logging", {}) or {}).get("capture", {}) or {}
+        if not bool(cap.get("enabled", False)):
+            return None
+        path = time.strftime(str(cap.get("file", "logs/capture-%Y%m%d-%H%M%S.bin")))
+        _writer = CaptureWriter(path, max_queue=int(cap.get("max_queue", 100000)))
+        return _writer
+
+def close_capture_writer() -> None:
+    global _writer
+    with _writer_lock:
+        if _writer is not None:
+            _writer.close()
+            _writer = None
@@ -2,11 +2,15 @@ from __future__ import annotations
 import time
 import threading
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional
 
 from app.storage.config import ConfigRepo
 from app.logs.logger import get_logger
+from app.logs.capture import close_capture_writer
 from app.comm.pyserial_port import PySerialPort
+from app.comm.reactor import ReactorSerialPort, close_reactor
+from app.comm.port_supervisor import PortSupervisor, candidate_ports
+from app.comm.device_manager import CabinetRoute, DeviceManager, cabinet_routes
 from app.comm.session import SerialSession
 from app.business.dispatcher import Dispatcher
 from app.business.file_ingress import FileIngressService
@@ -43,40 +47,11 @@ def main() -> int:
 
     threading.Thread(target=_ingress_runner, name="ingress-runner", daemon=True).start()
 
-    # Open real serial port with retries (no simulation/fallback)
-    def _open_port_with_retry() -> Optional[PySerialPort]:
-        backoff = 5.0  # seconds, will increase up to 30s
-        while not stop_evt.is_set():
-            try:
-                c = ConfigRepo().load()
-                sc = (c.get("serial", {}) or {})
-                ports = sc.get("ports") or []
-                baud = int(sc.get("baud", 115200))
-                if not ports:
-                    logger.warning("serial.ports is empty; configure a port list. Retry in 10s.")
-                    time.sleep(10.0)
-                    continue
-                for name in ports:
-                    try:
-                        p = PySerialPort()
-                        p.open(str(name), baud=baud)
-                        logger.info(f"Serial opened on {name} baud={baud}")
-                        return p
-                    except Exception as e:
-                        logger.error(f"Open serial {name} failed: {e}")
-                time.sleep(backoff)
-                backoff = min(backoff * 1.5, 30.0)
-            except Exception as e:
-                logger.error(f"Unexpected error when opening serial: {e}")
-                time.sleep(10.0)
-        return None
-    port = _open_port_with_retry()
-    if port is None:
-        logger.info("Shutdown requested before serial opened.")
-        return 0
-
-    # Session: heartbeat behavior is driven by config (comm.enable_heartbeat, etc.)
-    sess = SerialSession(port, request_handler=dispatcher.request_next_payload, name="session")
+    # Open real serial port(s) with retries (no simulation/fallback); each supervisor reopens its port on hot-plug loss
+    use_reactor = str((cfg.get("serial", {}) or {}).get("io", "thread")).lower() == "reactor"
+
+    def _port_factory():
+        return ReactorSerialPort() if use_reactor else PySerialPort()
 
     def _on_result(ok: bool) -> None:
         try:
@@ -84,7 +59,44 @@ def main() -> int:
         except Exception:
             pass
 
-    sess.on_a1_result = _on_result
+    supervisors: List[PortSupervisor] = []
+    sessions: List[SerialSession] = []
+    manager: Optional[DeviceManager] = None
+    routes = cabinet_routes(cfg)
+    if routes:
+        # One MCU per cabinet (mapping.cabinets): each triplet is split per cabinet and sent to all of them in parallel
+        manager = DeviceManager(routes, request_handler=dispatcher.request_next_payload)
+        manager.on_result = _on_result
+
+        def _open_cabinet(route: CabinetRoute, supervisor: PortSupervisor) -> None:
+            # Each cabinet opens on its own thread: an absent cabinet keeps retrying without holding back the others
+            port = supervisor.open_port()
+            if port is None:
+                return
+            if stop_evt.is_set():
+                port.close()
+                return
+            supervisor.attach(manager.attach(route.name, port))
+            logger.info(f"Cabinet {route.name} attached on {supervisor.port_name}")
+
+        for route in routes:
+            supervisor = PortSupervisor(_port_factory, candidates=lambda r=route: candidate_ports(r.usb, list(r.ports)))
+            supervisors.append(supervisor)
+            threading.Thread(target=_open_cabinet, args=(route, supervisor), name=f"open-{route.name}", daemon=True).start()
+        logger.info(f"Cabinets configured: {', '.join(r.name for r in routes)}")
+    else:
+        supervisor = PortSupervisor(_port_factory)
+        supervisors.append(supervisor)
+        port = supervisor.open_port()
+        if port is None:
+            logger.info("Shutdown requested before serial opened.")
+            return 0
+
+        # Session: heartbeat behavior is driven by config (comm.enable_heartbeat, etc.)
+        sess = SerialSession(port, request_handler=dispatcher.request_next_payload, name="session")
+        sess.on_a1_result = _on_result
+        supervisor.attach(sess)
+        sessions.append(sess)
 
     logger.info("Production flow started. Press Ctrl+C to exit.")
     try:
@@ -95,11 +107,31 @@ def main() -> int:
     finally:
         stop_evt.set()
         try:
-            sess.stop_heartbeat()
+            dispatcher.close()
+        except Exception:
+            pass
+        for sess in sessions:
+            try:
+                sess.stop_heartbeat()
+            except Exception:
+                pass
+        if manager is not None:
+            # Stops the dispatch thread and closes every cabinet session; the supervisors below close the ports
+            try:
+                manager.close()
+            except Exception:
+                pass
+        for supervisor in supervisors:
+            try:
+                supervisor.stop()
+            except Exception:
+                pass
+        try:
+            close_reactor()
         except Exception:
             pass
         try:
-            port.close()
+            close_capture_writer()
         except Exception:
             pass
     return 0
@@ -54,17 +54,81 @@ class ConfigRepo:
 
     def _apply_defaults(self, cfg: Dict[str, Any]) -> None:
 
+        # serial.rx：接收循环模式（auto：Linux 阻塞于 fd 的 select，其他平台阻塞 read(1) + in_waiting；poll：in_waiting 轮询）
+        ser = cfg.setdefault("serial", {})
+        srx = ser.setdefault("rx", {})
+        srx.setdefault("mode", "auto")
+        srx.setdefault("coalesce_max_us", 1000)
+        srx.setdefault("inter_byte_chars", 3)
+        srx.setdefault("read_size", 4096)
+        # serial.io：thread=每个 PySerialPort 一个接收线程；reactor=所有端口共享单线程 selectors 反应器（仅 POSIX）
+        ser.setdefault("io", "thread")
+        # serial.tx：端口有界发送缓冲（I/O 循环排空）；write_timeout_ms 内无写出进展即丢弃待写数据，达到 backpressure_bytes 时上层推迟合成 A1
+        stx = ser.setdefault("tx", {})
+        stx.setdefault("max_bytes", 65536)
+        stx.setdefault("write_timeout_ms", 1000)
+        stx.setdefault("backpressure_bytes", 2048)
+        # serial.supervisor：端口丢失后的重开退避与健康检查周期；serial.usb：按 USB 序列号/VID/PID 找回重新枚举的设备（空为不匹配）
+        ssup = ser.setdefault("supervisor", {})
+        ssup.setdefault("backoff_initial_ms", 200)
+        ssup.setdefault("backoff_max_ms", 5000)
+        ssup.setdefault("health_check_ms", 500)
+        susb = ser.setdefault("usb", {})
+        susb.setdefault("serial_number", "")
+        susb.setdefault("vid", "")
+        susb.setdefault("pid", "")
+
         # comm 默认（依据文档心跳约定，参见 [docs/通信约定.md](docs/通信约定.md:64)）
         comm = cfg.setdefault("comm", {})
         comm.setdefault("enable_heartbeat", True)
         comm.setdefault("heartbeat_interval_seconds", 10)
         comm.setdefault("offline_failure_threshold", 10)
+        # 最近一个心跳周期内收到过有效帧（心跳自身的 BF 除外）时跳过 A0
+        comm.setdefault("heartbeat_skip_on_traffic", True)
         # 兼容门控与负载参数
         comm.setdefault("duplicate_ack_mode", "duplicate_code")  # 可选：echo_last
         # 运行时可调参数（与现有代码行为对齐）
         comm.setdefault("ack_timeout_ms", 1000)
         comm.setdefault("cmd_timeout_ms", 2000)
 
+        # comm.decoder 默认（LEN 上限：A1 按 13 位 ID 空间推导；max_len 可按 TYPE 名覆盖，如 {"A1": 2051}）
+        dec = comm.setdefault("decoder", {})
+        dec.setdefault("a1_max_items", 8191)
+        dec.setdefault("max_len_unknown", 256)
+        dec.setdefault("max_len", {})
+
+        # comm.tx 默认（合并写：同一轮就绪的 AF/A1/A0 一次写出；窗口毫秒为首帧最多等待时长）
+        tx = comm.setdefault("tx", {})
+        tx.setdefault("coalesce_enabled", True)
+        tx.setdefault("coalesce_window_ms", 5)
+        tx.setdefault("coalesce_max_bytes", 4096)
+        tx.setdefault("backpressure_retry_ms", 5)
+
+        # comm.rx_handoff：串口读线程 → 解码线程的有界交接队列（超出 max_chunks/max_bytes 的分片丢弃并计数）
+        rxh = comm.setdefault("rx_handoff", {})
+        rxh.setdefault("enabled", True)
+        rxh.setdefault("max_chunks", 4096)
+        rxh.setdefault("max_bytes", 1048576)
+
+        # comm.ack_store 默认（近期 ACK 记录：超出条数或 TTL 即淘汰，用于迟到/重复/未请求 BF 计数）
+        ack = comm.setdefault("ack_store", {})
+        ack.setdefault("ttl_seconds", 60)
+        ack.setdefault("max_entries", 256)
+
+        # comm.rtt 默认（按帧类型估计 RTT，未显式指定超时的等待取 RTO 并限制在 floor/ceiling 之间）
+        rtt = comm.setdefault("rtt", {})
+        rtt.setdefault("enabled", True)
+        rtt.setdefault("floor_ms", 20)
+        rtt.setdefault("ceiling_ms", 3000)
+
+        # comm.a1_deadline 默认（A1 的 BF 等待按帧长加上线路传输时间与逐灯处理余量）
+        a1d = comm.setdefault("a1_deadline", {})
+        a1d.setdefault("enabled", True)
+        a1d.setdefault("per_led_us", 30)
+
+        # comm.metrics 默认（会话时延直方图与计数器的周期日志，0=关闭，随时可经 SerialSession.stats() 读取）
+        comm.setdefault("metrics", {}).setdefault("log_interval_seconds", 0)
+
         # comm.retry 默认（重试策略为项目约定配置驱动）
         retry = comm.setdefault("retry", {})
         retry.setdefault("enabled", True)
@@ -73,7 +137,12 @@ class ConfigRepo:
         retry.setdefault("backoff_ms", 50)
 
         # dispatcher 默认
-        cfg.setdefault("dispatcher", {}).setdefault("color_order", ["R", "G", "B"])
+        disp = cfg.setdefault("dispatcher", {})
+        disp.setdefault("color_order", ["R", "G", "B"])
+        # 队首预合成的组数（0=关闭，B1 到达时现场解析/映射）
+        disp.setdefault("prefetch_depth", 2)
+        # 多柜派发（mapping.cabinets 非空）：管理线程等待上一次派发各柜结果的上限，超时按失败结束
+        disp.setdefault("cabinet_wait_ms", 5000)
 
         # mapping 默认（兼容旧 snake 键 + leds_per_slot/offset）
         m = cfg.setdefault("mapping", {})
@@ -81,6 +150,8 @@ class ConfigRepo:
         m.setdefault("cols", int(m.get("cols", 0)))
         m.setdefault("leds_per_slot", int(m.get("leds_per_slot", 3)))
         m.setdefault("offset", int(m.get("offset", 0)))
+        # 多柜：每项 {name, ports, usb, sp_groups, led_ranges, led_offset}，空表为单串口（serial.ports）
+        m.setdefault("cabinets", [])
 
         # printing 默认
         pr = cfg.setdefault("printing", {})
@@ -206,6 +277,12 @@ class ConfigRepo:
             except Exception:
                 rot["backup_count"] = 3
 
+        # 二进制收发捕获默认（后台线程写文件，不截断；回放见 app/tools/replay.py）
+        capv = log.setdefault("capture", {})
+        capv.setdefault("enabled", False)
+        capv.setdefault("file", "logs/capture-%Y%m%d-%H%M%S.bin")
+        capv.setdefault("max_queue", 100000)
+
         # HEX 捕获默认
         hexv.setdefault("capture", hexv.get("capture", False))
         hexv.setdefault("incoming", True)
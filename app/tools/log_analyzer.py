@@ -0,0 +1,408 @@
+"""
+离线 HEX 日志分析：流式读取 logs/app.log*（含轮转文件与 .gz），提取 `TX HEX:` / `RX HEX:` 行，
+用 app.comm.protocol.StreamDecoder 按会话（logger 名）重建帧，并按 SEQ 匹配 B1→AF→A1→BF 交互。
+- 时延：b1_to_af / b1_to_a1 / a1_to_bf / b1_to_bf / a0_to_bf（日志时间戳精度为毫秒）；
+- 重试：同 SEQ 的 A1/A0 重复发送；解码错误按错误码计数，杂散字节计数；
+- 间隙：B1 SEQ 跳变（缺失的请求数）与 HEX 流量中超过 --gap-sec 的静默区间；
+- 未完成交互：缺 AF（被拒绝码另计）、缺 A1、缺 BF。
+注意：session 的 HEX 捕获按 logging.hex.max_bytes 截断，超长块会表现为解码错误/半帧。
+
+用法：python -m app.tools.log_analyzer [PATH|DIR|GLOB ...] [--gap-sec S] [--csv FILE] [--json]
+默认分析 logs/app.log*；同一轮转组按 .N 从大到小（由旧到新）读取。
+"""
+from __future__ import annotations
+import argparse
+import binascii
+import csv
+import glob
+import gzip
+import json
+import re
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.comm.metrics import LatencyHistogram
+from app.comm.protocol import AckCode, FrameType, StreamDecoder
+
+_MARK = b" HEX: "
+_ROT_RE = re.compile(r"^(.*?)(?:\.(\d+))?(\.gz)?$")
+_ERR_NAMES = {
+    int(AckCode.UNKNOWN_TYPE): "UNKNOWN_TYPE",
+    int(AckCode.LEN_ERROR): "LEN_ERROR",
+    int(AckCode.SEQ_TOO_SMALL): "SEQ_TOO_SMALL",
+    int(AckCode.SEQ_TOO_LARGE): "SEQ_TOO_LARGE",
+    int(AckCode.VAL_ERROR): "VAL_ERROR",
+    int(AckCode.CHECKSUM_ERROR): "CHECKSUM_ERROR",
+}
+EXCHANGE_LATENCIES = ("b1_to_af", "b1_to_a1", "a1_to_bf", "b1_to_bf", "a0_to_bf")
+A0_SEQ = 0xFFFF
+
+def _rotation_key(path: str) -> Tuple[str, int]:
+    m = _ROT_RE.match(path)
+    base, num = (m.group(1), m.group(2)) if m else (path, None)
+    return base, -(int(num) if num else 0)
+
+def iter_log_files(specs: Iterable[str]) -> List[str]:
+    """展开文件/目录/通配符；同一轮转组由旧到新排序（app.log.3 → app.log.1 → app.log）"""
+    out: List[str] = []
+    for spec in specs:
+        p = Path(spec)
+        if p.is_dir():
+            out.extend(str(x) for x in p.glob("*.log*") if x.is_file())
+        elif any(ch in spec for ch in "*?["):
+            out.extend(x for x in glob.glob(spec) if Path(x).is_file())
+        elif p.is_file():
+            out.append(str(p))
+    return sorted(set(out), key=_rotation_key)
+
+def _open(path: str):
+    return gzip.open(path, "rb") if path.endswith(".gz") else open(path, "rb", buffering=1 << 20)
+
+class _Exchange:
+    __slots__ = ("b1_seq", "b1_at", "af_at", "af_code", "a1_seq", "a1_at", "a1_sends", "bf_at", "bf_code")
+
+    def __init__(self, b1_seq: int, b1_at: float) -> None:
+        self.b1_seq = b1_seq
+        self.b1_at = b1_at
+        self.af_at: Optional[float] = None
+        self.af_code: Optional[int] = None
+        self.a1_seq: Optional[int] = None
+        self.a1_at: Optional[float] = None
+        self.a1_sends = 0
+        self.bf_at: Optional[float] = None
+        self.bf_code: Optional[int] = None
+
+    def status(self) -> str:
+        if self.af_at is None:
+            return "no_af"
+        if self.af_code:
+            return "rejected"
+        if self.a1_at is None:
+            return "no_a1"
+        if self.bf_at is None:
+            return "no_bf"
+        return "ok" if not self.bf_code else "bf_error"
+
+class SessionLog:
+    """单个会话（logger 名）的帧重建与交互匹配状态"""
+    def __init__(self, name: str, gap_sec: float, stale_sec: float, on_exchange=None) -> None:
+        self.name = name
+        self.gap_sec = gap_sec
+        self.stale_sec = stale_sec
+        self.on_exchange = on_exchange
+        self.latency: Dict[str, LatencyHistogram] = {n: LatencyHistogram() for n in EXCHANGE_LATENCIES}
+        self._rx_frames: Dict[FrameType, int] = {}
+        self._tx_frames: Dict[FrameType, int] = {}
+        self.decode_errors: Dict[str, int] = {}
+        self.status: Dict[str, int] = {}
+        self.counters: Dict[str, int] = {
+            "a1_retries": 0, "a0_sent": 0, "a0_retries": 0, "b1_duplicates": 0,
+            "b1_seq_gaps": 0, "b1_missing": 0, "unmatched_bf": 0, "unmatched_af": 0, "unmatched_a1": 0,
+        }
+        self.gaps: List[Tuple[float, float]] = []
+        self.first_ts: Optional[float] = None
+        self.last_ts: Optional[float] = None
+        self._open: "OrderedDict[int, _Exchange]" = OrderedDict()
+        self._by_a1: Dict[int, _Exchange] = {}
+        self._last_b1: Optional[int] = None
+        self._a0_at: Optional[float] = None
+        self._b0_seqs: Dict[int, int] = {}
+        self._dec = {
+            "TX": StreamDecoder(on_error=lambda c, s: self._error("TX", c)),
+            "RX": StreamDecoder(on_error=lambda c, s: self._error("RX", c)),
+        }
+
+    def _error(self, direction: str, code: int) -> None:
+        key = f"{direction}:{_ERR_NAMES.get(int(code), f'0x{int(code):02X}')}"
+        self.decode_errors[key] = self.decode_errors.get(key, 0) + 1
+
+    def _touch(self, ts: float) -> None:
+        last = self.last_ts
+        if last is None:
+            self.first_ts = ts
+        elif ts - last >= self.gap_sec:
+            self.gaps.append((last, ts - last))
+        self.last_ts = ts
+
+    def feed_rx(self, ts: float, data: bytes) -> None:
+        self._touch(ts)
+        counts = self._rx_frames
+        for fr in self._dec["RX"].feed(data):
+            counts[fr.type] = counts.get(fr.type, 0) + 1
+            self._on_rx(ts, fr.type, fr.seq, fr.val)
+
+    def feed_tx(self, ts: float, data: bytes) -> None:
+        self._touch(ts)
+        counts = self._tx_frames
+        for fr in self._dec["TX"].feed(data):
+            counts[fr.type] = counts.get(fr.type, 0) + 1
+            self._on_tx(ts, fr.type, fr.seq, fr.val)
+
+    def _on_rx(self, ts: float, ft: FrameType, seq: int, val: bytes) -> None:
+        if ft == FrameType.B0:
+            self._b0_seqs[seq] = self._b0_seqs.get(seq, 0) + 1
+        elif ft == FrameType.B1:
+            if seq == self._last_b1:
+                self.counters["b1_duplicates"] += 1
+                return
+            if self._last_b1 is not None:
+                missing = (seq - self._last_b1 - 1) & 0xFFFF
+                if 0 < missing < 0x8000:
+                    self.counters["b1_seq_gaps"] += 1
+                    self.counters["b1_missing"] += missing
+            self._last_b1 = seq
+            self._expire(ts)
+            old = self._open.pop(seq, None)
+            if old is not None:
+                self._close(old)
+            self._open[seq] = _Exchange(seq, ts)
+        elif ft == FrameType.BF:
+            code = val[0] if val else 0
+            ex = self._by_a1.pop(seq, None)
+            if ex is not None:
+                ex.bf_at, ex.bf_code = ts, code
+                self.latency["a1_to_bf"].record(ts - ex.a1_at)
+                self.latency["b1_to_bf"].record(ts - ex.b1_at)
+                self._open.pop(ex.b1_seq, None)
+                self._close(ex)
+            elif seq == A0_SEQ and self._a0_at is not None:
+                self.latency["a0_to_bf"].record(ts - self._a0_at)
+                self._a0_at = None
+            else:
+                self.counters["unmatched_bf"] += 1
+
+    def _on_tx(self, ts: float, ft: FrameType, seq: int, val: bytes) -> None:
+        if ft == FrameType.AF:
+            n = self._b0_seqs.get(seq)
+            if n:
+                # 设备心跳 B0 的应答
+                if n > 1:
+                    self._b0_seqs[seq] = n - 1
+                else:
+                    del self._b0_seqs[seq]
+                return
+            ex = self._open.get(seq)
+            if ex is None or ex.af_at is not None:
+                # 重复 B1 的 AF
+                if ex is None and seq != self._last_b1:
+                    self.counters["unmatched_af"] += 1
+                return
+            ex.af_at, ex.af_code = ts, (val[0] if val else 0)
+            self.latency["b1_to_af"].record(ts - ex.b1_at)
+            if ex.af_code:
+                del self._open[seq]
+                self._close(ex)
+        elif ft == FrameType.A1:
+            ex = self._by_a1.get(seq)
+            if ex is not None:
+                ex.a1_sends += 1
+                self.counters["a1_retries"] += 1
+                return
+            for ex in self._open.values():
+                if ex.a1_at is None and ex.af_at is not None:
+                    ex.a1_seq, ex.a1_at, ex.a1_sends = seq, ts, 1
+                    self._by_a1[seq] = ex
+                    self.latency["b1_to_a1"].record(ts - ex.b1_at)
+                    return
+            self.counters["unmatched_a1"] += 1
+        elif ft == FrameType.A0:
+            if self._a0_at is not None:
+                self.counters["a0_retries"] += 1
+            else:
+                self._a0_at = ts
+            self.counters["a0_sent"] += 1
+
+    def _close(self, ex: _Exchange) -> None:
+        st = ex.status()
+        self.status[st] = self.status.get(st, 0) + 1
+        if ex.a1_seq is not None and self._by_a1.get(ex.a1_seq) is ex:
+            del self._by_a1[ex.a1_seq]
+        if self.on_exchange is not None:
+            self.on_exchange(self.name, ex, st)
+
+    def _expire(self, now: float) -> None:
+        """超过 stale_sec 仍未完成的交互按未完成结案，保持匹配表有界"""
+        while self._open:
+            seq, ex = next(iter(self._open.items()))
+            if now - ex.b1_at < self.stale_sec:
+                break
+            del self._open[seq]
+            self._close(ex)
+
+    def finish(self) -> None:
+        while self._open:
+            _seq, ex = self._open.popitem(last=False)
+            self._close(ex)
+        self._a0_at = None
+
+    def report(self, top_gaps: int = 10) -> Dict[str, object]:
+        garbage = sum(int(d.stats().get("garbage_bytes", 0)) for d in self._dec.values())
+        gaps = sorted(self.gaps, key=lambda g: -g[1])[:top_gaps]
+        return {
+            "first": _fmt_ts(self.first_ts),
+            "last": _fmt_ts(self.last_ts),
+            "frames": {
+                **{f"RX:{t.name}": n for t, n in self._rx_frames.items()},
+                **{f"TX:{t.name}": n for t, n in self._tx_frames.items()},
+            },
+            "exchanges": dict(self.status),
+            "latency": {k: h.snapshot() for k, h in self.latency.items()},
+            "counters": dict(self.counters),
+            "decode_errors": dict(self.decode_errors),
+            "garbage_bytes": garbage,
+            "silent_gaps": len(self.gaps),
+            "top_gaps": [{"at": _fmt_ts(at), "sec": round(d, 3)} for at, d in gaps],
+        }
+
+def _fmt_ts(ts: Optional[float]) -> Optional[str]:
+    if ts is None:
+        return None
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(ts)) + f",{int(round(ts * 1000)) % 1000:03d}"
+
+class LogAnalyzer:
+    """
+    逐行喂入日志（bytes），默认日志格式 '%(asctime)s %(levelname)s %(name)s - %(message)s'。
+    仅含 ' HEX: ' 的行会被解析，其余行只做一次子串查找；秒级时间戳解析结果缓存复用。
+    """
+    def __init__(self, gap_sec: float = 5.0, stale_sec: float = 60.0, on_exchange=None) -> None:
+        self.gap_sec = float(gap_sec)
+        self.stale_sec = float(stale_sec)
+        self.on_exchange = on_exchange
+        self.sessions: Dict[str, SessionLog] = {}
+        self.lines = 0
+        self.hex_lines = 0
+        self.bad_lines = 0
+        self.bytes = 0
+        self._sec_cache: Dict[bytes, float] = {}
+        self._by_head: Dict[bytes, SessionLog] = {}
+
+    def _ts(self, line: bytes) -> float:
+        # 行首 b"2025-01-02 03:04:05,678"
+        sec = line[:19]
+        base = self._sec_cache.get(sec)
+        if base is None:
+            if len(self._sec_cache) > 4096:
+                self._sec_cache.clear()
+            base = self._sec_cache[sec] = time.mktime(time.strptime(sec.decode("ascii"), "%Y-%m-%d %H:%M:%S"))
+        return base + int(line[20:23]) / 1000.0
+
+    def _session(self, head: bytes) -> SessionLog:
+        # head = b"<LEVEL> <name> - "；按原始字节缓存，避免逐行切分/解码
+        name = head.split(b" ", 2)[1].decode("utf-8", errors="replace")
+        sess = self.sessions.get(name)
+        if sess is None:
+            sess = self.sessions[name] = SessionLog(name, self.gap_sec, self.stale_sec, self.on_exchange)
+        self._by_head[head] = sess
+        return sess
+
+    def feed_line(self, line: bytes) -> None:
+        self.lines += 1
+        i = line.find(_MARK)
+        if i < 26:
+            return
+        direction = line[i - 2:i]
+        if direction != b"RX" and direction != b"TX":
+            return
+        try:
+            # "<date> <time,ms> <LEVEL> <name> - TX HEX: .."
+            ts = self._ts(line)
+            head = line[24:i - 2]
+            sess = self._by_head.get(head) or self._session(head)
+            data = binascii.unhexlify(line[i + 6:].strip().replace(b" ", b""))
+        except Exception:
+            self.bad_lines += 1
+            return
+        self.hex_lines += 1
+        self.bytes += len(data)
+        if direction == b"RX":
+            sess.feed_rx(ts, data)
+        else:
+            sess.feed_tx(ts, data)
+
+    def feed_file(self, path: str) -> None:
+        with _open(path) as fh:
+            for line in fh:
+                self.feed_line(line)
+
+    def finish(self) -> None:
+        for s in self.sessions.values():
+            s.finish()
+
+    def report(self) -> Dict[str, object]:
+        return {
+            "lines": self.lines,
+            "hex_lines": self.hex_lines,
+            "bad_lines": self.bad_lines,
+            "bytes": self.bytes,
+            "sessions": {k: s.report() for k, s in self.sessions.items()},
+        }
+
+def analyze(paths: Iterable[str], gap_sec: float = 5.0, stale_sec: float = 60.0, on_exchange=None) -> LogAnalyzer:
+    an = LogAnalyzer(gap_sec=gap_sec, stale_sec=stale_sec, on_exchange=on_exchange)
+    for p in paths:
+        an.feed_file(p)
+    an.finish()
+    return an
+
+def _print_text(rep: Dict[str, object], files: List[str], seconds: float) -> None:
+    print(f"files={len(files)} lines={rep['lines']} hex_lines={rep['hex_lines']} bad_lines={rep['bad_lines']} "
+          f"bytes={rep['bytes']} elapsed={seconds:.2f}s")
+    for name, s in rep["sessions"].items():  # type: ignore[union-attr]
+        print(f"\n[{name}] {s['first']} .. {s['last']}")
+        print("  exchanges: " + " ".join(f"{k}={v}" for k, v in sorted(s["exchanges"].items())))
+        for k, v in s["latency"].items():
+            if v["count"]:
+                print(f"  {k:<9} n={v['count']:<7} mean={v['mean_ms']:.1f}ms p50={v['p50_ms']:.1f}ms "
+                      f"p95={v['p95_ms']:.1f}ms p99={v['p99_ms']:.1f}ms max={v['max_ms']:.1f}ms")
+        print("  counters: " + " ".join(f"{k}={v}" for k, v in s["counters"].items() if v))
+        if s["decode_errors"] or s["garbage_bytes"]:
+            errs = " ".join(f"{k}={v}" for k, v in sorted(s["decode_errors"].items()))
+            print(f"  decode errors: {errs or '-'} garbage_bytes={s['garbage_bytes']}")
+        if s["silent_gaps"]:
+            print(f"  silent gaps: {s['silent_gaps']}, longest: " + ", ".join(f"{g['at']} ({g['sec']}s)" for g in s["top_gaps"][:3]))
+
+def main(argv: List[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description="analyze TX/RX HEX lines in app logs")
+    ap.add_argument("paths", nargs="*", default=["logs/app.log*"])
+    ap.add_argument("--gap-sec", type=float, default=5.0, help="HEX 流量静默超过该秒数记为间隙")
+    ap.add_argument("--stale-sec", type=float, default=60.0, help="交互超过该秒数未完成即结案为未完成")
+    ap.add_argument("--csv", help="逐交互明细输出到 CSV 文件")
+    ap.add_argument("--json", action="store_true", help="以 JSON 输出汇总")
+    args = ap.parse_args(argv)
+
+    files = iter_log_files(args.paths)
+    if not files:
+        print("no log files matched")
+        return 1
+    t0 = time.monotonic()
+    fh = open(args.csv, "w", newline="", encoding="utf-8") if args.csv else None
+    try:
+        on_exchange = None
+        if fh is not None:
+            w = csv.writer(fh)
+            w.writerow(["session", "b1_seq", "b1_at", "status", "af_code", "a1_seq", "a1_sends", "bf_code",
+                        "b1_to_af_ms", "b1_to_a1_ms", "a1_to_bf_ms"])
+
+            def _ms(a: Optional[float], b: Optional[float]) -> str:
+                return f"{(b - a) * 1000.0:.0f}" if a is not None and b is not None else ""
+
+            def on_exchange(name: str, ex: _Exchange, st: str) -> None:
+                w.writerow([name, ex.b1_seq, _fmt_ts(ex.b1_at), st, ex.af_code, ex.a1_seq, ex.a1_sends, ex.bf_code,
+                            _ms(ex.b1_at, ex.af_at), _ms(ex.b1_at, ex.a1_at), _ms(ex.a1_at, ex.bf_at)])
+
+        an = analyze(files, gap_sec=args.gap_sec, stale_sec=args.stale_sec, on_exchange=on_exchange)
+    finally:
+        if fh is not None:
+            fh.close()
+    rep = an.report()
+    elapsed = time.monotonic() - t0
+    if args.json:
+        print(json.dumps({"files": files, "elapsed_sec": elapsed, **rep}, indent=2, ensure_ascii=False))
+    else:
+        _print_text(rep, files, elapsed)
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,494 @@
+"""
+下位机（MCU）模拟器与多设备端到端压测（协议见 docs/通信约定.md）：
+- McuEmulator：按设定间隔发 B1（未收到 A1 时同 SEQ 重发），收到 A1 校验 SEQ 后解码到模拟 LED 帧缓冲，
+  经处理时延回 BF；A0 回 BF(FFFF)；可注入设备日志噪声、按比例丢弃收到的 A1/A0、将输出拆成随机分片；
+- run_load：为每台设备生成临时三色组文件，驱动真实 Dispatcher + SerialSession（内存端口，或 pty + PySerialPort / ReactorSerialPort），
+  统计三色组/小时、时延分位数与失败计数，作为容量基准。
+
+用法：python -m app.tools.mcu_emulator [--devices N] [--duration S] [--triplets K] [--transport memory|pty|reactor]
+      [--b1-interval-ms MS] [--a1-delay-ms MS] [--a0-delay-ms MS] [--noise P] [--drop P] [--json]
+"""
+from __future__ import annotations
+import argparse
+import heapq
+import itertools
+import json
+import os
+import random
+import select
+import shutil
+import tempfile
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+from app.comm.metrics import LatencyHistogram
+from app.comm.protocol import A1_MAX_ITEMS, AckCode, FrameType, ProtocolFrame, StreamDecoder, encode_frame
+from app.comm.serial_port import FakeSerialPort, SerialPortBase
+from app.storage.config import ConfigRepo
+
+@dataclass
+class EmulatorConfig:
+    b1_interval_sec: float = 0.05     # 相邻两次 B1 的最小间隔（上一交互完成后才发下一条）
+    request_timeout_sec: float = 3.0  # 发出 B1 后等待 A1 的时限，超时同 SEQ 重发
+    max_b1_retries: int = 3           # 同 SEQ 重发超过该次数仍无 A1：放弃本次请求，SEQ 前进
+    a1_delay_sec: float = 0.005       # 收到 A1 到回 BF 的处理时延
+    a1_per_led_sec: float = 0.0       # 按点亮 LED 数追加的处理时延
+    a0_delay_sec: float = 0.002       # 收到 A0 到回 BF 的时延
+    b0_interval_sec: float = 0.0      # 设备心跳 B0 间隔（0 关闭）
+    noise_prob: float = 0.0           # 每次发 B1 前插入一行设备日志的概率
+    drop_prob: float = 0.0            # 收到的 A1/A0 被丢弃（不处理、不回 BF）的概率
+    max_chunk: int = 0                # >0 时输出按 1..max_chunk 字节随机分片写出
+    led_count: int = A1_MAX_ITEMS
+    max_requests: int = 0             # >0 时发满该数量的 B1 交互后停止请求
+    seed: Optional[int] = None
+
+class McuEmulator:
+    """
+    单台下位机：独立线程驱动定时器与收包处理；端口回调只入队，避免在上位机 TX 线程内执行设备逻辑。
+    帧缓冲 framebuffer[id]：0=灭，否则 (颜色+1) | 0x80(闪烁)；每个新 A1 覆盖整屏。
+    """
+    def __init__(self, port: SerialPortBase, cfg: Optional[EmulatorConfig] = None, name: str = "mcu") -> None:
+        self.port = port
+        self.cfg = cfg or EmulatorConfig()
+        self.name = name
+        self._rng = random.Random(self.cfg.seed)
+        self._dec = StreamDecoder()
+        self._rx: Deque[bytes] = deque()
+        self._cv = threading.Condition()
+        self._timers: List[Tuple[float, int, Callable[[], None]]] = []
+        self._n = itertools.count()
+        self._stop = False
+        self._th: Optional[threading.Thread] = None
+        self.framebuffer = bytearray(self.cfg.led_count + 1)
+        self.lit = 0
+        # 请求状态（B1 SEQ 从 0 开始逐次 +1）
+        self._b1_seq = 0
+        self._b1_first_at: Optional[float] = None
+        self._b1_timer = 0
+        self._b1_tries = 0
+        self._requests = 0
+        # 收到 A1 的 SEQ 校验
+        self._last_a1_seq: Optional[int] = None
+        self._last_a1_code = int(AckCode.OK)
+        self.cycle = LatencyHistogram()     # B1 首发 → 收到 A1
+        self.counters: Dict[str, int] = {
+            "b1_sent": 0, "b1_retries": 0, "b1_abandoned": 0, "af_received": 0, "a1_received": 0, "a1_duplicates": 0,
+            "a1_seq_errors": 0, "a1_dropped": 0, "a0_received": 0, "a0_dropped": 0, "bf_sent": 0,
+            "b0_sent": 0, "noise_lines": 0, "leds_out_of_range": 0, "decode_errors": 0,
+        }
+        self._dec.on_error = lambda _c, _s: self._inc("decode_errors")
+        port.set_rx_callback(self._on_bytes)
+
+    # ---- 生命周期 ----
+    def start(self) -> None:
+        self._stop = False
+        self._th = threading.Thread(target=self._run, name=f"{self.name}-emu", daemon=True)
+        self._th.start()
+        self._at(0.0, self._send_b1)
+        if self.cfg.b0_interval_sec > 0:
+            self._at(self.cfg.b0_interval_sec, self._send_b0)
+
+    def stop(self) -> None:
+        with self._cv:
+            self._stop = True
+            self._cv.notify()
+        th = self._th
+        if th is not None and th is not threading.current_thread():
+            th.join(timeout=2.0)
+        self._th = None
+
+    def _inc(self, key: str, n: int = 1) -> None:
+        self.counters[key] = self.counters.get(key, 0) + n
+
+    def _at(self, delay: float, fn: Callable[[], None]) -> None:
+        with self._cv:
+            heapq.heappush(self._timers, (time.monotonic() + max(0.0, delay), next(self._n), fn))
+            self._cv.notify()
+
+    def _on_bytes(self, data: bytes) -> None:
+        with self._cv:
+            self._rx.append(bytes(data))
+            self._cv.notify()
+
+    def _run(self) -> None:
+        while True:
+            with self._cv:
+                while not self._stop and not self._rx:
+                    now = time.monotonic()
+                    if self._timers and self._timers[0][0] <= now:
+                        break
+                    self._cv.wait(self._timers[0][0] - now if self._timers else None)
+                if self._stop:
+                    return
+                chunks = list(self._rx)
+                self._rx.clear()
+                due: List[Callable[[], None]] = []
+                now = time.monotonic()
+                while self._timers and self._timers[0][0] <= now:
+                    due.append(heapq.heappop(self._timers)[2])
+            for ch in chunks:
+                for fr in self._dec.feed(ch):
+                    self._handle(fr)
+            for fn in due:
+                try:
+                    fn()
+                except Exception:
+                    pass
+
+    # ---- 发送 ----
+    def _write(self, data: bytes) -> None:
+        mc = self.cfg.max_chunk
+        if mc <= 0:
+            self.port.write_bytes(data)
+            return
+        pos = 0
+        while pos < len(data):
+            n = self._rng.randint(1, mc)
+            self.port.write_bytes(data[pos:pos + n])
+            pos += n
+
+    def _send(self, ft: FrameType, seq: int, val: bytes = b"") -> None:
+        self._write(encode_frame(ProtocolFrame(ft, seq, val)))
+
+    def _send_b1(self) -> None:
+        if self.cfg.max_requests > 0 and self._requests >= self.cfg.max_requests:
+            return
+        if self.cfg.noise_prob > 0 and self._rng.random() < self.cfg.noise_prob:
+            self._write(f"[{self.name}] tick={int(time.monotonic() * 1000)} leds={self.lit}\r\n".encode("ascii"))
+            self._inc("noise_lines")
+        if self._b1_first_at is None:
+            self._b1_first_at = time.monotonic()
+            self._b1_tries = 0
+        else:
+            self._inc("b1_retries")
+        self._send(FrameType.B1, self._b1_seq)
+        self._inc("b1_sent")
+        self._b1_tries += 1
+        # 超时未收到 A1：同 SEQ 重发（对端按重复 B1 处理），超过次数则放弃本次请求
+        self._b1_timer += 1
+        token = self._b1_timer
+        self._at(self.cfg.request_timeout_sec, lambda: self._b1_timer == token and self._on_request_timeout())
+
+    def _on_request_timeout(self) -> None:
+        if self._b1_tries <= self.cfg.max_b1_retries:
+            self._send_b1()
+            return
+        self._inc("b1_abandoned")
+        self._finish_request()
+
+    def _finish_request(self) -> None:
+        self._b1_first_at = None
+        self._b1_timer += 1  # 取消重发
+        self._b1_seq = (self._b1_seq + 1) & 0xFFFF
+        self._requests += 1
+        self._at(self.cfg.b1_interval_sec, self._send_b1)
+
+    def _send_b0(self) -> None:
+        self._send(FrameType.B0, 0xFFFF)
+        self._inc("b0_sent")
+        self._at(self.cfg.b0_interval_sec, self._send_b0)
+
+    # ---- 接收 ----
+    def _handle(self, fr: ProtocolFrame) -> None:
+        if fr.type == FrameType.AF:
+            if fr.seq == self._b1_seq:
+                self._inc("af_received")
+        elif fr.type == FrameType.A0:
+            self._inc("a0_received")
+            if self.cfg.drop_prob > 0 and self._rng.random() < self.cfg.drop_prob:
+                self._inc("a0_dropped")
+                return
+            self._at(self.cfg.a0_delay_sec, lambda: self._send_bf(0xFFFF, int(AckCode.OK)))
+        elif fr.type == FrameType.A1:
+            self._inc("a1_received")
+            if self.cfg.drop_prob > 0 and self._rng.random() < self.cfg.drop_prob:
+                self._inc("a1_dropped")
+                return
+            self._on_a1(fr)
+
+    def _send_bf(self, seq: int, code: int) -> None:
+        self._send(FrameType.BF, seq, bytes([code & 0xFF]))
+        self._inc("bf_sent")
+
+    def _on_a1(self, fr: ProtocolFrame) -> None:
+        seq = fr.seq
+        last = self._last_a1_seq
+        if last is not None and seq == last:
+            # 重复指令包：仅重发应答
+            self._inc("a1_duplicates")
+            code = self._last_a1_code
+            self._at(self.cfg.a1_delay_sec, lambda: self._send_bf(seq, code))
+            return
+        if last is not None and seq != 0 and seq != ((last + 1) & 0xFFFF):
+            self._inc("a1_seq_errors")
+            code = int(AckCode.SEQ_TOO_SMALL if seq < last else AckCode.SEQ_TOO_LARGE)
+            self._at(self.cfg.a1_delay_sec, lambda: self._send_bf(seq, code))
+            return
+        self._last_a1_seq = seq
+        self._last_a1_code = int(AckCode.OK)
+        n = self._render(fr.val)
+        if self._b1_first_at is not None:
+            self.cycle.record(time.monotonic() - self._b1_first_at)
+            self._finish_request()
+        delay = self.cfg.a1_delay_sec + n * self.cfg.a1_per_led_sec
+        self._at(delay, lambda: self._send_bf(seq, int(AckCode.OK)))
+
+    def _render(self, val: bytes) -> int:
+        fb = self.framebuffer
+        fb[:] = bytes(len(fb))
+        n = 0
+        for i in range(0, len(val) - 1, 2):
+            w = val[i] | (val[i + 1] << 8)
+            led = w & 0x1FFF
+            if led >= len(fb) or led == 0:
+                self._inc("leds_out_of_range")
+                continue
+            fb[led] = (((w >> 13) & 3) + 1) | (0x80 if w & 0x8000 else 0)
+            n += 1
+        self.lit = n
+        return n
+
+    def requests_done(self) -> int:
+        return self._requests
+
+class PtyDevicePort(SerialPortBase):
+    """pty 主端（设备侧）：读线程 select + os.read 回调，write_bytes 直接 os.write；从端路径交给 PySerialPort 打开"""
+    def __init__(self) -> None:
+        super().__init__()
+        import pty
+        import tty
+        self.master_fd, self._slave_fd = pty.openpty()
+        tty.setraw(self._slave_fd)
+        self.slave_name = os.ttyname(self._slave_fd)
+        self._stop = threading.Event()
+        self._th = threading.Thread(target=self._rx_loop, name="pty-device-rx", daemon=True)
+        self._th.start()
+
+    def _rx_loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                r, _w, _x = select.select([self.master_fd], [], [], 0.1)
+                if not r:
+                    continue
+                data = os.read(self.master_fd, 65536)
+            except OSError:
+                return
+            cb = self._rx_cb
+            if data and cb:
+                cb(data)
+
+    def write_bytes(self, data: bytes) -> None:
+        view = memoryview(bytes(data))
+        while view:
+            n = os.write(self.master_fd, view)
+            view = view[n:]
+
+    def close(self) -> None:
+        self._stop.set()
+        self._th.join(timeout=1.0)
+        for fd in (self.master_fd, self._slave_fd):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+def _sp_ranges(cfg: Dict) -> List[Tuple[int, int]]:
+    groups = ((cfg.get("sp_mapping", {}) or {}).get("groups") or [])
+    out = []
+    for g in groups:
+        try:
+            out.append((int(g["start_sp"]), int(g["end_sp"])))
+        except Exception:
+            continue
+    return out or [(1, 70)]
+
+def make_triplets(work_dir: Path, count: int, sp_per_file: int = 20, seed: Optional[int] = None) -> None:
+    """在 work_dir 生成 count 个三色组（3×(txt+jpg)），txt 为“编号 名称 百分比”表格，SP 取自配置 sp_mapping.groups"""
+    rng = random.Random(seed)
+    sps = [sp for lo, hi in _sp_ranges(ConfigRepo().load()) for sp in range(lo, hi + 1)]
+    work_dir.mkdir(parents=True, exist_ok=True)
+    for t in range(count):
+        for k in range(3):
+            stem = f"40-50-{t:06d}-N{k + 1}"
+            rows = ["编号 名称 面积百分比"]
+            for i, sp in enumerate(sorted(rng.sample(sps, min(sp_per_file, len(sps)))), start=1):
+                rows.append(f"{i}         SP{sp:04d}                        {rng.uniform(0.1, 30.0):.2f}%")
+            (work_dir / f"{stem}.txt").write_text("\n".join(rows) + "\n", encoding="utf-8")
+            (work_dir / f"{stem}.jpg").write_bytes(b"\xff\xd8\xff\xd9")
+
+@dataclass
+class _Device:
+    name: str
+    emu: McuEmulator
+    session: object
+    dispatcher: object
+    ports: Tuple[SerialPortBase, SerialPortBase]
+    ok: int = 0
+    failed: int = 0
+
+def run_load(
+    devices: int = 1,
+    triplets: int = 20,
+    duration_sec: float = 60.0,
+    transport: str = "memory",
+    cfg: Optional[EmulatorConfig] = None,
+    sp_per_file: int = 20,
+    work_root: Optional[Path] = None,
+) -> Dict[str, object]:
+    """
+    N 台设备并行压测：每台设备独立的 work/done/error 目录、Dispatcher 与 SerialSession；
+    全部三色组归档或到达 duration_sec 即结束。返回汇总报告（dict）。
+    """
+    from app.business.dispatcher import Dispatcher
+    from app.comm.session import SerialSession
+
+    base_cfg = cfg or EmulatorConfig()
+    root = Path(work_root) if work_root else Path(tempfile.mkdtemp(prefix="mcu-load-"))
+    owns_root = work_root is None
+    devs: List[_Device] = []
+    done = threading.Event()
+    lock = threading.Lock()
+    try:
+        for i in range(devices):
+            name = f"dev{i}"
+            wd = root / name
+            make_triplets(wd / "work", triplets, sp_per_file=sp_per_file, seed=(base_cfg.seed or 0) + i)
+            disp = Dispatcher(work_dir=wd / "work")
+            disp.done_dir, disp.error_dir = wd / "done", wd / "error"
+            if transport in ("pty", "reactor"):
+                from app.comm.pyserial_port import PySerialPort
+                from app.comm.reactor import ReactorSerialPort
+                dev_port: SerialPortBase = PtyDevicePort()
+                host_port: SerialPortBase = ReactorSerialPort() if transport == "reactor" else PySerialPort()
+                host_port.open(dev_port.slave_name, baud=115200)  # type: ignore[attr-defined]
+            else:
+                host_port, dev_port = FakeSerialPort(), FakeSerialPort()
+                host_port.connect_peer(dev_port)  # type: ignore[attr-defined]
+            dcfg = EmulatorConfig(**{**base_cfg.__dict__, "seed": (base_cfg.seed or 0) + i, "max_requests": triplets})
+            emu = McuEmulator(dev_port, dcfg, name=name)
+            sess = SerialSession(host_port, request_handler=disp.request_next_payload, name=name)
+            dev = _Device(name, emu, sess, disp, (host_port, dev_port))
+
+            def _on_result(ok: bool, dev: _Device = dev) -> None:
+                try:
+                    dev.dispatcher.archive_pending(success=ok)  # type: ignore[attr-defined]
+                except Exception:
+                    pass
+                with lock:
+                    if ok:
+                        dev.ok += 1
+                    else:
+                        dev.failed += 1
+                    if all(d.ok + d.failed >= triplets for d in devs):
+                        done.set()
+
+            sess.on_a1_result = _on_result  # type: ignore[attr-defined]
+            devs.append(dev)
+        t0 = time.monotonic()
+        for d in devs:
+            d.emu.start()
+        done.wait(duration_sec)
+        elapsed = time.monotonic() - t0
+        return _report(devs, elapsed, transport)
+    finally:
+        for d in devs:
+            d.emu.stop()
+            try:
+                d.session.close()  # type: ignore[attr-defined]
+            except Exception:
+                pass
+            try:
+                d.dispatcher.close()  # type: ignore[attr-defined]
+            except Exception:
+                pass
+            for p in d.ports:
+                try:
+                    p.close()
+                except Exception:
+                    pass
+        if owns_root:
+            shutil.rmtree(root, ignore_errors=True)
+
+def _report(devs: List[_Device], elapsed: float, transport: str) -> Dict[str, object]:
+    ok = sum(d.ok for d in devs)
+    failed = sum(d.failed for d in devs)
+    cycle = LatencyHistogram()
+    host: Dict[str, LatencyHistogram] = {}
+    emu_counters: Dict[str, int] = {}
+    host_counters: Dict[str, int] = {}
+    per_device = {}
+    for d in devs:
+        cycle.merge(d.emu.cycle)
+        for k, v in d.emu.counters.items():
+            emu_counters[k] = emu_counters.get(k, 0) + v
+        m = d.session.metrics  # type: ignore[attr-defined]
+        for k, h in m.latency.items():
+            host.setdefault(k, LatencyHistogram()).merge(h)
+        for k, v in m.counters.items():
+            host_counters[k] = host_counters.get(k, 0) + v
+        per_device[d.name] = {"ok": d.ok, "failed": d.failed, "lit": d.emu.lit, "cycle": d.emu.cycle.snapshot()}
+    return {
+        "transport": transport,
+        "devices": len(devs),
+        "elapsed_sec": elapsed,
+        "triplets_ok": ok,
+        "triplets_failed": failed,
+        "triplets_per_hour": ok / elapsed * 3600.0 if elapsed > 0 else 0.0,
+        "latency": {"device_b1_to_a1": cycle.snapshot(), **{k: h.snapshot() for k, h in host.items()}},
+        "emulator": emu_counters,
+        "host": host_counters,
+        "per_device": per_device,
+    }
+
+def main(argv: List[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description="MCU emulator and end-to-end load generator")
+    ap.add_argument("--devices", type=int, default=1)
+    ap.add_argument("--triplets", type=int, default=20, help="每台设备的三色组数量")
+    ap.add_argument("--duration", type=float, default=60.0, help="最长运行秒数")
+    ap.add_argument("--transport", choices=("memory", "pty", "reactor"), default="memory")
+    ap.add_argument("--sp-per-file", type=int, default=20)
+    ap.add_argument("--b1-interval-ms", type=float, default=50.0)
+    ap.add_argument("--request-timeout-ms", type=float, default=3000.0)
+    ap.add_argument("--a1-delay-ms", type=float, default=5.0)
+    ap.add_argument("--a1-per-led-us", type=float, default=0.0)
+    ap.add_argument("--a0-delay-ms", type=float, default=2.0)
+    ap.add_argument("--b0-interval-ms", type=float, default=0.0)
+    ap.add_argument("--noise", type=float, default=0.0, help="每次 B1 前插入设备日志的概率")
+    ap.add_argument("--drop", type=float, default=0.0, help="丢弃收到的 A1/A0 的概率")
+    ap.add_argument("--max-chunk", type=int, default=0, help="输出随机分片的最大字节数（0 不分片）")
+    ap.add_argument("--seed", type=int, default=None)
+    ap.add_argument("--json", action="store_true")
+    args = ap.parse_args(argv)
+
+    cfg = EmulatorConfig(
+        b1_interval_sec=args.b1_interval_ms / 1000.0,
+        request_timeout_sec=args.request_timeout_ms / 1000.0,
+        a1_delay_sec=args.a1_delay_ms / 1000.0,
+        a1_per_led_sec=args.a1_per_led_us / 1_000_000.0,
+        a0_delay_sec=args.a0_delay_ms / 1000.0,
+        b0_interval_sec=args.b0_interval_ms / 1000.0,
+        noise_prob=args.noise,
+        drop_prob=args.drop,
+        max_chunk=args.max_chunk,
+        seed=args.seed,
+    )
+    rep = run_load(args.devices, args.triplets, args.duration, args.transport, cfg, sp_per_file=args.sp_per_file)
+    if args.json:
+        print(json.dumps(rep, indent=2))
+        return 0
+    print(f"transport={rep['transport']} devices={rep['devices']} elapsed={rep['elapsed_sec']:.2f}s "
+          f"ok={rep['triplets_ok']} failed={rep['triplets_failed']} triplets/hour={rep['triplets_per_hour']:.0f}")
+    for name, v in rep["latency"].items():  # type: ignore[union-attr]
+        if v["count"]:
+            print(f"  {name:<16} n={v['count']:<6} p50={v['p50_ms']:.2f}ms p95={v['p95_ms']:.2f}ms "
+                  f"p99={v['p99_ms']:.2f}ms max={v['max_ms']:.2f}ms")
+    print("  emulator: " + " ".join(f"{k}={v}" for k, v in rep["emulator"].items() if v))  # type: ignore[union-attr]
+    print("  host: " + " ".join(f"{k}={v}" for k, v in sorted(rep["host"].items()) if v))  # type: ignore[union-attr]
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
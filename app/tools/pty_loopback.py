@@ -0,0 +1,86 @@
+"""
+pty 回环测试台：在没有串口硬件的 POSIX 机器上，用伪终端对端到端运行真实端口实现（fd 读写、分片与时序均为真实路径）：
+- PtyLoopback：设备端为 pty 主端（PtyDevicePort），主机端以 PySerialPort（默认）或 ReactorSerialPort 打开从端；
+- ScriptedMcu：脚本化下位机，对主机发来的每个完整帧调用 responder(frame) 并写回应答帧，记录收到的帧；
+  需要完整设备行为（B1 请求、SEQ 校验、LED 帧缓冲）时在 loop.device 上挂 McuEmulator。
+供 tests/conftest.py 的 pty_loopback 夹具与 benchmarks/bench_pty_loopback.py 使用。
+"""
+from __future__ import annotations
+import threading
+import time
+from typing import Callable, List, Optional
+
+from app.comm.protocol import AckCode, FrameType, ProtocolFrame, StreamDecoder, encode_frame
+from app.comm.serial_port import SerialPortBase
+from app.tools.mcu_emulator import PtyDevicePort
+
+Responder = Callable[[ProtocolFrame], List[ProtocolFrame]]
+
+def bf_responder(frame: ProtocolFrame) -> List[ProtocolFrame]:
+    """最小应答：A1/A0 回 BF(OK)，其他帧不应答"""
+    if frame.type in (FrameType.A1, FrameType.A0):
+        return [ProtocolFrame(FrameType.BF, frame.seq, bytes([int(AckCode.OK)]))]
+    return []
+
+class ScriptedMcu:
+    """脚本化下位机：应答在设备端读线程内直接写回（不引入额外调度延迟）"""
+    def __init__(self, port: SerialPortBase, responder: Optional[Responder] = bf_responder) -> None:
+        self.port = port
+        self.responder = responder
+        self.frames: List[ProtocolFrame] = []
+        self._dec = StreamDecoder()
+        self._cv = threading.Condition()
+        port.set_rx_callback(self._on_bytes)
+
+    def _on_bytes(self, data: bytes) -> None:
+        for fr in self._dec.feed(data):
+            with self._cv:
+                self.frames.append(fr)
+                self._cv.notify_all()
+            if self.responder is not None:
+                for out in self.responder(fr):
+                    self.send(out)
+
+    def send(self, frame: ProtocolFrame) -> None:
+        self.port.write_bytes(encode_frame(frame))
+
+    def wait_frames(self, count: int, timeout: float = 2.0) -> List[ProtocolFrame]:
+        """等待累计收到 count 个帧（超时返回已收到的部分）"""
+        end = time.monotonic() + timeout
+        with self._cv:
+            while len(self.frames) < count:
+                remaining = end - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cv.wait(remaining)
+            return list(self.frames)
+
+class PtyLoopback:
+    """一对 pty：device 为设备端（主端），host 为以 port_factory 构造并打开从端的真实端口"""
+    def __init__(self, port_factory: Optional[Callable[[], SerialPortBase]] = None, baud: int = 115200) -> None:
+        if port_factory is None:
+            from app.comm.pyserial_port import PySerialPort
+            port_factory = PySerialPort
+        self.device = PtyDevicePort()
+        self.slave_name = self.device.slave_name
+        self.host = port_factory()
+        try:
+            self.host.open(self.slave_name, baud=baud)
+        except Exception:
+            self.device.close()
+            raise
+
+    def scripted(self, responder: Optional[Responder] = bf_responder) -> ScriptedMcu:
+        return ScriptedMcu(self.device, responder)
+
+    def close(self) -> None:
+        try:
+            self.host.close()
+        finally:
+            self.device.close()
+
+    def __enter__(self) -> "PtyLoopback":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
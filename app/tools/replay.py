@@ -0,0 +1,150 @@
+"""
+捕获回放：将二进制捕获（app/logs/capture.py）中的 RX 分片经 FakeSerialPort 喂给 SerialSession，复现现场交互。
+- 节奏：--speed 1 为原速，10 为 10 倍速；--speed 0 不等待，每个 RX 分片后等会话 TX 调度空闲再喂下一片（顺序确定）；
+- A1 内容：从捕获的 TX 中解析 A1 VAL 还原 (indices, attrs, colors)，按顺序作为 request_handler 返回值，下发内容与现场一致；
+- 结束后输出会话 stats()，并对比回放 TX 与捕获 TX 的帧序列（TYPE/SEQ，不含时序相关的心跳 A0）。
+
+用法：python -m app.tools.replay CAPTURE [--port NAME] [--speed X] [--json]
+"""
+from __future__ import annotations
+import argparse
+import json
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from app.comm.protocol import FrameType, StreamDecoder
+from app.comm.serial_port import FakeSerialPort
+from app.comm.session import SerialSession
+from app.logs.capture import CaptureRecord, read_capture
+
+Payload = Tuple[List[int], Optional[List[int]], Optional[List[int]]]
+
+def decode_a1_val(val: bytes) -> Payload:
+    """A1 VAL（2B/项：bit15=闪烁，bit14..13=颜色，bit12..0=ID）还原为 (indices, attrs, colors)"""
+    words = [val[i] | (val[i + 1] << 8) for i in range(0, len(val) - 1, 2)]
+    indices = [w & 0x1FFF for w in words]
+    attrs = [(w >> 15) & 1 for w in words]
+    colors = [(w >> 13) & 3 for w in words]
+    return indices, attrs, colors
+
+def _frames(chunks: List[bytes]) -> List[Tuple[FrameType, int, bytes]]:
+    dec = StreamDecoder()
+    return [(f.type, f.seq, bytes(f.val)) for ch in chunks for f in dec.feed(ch)]
+
+@dataclass
+class ReplayResult:
+    port: str
+    rx_chunks: int
+    rx_bytes: int
+    seconds: float
+    captured_tx: List[Tuple[str, int]]
+    replayed_tx: List[Tuple[str, int]]
+    stats: Dict[str, object] = field(default_factory=dict)
+
+    @property
+    def tx_match(self) -> bool:
+        return self.captured_tx == self.replayed_tx
+
+    def first_mismatch(self) -> Optional[int]:
+        for i, (a, b) in enumerate(zip(self.captured_tx, self.replayed_tx)):
+            if a != b:
+                return i
+        if len(self.captured_tx) != len(self.replayed_tx):
+            return min(len(self.captured_tx), len(self.replayed_tx))
+        return None
+
+def _wait_tx_idle(session: SerialSession, timeout_sec: float = 1.0) -> None:
+    """等待会话 TX 调度器清空（周期心跳/统计任务除外），连续两次观测为空才返回"""
+    sched = session._tx_sched
+    end = time.monotonic() + timeout_sec
+    idle = 0
+    while idle < 2 and time.monotonic() < end:
+        periodic = int(sched.pending("heartbeat")) + int(sched.pending("metrics"))
+        idle = idle + 1 if len(sched) <= periodic and not session._tx_batch else 0
+        time.sleep(0.001)
+
+def replay(records: List[CaptureRecord], port: Optional[str] = None, speed: float = 0.0, settle_sec: float = 0.2) -> ReplayResult:
+    if port is None:
+        port = next((r.port for r in records), "")
+    recs = [r for r in records if r.port == port]
+    rx = [r for r in recs if r.direction == "RX"]
+    captured = _frames([r.data for r in recs if r.direction == "TX"])
+    payloads = [decode_a1_val(v) for t, _s, v in captured if t == FrameType.A1]
+
+    def _handler() -> Payload:
+        return payloads.pop(0) if payloads else ([], None, None)
+
+    host, mcu = FakeSerialPort(), FakeSerialPort()
+    host.connect_peer(mcu)
+    session = SerialSession(host, request_handler=_handler, name=f"replay:{port}")
+    session._capture = None  # 回放自身不再写捕获
+    session.stop_heartbeat()
+    t0 = time.monotonic()
+    try:
+        base = rx[0].ts if rx else 0.0
+        for r in rx:
+            if speed > 0:
+                delay = (r.ts - base) / speed - (time.monotonic() - t0)
+                if delay > 0:
+                    time.sleep(delay)
+            mcu.write_bytes(r.data)
+            if speed <= 0:
+                # 先等解码线程处理完本分片（B1 → A1 入队），再等 TX 清空
+                session.wait_rx_idle()
+                _wait_tx_idle(session)
+        time.sleep(settle_sec)
+        session.wait_rx_idle()
+        _wait_tx_idle(session)
+        elapsed = time.monotonic() - t0
+        stats = session.stats()
+    finally:
+        session.close()
+    replayed = _frames(list(mcu.rx_log))
+    return ReplayResult(
+        port=port,
+        rx_chunks=len(rx),
+        rx_bytes=sum(len(r.data) for r in rx),
+        seconds=elapsed,
+        captured_tx=[(t.name, s) for t, s, _v in captured if t != FrameType.A0],
+        replayed_tx=[(t.name, s) for t, s, _v in replayed if t != FrameType.A0],
+        stats=stats,
+    )
+
+def main(argv: List[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description="replay a binary serial capture through SerialSession")
+    ap.add_argument("capture")
+    ap.add_argument("--port", help="仅回放该端口（默认捕获中的第一个端口）")
+    ap.add_argument("--speed", type=float, default=0.0, help="回放倍速：1=原速，0=不等待（默认）")
+    ap.add_argument("--json", action="store_true", help="以 JSON 输出结果")
+    args = ap.parse_args(argv)
+
+    res = replay(list(read_capture(args.capture)), port=args.port, speed=args.speed)
+    if args.json:
+        out = {
+            "port": res.port,
+            "rx_chunks": res.rx_chunks,
+            "rx_bytes": res.rx_bytes,
+            "seconds": res.seconds,
+            "tx_match": res.tx_match,
+            "first_mismatch": res.first_mismatch(),
+            "stats": res.stats,
+        }
+        print(json.dumps(out, indent=2, default=str))
+    else:
+        print(f"port={res.port} rx_chunks={res.rx_chunks} rx_bytes={res.rx_bytes} seconds={res.seconds:.3f}")
+        print(f"tx frames captured={len(res.captured_tx)} replayed={len(res.replayed_tx)} match={res.tx_match}")
+        mm = res.first_mismatch()
+        if mm is not None:
+            cap = res.captured_tx[mm] if mm < len(res.captured_tx) else None
+            rep = res.replayed_tx[mm] if mm < len(res.replayed_tx) else None
+            print(f"first mismatch at #{mm}: captured={cap} replayed={rep}", file=sys.stderr)
+        lat = res.stats.get("latency", {})  # type: ignore[union-attr]
+        for name, v in lat.items():  # type: ignore[union-attr]
+            if v["count"]:
+                print(f"{name:<14} n={v['count']:<6} p50={v['p50_ms']:.2f}ms p95={v['p95_ms']:.2f}ms max={v['max_ms']:.2f}ms")
+    return 0 if res.tx_match else 1
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1 @@
+"""性能基准脚本（不随应用打包）；以 `python -m benchmarks.<name>` 运行。"""
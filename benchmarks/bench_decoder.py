@@ -0,0 +1,153 @@
+"""
+协议解码吞吐基准：
+- 场景：clean（仅合法帧）、mixed（日志噪声 + 少量坏帧）、noisy（高噪声/高损坏/截断）、adversarial（HEADER+超大 LEN 噪声）；
+- 输入按 pyserial 读取粒度分片喂入，对比 decode_stream（逐分片 bytearray）与 StreamDecoder；
+- 输出 frames/s、bytes/s、每帧内存分配（tracemalloc：峰值字节/帧与存活块数/帧）；
+  StreamDecoder 另报告 LEN 超限重同步次数与最长半帧停顿（stall_max_ms，不含喂入间隔，反映解码器自身挂起）。
+
+用法：python -m benchmarks.bench_decoder [--frames N] [--scenario NAME] [--json] [--min-fps X]
+--min-fps 用于回归门禁：任一 StreamDecoder 场景低于阈值时返回码为 1。
+"""
+from __future__ import annotations
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Tuple
+
+from app.comm.protocol import AckCode, StreamDecoder, decode_stream
+from benchmarks.streams import StreamMix, adversarial_header_stream, chunk_stream, generate_stream
+
+Runner = Callable[[List[bytes]], Dict[str, int]]
+
+def _run_decode_stream(chunks: List[bytes]) -> Dict[str, int]:
+    counts = {"frames": 0, "errors": 0, "garbage_bytes": 0}
+
+    def _err(_c: AckCode, _s: int) -> None:
+        counts["errors"] += 1
+
+    def _g(b: bytes) -> None:
+        counts["garbage_bytes"] += len(b)
+
+    buf = bytearray()
+    for ch in chunks:
+        buf.extend(ch)
+        counts["frames"] += len(decode_stream(buf, on_error=_err, on_garbage=_g))
+    return counts
+
+def _run_stream_decoder(chunks: List[bytes]) -> Dict[str, int]:
+    counts = {"frames": 0, "errors": 0, "garbage_bytes": 0}
+
+    def _err(_c: AckCode, _s: int) -> None:
+        counts["errors"] += 1
+
+    def _g(b: bytes) -> None:
+        counts["garbage_bytes"] += len(b)
+
+    dec = StreamDecoder(on_error=_err, on_garbage=_g)
+    for ch in chunks:
+        counts["frames"] += len(dec.feed(ch))
+    st = dec.stats()
+    counts["len_rejects"] = int(st["len_rejects"])
+    counts["stalls"] = int(st["stalls"])
+    counts["stall_max_ms"] = st["stall_max_ms"]  # type: ignore[assignment]
+    return counts
+
+RUNNERS: Dict[str, Runner] = {
+    "decode_stream": _run_decode_stream,
+    "StreamDecoder": _run_stream_decoder,
+}
+
+def build_scenarios(frames: int) -> Dict[str, Tuple[List[bytes], int]]:
+    """场景名 -> (分片列表, 期望解出的合法帧数)"""
+    mixes = {
+        "clean": StreamMix(frames=frames, noise=0.0, corrupt=0.0, truncate=0.0),
+        "mixed": StreamMix(frames=frames),
+        "noisy": StreamMix(frames=frames, noise=1.0, corrupt=0.05, truncate=0.02),
+    }
+    out: Dict[str, Tuple[List[bytes], int]] = {}
+    for name, mix in mixes.items():
+        gen = generate_stream(mix)
+        out[name] = (chunk_stream(gen.data, seed=mix.seed), gen.valid_frames)
+    count = max(1, frames // 100)
+    out["adversarial"] = (chunk_stream(adversarial_header_stream(count=count)), 2 * count)
+    return out
+
+def _alloc_profile(runner: Runner, chunks: List[bytes]) -> Dict[str, float]:
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        counts = runner(chunks)
+        after = tracemalloc.take_snapshot()
+        _cur, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    blocks = sum(st.count_diff for st in after.compare_to(before, "filename"))
+    n = max(1, counts["frames"])
+    return {"peak_bytes_per_frame": peak / n, "retained_blocks_per_frame": blocks / n}
+
+def bench(chunks: List[bytes], runner: Runner, repeat: int) -> Dict[str, float]:
+    nbytes = sum(len(c) for c in chunks)
+    best = float("inf")
+    counts: Dict[str, int] = {}
+    for _ in range(max(1, repeat)):
+        t0 = time.perf_counter()
+        counts = runner(chunks)
+        best = min(best, time.perf_counter() - t0)
+    res: Dict[str, float] = dict(counts)
+    res.update(
+        {
+            "chunks": len(chunks),
+            "bytes": nbytes,
+            "seconds": best,
+            "frames_per_sec": counts["frames"] / best if best > 0 else 0.0,
+            "bytes_per_sec": nbytes / best if best > 0 else 0.0,
+        }
+    )
+    res.update(_alloc_profile(runner, chunks))
+    return res
+
+def main(argv: List[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description="protocol decoder throughput benchmark")
+    ap.add_argument("--frames", type=int, default=20000)
+    ap.add_argument("--scenario", action="append", help="仅运行指定场景，可重复")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--json", action="store_true", help="以 JSON 输出结果")
+    ap.add_argument("--min-fps", type=float, default=0.0, help="StreamDecoder 最低 frames/s（回归门禁）")
+    args = ap.parse_args(argv)
+
+    scenarios = build_scenarios(args.frames)
+    if args.scenario:
+        scenarios = {k: v for k, v in scenarios.items() if k in set(args.scenario)}
+
+    results: Dict[str, Dict[str, Dict[str, float]]] = {}
+    for sname, (chunks, expected) in scenarios.items():
+        results[sname] = {}
+        for rname, runner in RUNNERS.items():
+            r = bench(chunks, runner, args.repeat)
+            r["expected_frames"] = expected
+            results[sname][rname] = r
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'scenario':<12} {'decoder':<14} {'frames':>7} {'expect':>7} {'errors':>6} {'frames/s':>11} {'MB/s':>7} {'peakB/fr':>9} {'blk/fr':>7} {'stall':>7}")
+        for sname, per in results.items():
+            for rname, r in per.items():
+                print(
+                    f"{sname:<12} {rname:<14} {int(r['frames']):>7} {int(r['expected_frames']):>7} {int(r['errors']):>6} "
+                    f"{r['frames_per_sec']:>11.0f} {r['bytes_per_sec'] / 1e6:>7.2f} "
+                    f"{r['peak_bytes_per_frame']:>9.1f} {r['retained_blocks_per_frame']:>7.2f} "
+                    f"{r.get('stall_max_ms', float('nan')):>7.3f}"
+                )
+
+    if args.min_fps > 0:
+        slow = [s for s, per in results.items() if s != "adversarial" and per["StreamDecoder"]["frames_per_sec"] < args.min_fps]
+        if slow:
+            print(f"below --min-fps {args.min_fps}: {', '.join(slow)}", file=sys.stderr)
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,164 @@
+"""
+真实端口实现的 pty 回环基准（POSIX，无需串口硬件；pty 不按波特率限速，结果为实现本身的上限）：
+- rx：设备端以 --chunk 字节分块写入 --mb MB，主机端口回调收齐，统计 MB/s、回调次数与每 MB CPU 秒；
+- tx：主机端口 write_bytes 同样数据量，设备端收齐，统计 MB/s 与每 MB CPU 秒；
+- rtt：主机写 A0，脚本化设备立即回 BF，统计写入 → 主机 RX 回调的往返时延分位数；
+- e2e：SerialSession + McuEmulator（B1 → AF → A1 → BF 全流程）运行 --sec 秒，统计交互/秒与设备侧周期时延。
+端口实现：thread=PySerialPort（serial.rx.mode 决定接收循环），reactor=ReactorSerialPort。
+
+用法：python -m benchmarks.bench_pty_loopback [--impl thread|reactor ...] [--mb 8] [--chunk 256] [--frames 500] [--sec 3] [--json]
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from app.comm.metrics import LatencyHistogram
+from app.comm.protocol import FrameType, ProtocolFrame, encode_frame
+from app.comm.serial_port import SerialPortBase
+
+IMPLS = ("thread", "reactor")
+
+def _factory(impl: str) -> Callable[[], SerialPortBase]:
+    if impl == "reactor":
+        from app.comm.reactor import ReactorSerialPort
+        return ReactorSerialPort
+    from app.comm.pyserial_port import PySerialPort
+    return PySerialPort
+
+def _loop(impl: str):
+    from app.tools.pty_loopback import PtyLoopback
+    return PtyLoopback(_factory(impl))
+
+def _counter(total: int):
+    got = [0, 0]  # 字节数, 回调次数
+    done = threading.Event()
+
+    def _cb(b: bytes) -> None:
+        got[0] += len(b)
+        got[1] += 1
+        if got[0] >= total:
+            done.set()
+    return got, done, _cb
+
+def bench_rx(impl: str, mb: float, chunk: int) -> Dict[str, float]:
+    total = int(mb * 1024 * 1024)
+    blob = bytes(range(256)) * (chunk // 256 + 1)
+    blob = blob[:chunk]
+    got, done, cb = _counter(total)
+    with _loop(impl) as lb:
+        lb.host.set_rx_callback(cb)
+        time.sleep(0.1)
+        c0, t0 = time.process_time(), time.perf_counter()
+        sent = 0
+        while sent < total:
+            lb.device.write_bytes(blob)
+            sent += len(blob)
+        done.wait(30.0)
+        dt, cpu = time.perf_counter() - t0, time.process_time() - c0
+    return {"mb_per_sec": got[0] / dt / 1048576.0, "callbacks": got[1], "avg_callback_bytes": got[0] / max(1, got[1]),
+            "cpu_sec_per_mb": cpu / max(1e-9, got[0] / 1048576.0)}
+
+def bench_tx(impl: str, mb: float, chunk: int) -> Dict[str, float]:
+    total = int(mb * 1024 * 1024)
+    blob = bytes(range(256)) * (chunk // 256 + 1)
+    blob = blob[:chunk]
+    got, done, cb = _counter(total)
+    with _loop(impl) as lb:
+        lb.device.set_rx_callback(cb)
+        time.sleep(0.1)
+        c0, t0 = time.process_time(), time.perf_counter()
+        sent = 0
+        while sent < total:
+            lb.host.write_bytes(blob)
+            sent += len(blob)
+        done.wait(30.0)
+        dt, cpu = time.perf_counter() - t0, time.process_time() - c0
+        dropped = int(lb.host.stats().get("tx_dropped_bytes", 0)) if hasattr(lb.host, "stats") else 0  # type: ignore[attr-defined]
+    return {"mb_per_sec": got[0] / dt / 1048576.0, "cpu_sec_per_mb": cpu / max(1e-9, got[0] / 1048576.0), "dropped_bytes": dropped}
+
+def bench_rtt(impl: str, frames: int) -> Dict[str, float]:
+    hist = LatencyHistogram()
+    a0 = encode_frame(ProtocolFrame(FrameType.A0, 0xFFFF, b""))
+    bf_len = len(encode_frame(ProtocolFrame(FrameType.BF, 0xFFFF, b"\x00")))
+    with _loop(impl) as lb:
+        lb.scripted()
+        got, done, cb = _counter(bf_len)
+        lb.host.set_rx_callback(cb)
+        time.sleep(0.1)
+        for _ in range(frames):
+            got[0] = 0
+            done.clear()
+            t0 = time.perf_counter()
+            lb.host.write_bytes(a0)
+            if done.wait(1.0):
+                hist.record(time.perf_counter() - t0)
+    return hist.snapshot()
+
+def bench_e2e(impl: str, sec: float) -> Dict[str, object]:
+    from app.comm.session import SerialSession
+    from app.tools.mcu_emulator import EmulatorConfig, McuEmulator
+    ok = [0, 0]
+
+    def _on_result(r: bool) -> None:
+        ok[0 if r else 1] += 1
+    with _loop(impl) as lb:
+        sess = SerialSession(lb.host, request_handler=lambda: (list(range(1, 61)), None), name=f"bench-{impl}")
+        sess.on_a1_result = _on_result
+        emu = McuEmulator(lb.device, EmulatorConfig(b1_interval_sec=0.0, a1_delay_sec=0.0, seed=1), name="bench-mcu")
+        try:
+            c0, t0 = time.process_time(), time.monotonic()
+            emu.start()
+            time.sleep(sec)
+            emu.stop()
+            dt, cpu = time.monotonic() - t0, time.process_time() - c0
+        finally:
+            sess.close()
+    return {"cycles_per_sec": ok[0] / dt, "failed": ok[1], "cpu_pct": cpu / dt * 100.0, "cycle": emu.cycle.snapshot()}
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="PySerialPort/ReactorSerialPort end-to-end benchmark over pty pairs")
+    ap.add_argument("--impl", action="append", choices=IMPLS, help="仅运行指定端口实现，可重复")
+    ap.add_argument("--mb", type=float, default=8.0, help="rx/tx 吞吐测量的数据量（MB）")
+    ap.add_argument("--chunk", type=int, default=256, help="rx/tx 每次写入的字节数")
+    ap.add_argument("--frames", type=int, default=500, help="rtt 往返次数")
+    ap.add_argument("--sec", type=float, default=3.0, help="e2e 运行时长")
+    ap.add_argument("--json", action="store_true")
+    args = ap.parse_args(argv)
+    if os.name != "posix":
+        print("bench_pty_loopback requires a POSIX pty", file=sys.stderr)
+        return 2
+    try:
+        import serial  # noqa: F401
+    except Exception:
+        print("bench_pty_loopback requires pyserial", file=sys.stderr)
+        return 2
+
+    results: Dict[str, Dict[str, object]] = {}
+    for impl in args.impl or IMPLS:
+        results[impl] = {
+            "rx": bench_rx(impl, args.mb, args.chunk),
+            "tx": bench_tx(impl, args.mb, args.chunk),
+            "rtt": bench_rtt(impl, args.frames),
+            "e2e": bench_e2e(impl, args.sec),
+        }
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return 0
+    print(f"{'impl':<8} {'rx MB/s':>8} {'rx cb':>7} {'rx cpu/MB':>10} {'tx MB/s':>8} {'tx cpu/MB':>10} "
+          f"{'rtt p50':>8} {'rtt p99':>8} {'e2e /s':>7} {'cyc p50':>8} {'cyc p99':>8} {'cpu%':>6}")
+    for impl, r in results.items():
+        rx, tx, rtt, e2e = r["rx"], r["tx"], r["rtt"], r["e2e"]
+        cyc = e2e["cycle"]  # type: ignore[index]
+        print(f"{impl:<8} {rx['mb_per_sec']:>8.1f} {rx['callbacks']:>7} {rx['cpu_sec_per_mb']:>10.3f} "  # type: ignore[index]
+              f"{tx['mb_per_sec']:>8.1f} {tx['cpu_sec_per_mb']:>10.3f} "  # type: ignore[index]
+              f"{rtt['p50_ms']:>8.2f} {rtt['p99_ms']:>8.2f} {e2e['cycles_per_sec']:>7.0f} "  # type: ignore[index]
+              f"{cyc['p50_ms']:>8.2f} {cyc['p99_ms']:>8.2f} {e2e['cpu_pct']:>6.1f}")  # type: ignore[index]
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
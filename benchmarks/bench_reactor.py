@@ -0,0 +1,119 @@
+"""
+多端口 I/O 模型对比（POSIX，基于 pty 虚拟串口）：thread=每端口一个 PySerialPort 接收线程（select 模式），
+reactor=所有端口共享一个 PortReactor 线程。每个端口的主端以 --rate 帧/秒写入 B1，统计：
+线程数、每秒上下文切换（自愿 + 非自愿，进程级）、CPU%、写入 → RX 回调时延分位数。
+
+用法：python -m benchmarks.bench_reactor [--ports 1,4,16] [--rate 50] [--sec 2] [--json]
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import resource
+import sys
+import threading
+import time
+from typing import Dict, List
+
+from app.comm.metrics import LatencyHistogram
+from app.comm.protocol import FrameType, ProtocolFrame, encode_frame
+
+MODELS = ("thread", "reactor")
+
+def _open_pty():
+    import tty
+    master, slave = os.openpty()
+    tty.setraw(slave)
+    return master, slave, os.ttyname(slave)
+
+def run(model: str, nports: int, rate: float, sec: float) -> Dict[str, float]:
+    from app.comm.pyserial_port import PySerialPort
+    from app.comm.reactor import PortReactor, ReactorSerialPort
+    reactor = PortReactor() if model == "reactor" else None
+    if reactor is not None:
+        reactor.start()
+    frame = encode_frame(ProtocolFrame(FrameType.B1, 1, b""))
+    hist = LatencyHistogram()
+    sent_at: Dict[int, float] = {}
+    ports, fds = [], []
+    for i in range(nports):
+        master, slave, name = _open_pty()
+        if reactor is not None:
+            p = ReactorSerialPort(reactor)
+        else:
+            p = PySerialPort()
+            p.rx_mode = "select"
+        pending = bytearray()
+
+        def _cb(b: bytes, i: int = i, pending: bytearray = pending) -> None:
+            pending.extend(b)
+            while len(pending) >= len(frame):
+                del pending[:len(frame)]
+                t0 = sent_at.get(i)
+                if t0 is not None:
+                    hist.record(time.perf_counter() - t0)
+        p.set_rx_callback(_cb)
+        p.open(name, baud=115200)
+        ports.append(p)
+        fds.append((master, slave))
+    threads = threading.active_count()
+    try:
+        time.sleep(0.2)
+        ru0, c0, t0 = resource.getrusage(resource.RUSAGE_SELF), time.process_time(), time.monotonic()
+        period = 1.0 / max(0.1, rate)
+        nxt = t0
+        while time.monotonic() - t0 < sec:
+            for i, (master, _s) in enumerate(fds):
+                sent_at[i] = time.perf_counter()
+                os.write(master, frame)
+            nxt += period
+            time.sleep(max(0.0, nxt - time.monotonic()))
+        elapsed = time.monotonic() - t0
+        ru1, c1 = resource.getrusage(resource.RUSAGE_SELF), time.process_time()
+    finally:
+        for p in ports:
+            p.close()
+        if reactor is not None:
+            reactor.stop()
+        time.sleep(0.3)  # 等待 PySerialPort 接收线程在下一次唤醒时退出
+        for fds_ in fds:
+            for fd in fds_:
+                try:
+                    os.close(fd)
+                except OSError:
+                    pass
+    csw = (ru1.ru_nvcsw - ru0.ru_nvcsw) + (ru1.ru_nivcsw - ru0.ru_nivcsw)
+    snap = hist.snapshot()
+    return {
+        "ports": nports,
+        "threads": threads,
+        "ctx_switches_per_sec": csw / elapsed,
+        "cpu_pct": (c1 - c0) / elapsed * 100.0,
+        "frames": snap["count"],
+        "p50_ms": snap["p50_ms"],
+        "p99_ms": snap["p99_ms"],
+    }
+
+def main(argv: List[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description="thread-per-port vs selector reactor (pty)")
+    ap.add_argument("--ports", default="1,4,16", help="逗号分隔的端口数列表")
+    ap.add_argument("--rate", type=float, default=50.0, help="每端口每秒写入帧数")
+    ap.add_argument("--sec", type=float, default=2.0)
+    ap.add_argument("--json", action="store_true")
+    args = ap.parse_args(argv)
+    if os.name != "posix":
+        print("bench_reactor requires a POSIX pty", file=sys.stderr)
+        return 2
+    counts = [int(x) for x in str(args.ports).split(",") if x.strip()]
+    rows = [{"model": m, **run(m, n, args.rate, args.sec)} for n in counts for m in MODELS]
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return 0
+    print(f"{'model':<8} {'ports':>5} {'threads':>7} {'csw/s':>9} {'cpu%':>7} {'frames':>7} {'p50 ms':>7} {'p99 ms':>7}")
+    for r in rows:
+        print(f"{r['model']:<8} {r['ports']:>5} {r['threads']:>7} {r['ctx_switches_per_sec']:>9.0f} {r['cpu_pct']:>7.2f} "
+              f"{r['frames']:>7} {r['p50_ms']:>7.2f} {r['p99_ms']:>7.2f}")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,134 @@
+"""
+PySerialPort 接收循环基准（POSIX，基于 pty 虚拟串口）：
+- idle：每种模式打开 N 个空闲端口，统计 --idle-sec 内接收线程的 CPU 占用（每端口 CPU%，扣除无端口基线）；
+- latency：主端逐帧写入 B1，测量写入 → RX 回调的时延分位数，以及 --burst 帧连续写入时的回调次数（合并效果）。
+模式：select（阻塞于 fd）、blocking（阻塞 read(1) + in_waiting）、poll（in_waiting 轮询 + 1ms sleep）。
+
+用法：python -m benchmarks.bench_serial_rx [--ports N] [--idle-sec S] [--frames K] [--coalesce-us U] [--mode M ...] [--json]
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from typing import Dict, List, Tuple
+
+from app.comm.metrics import LatencyHistogram
+from app.comm.protocol import FrameType, ProtocolFrame, encode_frame
+
+MODES = ("select", "blocking", "poll")
+
+def _open_pty() -> Tuple[int, int, str]:
+    import tty
+    master, slave = os.openpty()
+    tty.setraw(slave)
+    return master, slave, os.ttyname(slave)
+
+def _open_ports(mode: str, n: int, coalesce_us: float | None = None):
+    from app.comm.pyserial_port import PySerialPort
+    out = []
+    for _ in range(n):
+        master, slave, name = _open_pty()
+        p = PySerialPort()
+        p.rx_mode = mode
+        if coalesce_us is not None:
+            p.coalesce_max_sec = max(0.0, coalesce_us) / 1_000_000.0
+        p.open(name, baud=115200)
+        out.append((p, master, slave))
+    return out
+
+def _close_ports(ports) -> None:
+    for p, master, slave in ports:
+        p.close()
+        time.sleep(0)
+    time.sleep(0.3)  # 等待接收线程在下一次唤醒时退出
+    for _p, master, slave in ports:
+        for fd in (master, slave):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+def _cpu_over(sec: float) -> float:
+    c0, t0 = time.process_time(), time.monotonic()
+    time.sleep(sec)
+    return (time.process_time() - c0) / (time.monotonic() - t0)
+
+def bench_idle(mode: str, nports: int, idle_sec: float, baseline: float) -> Dict[str, float]:
+    ports = _open_ports(mode, nports)
+    try:
+        time.sleep(0.2)
+        cpu = _cpu_over(idle_sec)
+    finally:
+        _close_ports(ports)
+    per_port = max(0.0, cpu - baseline) / max(1, nports)
+    return {"ports": nports, "cpu_pct_total": cpu * 100.0, "cpu_pct_per_port": per_port * 100.0}
+
+def bench_latency(mode: str, frames: int, burst: int, coalesce_us: float | None = None) -> Dict[str, object]:
+    ports = _open_ports(mode, 1, coalesce_us)
+    p, master, _slave = ports[0]
+    hist = LatencyHistogram()
+    got = threading.Event()
+    arrivals: List[int] = []
+    p.set_rx_callback(lambda b: (arrivals.append(len(b)), got.set()))
+    frame = encode_frame(ProtocolFrame(FrameType.B1, 1, b""))
+    try:
+        time.sleep(0.1)
+        for _ in range(frames):
+            got.clear()
+            arrivals.clear()
+            t0 = time.perf_counter()
+            os.write(master, frame)
+            if not got.wait(1.0):
+                continue
+            hist.record(time.perf_counter() - t0)
+            # 等帧内余下字节收齐，避免计入下一轮
+            end = time.monotonic() + 0.05
+            while sum(arrivals) < len(frame) and time.monotonic() < end:
+                time.sleep(0.0005)
+            time.sleep(0.002)
+        arrivals.clear()
+        callbacks_before = p.rx_callbacks
+        os.write(master, frame * burst)
+        end = time.monotonic() + 1.0
+        while sum(arrivals) < len(frame) * burst and time.monotonic() < end:
+            time.sleep(0.001)
+        callbacks = p.rx_callbacks - callbacks_before
+    finally:
+        _close_ports(ports)
+    snap = hist.snapshot()
+    return {"latency": snap, "burst_frames": burst, "burst_callbacks": callbacks}
+
+def main(argv: List[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description="PySerialPort RX loop benchmark (pty)")
+    ap.add_argument("--ports", type=int, default=8, help="空闲 CPU 测量的端口数")
+    ap.add_argument("--idle-sec", type=float, default=3.0)
+    ap.add_argument("--frames", type=int, default=200, help="时延测量的单帧往返次数")
+    ap.add_argument("--burst", type=int, default=20)
+    ap.add_argument("--coalesce-us", type=float, default=None, help="覆盖 serial.rx.coalesce_max_us（0 关闭合并）")
+    ap.add_argument("--mode", action="append", choices=MODES, help="仅运行指定模式，可重复")
+    ap.add_argument("--json", action="store_true")
+    args = ap.parse_args(argv)
+    if os.name != "posix":
+        print("bench_serial_rx requires a POSIX pty", file=sys.stderr)
+        return 2
+
+    baseline = _cpu_over(min(1.0, args.idle_sec))
+    results: Dict[str, Dict[str, object]] = {}
+    for mode in args.mode or MODES:
+        results[mode] = {"idle": bench_idle(mode, args.ports, args.idle_sec, baseline), **bench_latency(mode, args.frames, args.burst, args.coalesce_us)}
+
+    if args.json:
+        print(json.dumps({"baseline_cpu_pct": baseline * 100.0, "modes": results}, indent=2))
+        return 0
+    print(f"{'mode':<9} {'ports':>5} {'cpu%/port':>10} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} {'burst cb':>9}")
+    for mode, r in results.items():
+        idle, lat = r["idle"], r["latency"]  # type: ignore[index]
+        print(f"{mode:<9} {idle['ports']:>5} {idle['cpu_pct_per_port']:>10.3f} {lat['p50_ms']:>8.2f} {lat['p95_ms']:>8.2f} "
+              f"{lat['p99_ms']:>8.2f} {lat['max_ms']:>8.2f} {r['burst_callbacks']:>5}/{r['burst_frames']}")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,107 @@
+"""
+串口接收流生成器（基准与压测共用）：
+- 按比例混合合法 B0/B1/BF 帧、下位机 ASCII 日志噪声、CHECK 损坏帧与截断帧；
+- 按 pyserial 实际读取分片大小切块，覆盖 HEADER/帧跨分片边界的情形。
+"""
+from __future__ import annotations
+import random
+from dataclasses import dataclass
+from typing import List, Tuple
+
+from app.comm.protocol import FrameType, ProtocolFrame, encode_frame
+
+# USB-CDC/FTDI 在 115200 下 1ms 轮询常见的 in_waiting 分布（字节）
+PYSERIAL_CHUNK_SIZES: Tuple[int, ...] = (1, 2, 4, 8, 11, 12, 16, 23, 32, 62, 64)
+
+_LOG_LINES: Tuple[bytes, ...] = (
+    b"[I] ws2812 refresh done n=128 t=3ms\r\n",
+    b"[D] key scan idle\r\n",
+    b"[W] uart rx overrun cleared\r\n",
+    b"[I] request next task seq=%d\r\n",
+    b"boot: fw v1.2.7 build 0611\r\n",
+)
+
+@dataclass
+class StreamMix:
+    """各类内容的相对比例（按“事件”计，每个事件为一帧或一行日志）"""
+    frames: int = 20000
+    b0: float = 0.2
+    b1: float = 0.3
+    bf: float = 0.5
+    noise: float = 0.3      # 每个合法帧前插入一行日志的概率
+    corrupt: float = 0.01   # 合法帧被翻转 CHECK 的概率
+    truncate: float = 0.005 # 合法帧被截断（后续内容直接接上）的概率
+    seed: int = 1
+
+@dataclass
+class GeneratedStream:
+    data: bytes
+    valid_frames: int
+    corrupt_frames: int
+    truncated_frames: int
+    noise_bytes: int
+
+def generate_stream(mix: StreamMix) -> GeneratedStream:
+    rnd = random.Random(mix.seed)
+    out = bytearray()
+    total = mix.b0 + mix.b1 + mix.bf
+    b1_seq = 0
+    valid = corrupt = truncated = noise = 0
+    for i in range(mix.frames):
+        if rnd.random() < mix.noise:
+            line = rnd.choice(_LOG_LINES)
+            if b"%d" in line:
+                line = line % i
+            out += line
+            noise += len(line)
+        r = rnd.random() * total
+        if r < mix.b0:
+            blob = encode_frame(ProtocolFrame(FrameType.B0, 0xFFFF, b""))
+        elif r < mix.b0 + mix.b1:
+            blob = encode_frame(ProtocolFrame(FrameType.B1, b1_seq, b""))
+            b1_seq = (b1_seq + 1) & 0xFFFF
+        else:
+            blob = encode_frame(ProtocolFrame(FrameType.BF, i & 0xFFFF, b"\x00"))
+        x = rnd.random()
+        if x < mix.corrupt:
+            bad = bytearray(blob)
+            bad[-1] ^= 0x5A
+            out += bad
+            corrupt += 1
+        elif x < mix.corrupt + mix.truncate:
+            out += blob[: rnd.randint(5, len(blob) - 1)]
+            truncated += 1
+        else:
+            out += blob
+            valid += 1
+    return GeneratedStream(bytes(out), valid, corrupt, truncated, noise)
+
+def chunk_stream(data: bytes, seed: int = 1, sizes: Tuple[int, ...] = PYSERIAL_CHUNK_SIZES) -> List[bytes]:
+    """按 pyserial 读取粒度切块"""
+    rnd = random.Random(seed)
+    chunks: List[bytes] = []
+    i = 0
+    n = len(data)
+    while i < n:
+        k = rnd.choice(sizes)
+        chunks.append(data[i:i + k])
+        i += k
+    return chunks
+
+def adversarial_header_stream(count: int = 200, huge_len: int = 0xFFF0) -> bytes:
+    """HEADER 后紧跟超大 LEN 的噪声，随后是合法 BF/B1 帧（用于观察解码停顿）"""
+    out = bytearray()
+    for i in range(count):
+        out += b"\xF2\xF8\xF1\xF2\xB1" + huge_len.to_bytes(2, "little") + b"log"
+        out += encode_frame(ProtocolFrame(FrameType.BF, i & 0xFFFF, b"\x00"))
+        out += encode_frame(ProtocolFrame(FrameType.B1, i & 0xFFFF, b""))
+    return bytes(out)
+
+__all__ = [
+    "PYSERIAL_CHUNK_SIZES",
+    "StreamMix",
+    "GeneratedStream",
+    "generate_stream",
+    "chunk_stream",
+    "adversarial_header_stream",
+]
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import os
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+
+def wait_for(cond, timeout: float = 2.0) -> None:
+    """轮询等待 cond() 为真或超时（不抛出，由调用方断言结果）"""
+    end = time.monotonic() + timeout
+    while not cond() and time.monotonic() < end:
+        time.sleep(0.005)
+
+
+def _require_pty() -> None:
+    pytest.importorskip("serial")
+    if os.name != "posix":
+        pytest.skip("pty-based serial tests require POSIX")
+
+
+@pytest.fixture
+def pty_pair():
+    """工厂：新建 raw 模式的 pty 对，返回 (master_fd, slave_fd, slave_name)；测试结束统一关闭（已关闭的忽略）"""
+    _require_pty()
+    import tty
+    fds = []
+
+    def _make():
+        master, slave = os.openpty()
+        tty.setraw(slave)
+        fds.extend((master, slave))
+        return master, slave, os.ttyname(slave)
+
+    yield _make
+    for fd in fds:
+        try:
+            os.close(fd)
+        except OSError:
+            pass
+
+
+@pytest.fixture
+def pty_loopback():
+    """工厂：PtyLoopback(port_factory=None, baud=115200)，主机端为真实端口实现；测试结束统一关闭"""
+    _require_pty()
+    from app.tools.pty_loopback import PtyLoopback
+    loops = []
+
+    def _make(port_factory=None, baud: int = 115200):
+        lb = PtyLoopback(port_factory, baud=baud)
+        loops.append(lb)
+        return lb
+
+    yield _make
+    for lb in loops:
+        lb.close()
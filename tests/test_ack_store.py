@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.comm.ack_store import SEQ_HALF, AckStore
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.t = 0.0
+
+    def __call__(self) -> float:
+        return self.t
+
+
+def test_unmatched_bf_classification() -> None:
+    store = AckStore(clock=_Clock())
+    store.note_sent(1)
+    store.note_resolved(1, acked=True, code=0)
+    store.note_sent(2)
+    store.note_resolved(2, acked=False)
+    assert store.classify_unmatched(1, 0) == "duplicate"
+    assert store.classify_unmatched(2, 0) == "late"
+    # 迟到 BF 之后同 SEQ 再来一次：重复
+    assert store.classify_unmatched(2, 0) == "duplicate"
+    assert store.classify_unmatched(3, 0) == "unsolicited"
+    st = store.stats()
+    assert (st["late_acks"], st["duplicate_acks"], st["unsolicited_acks"]) == (1, 2, 1)
+    assert store.last_code(2) == 0
+
+
+def test_size_and_ttl_bounds() -> None:
+    clock = _Clock()
+    store = AckStore(ttl_sec=5.0, max_entries=8, clock=clock)
+    for seq in range(100):
+        store.classify_unmatched(seq, 0)
+        store.note_sent(seq)
+        store.note_resolved(seq, acked=True)
+    assert len(store) == 8
+    clock.t = 10.0
+    assert store.classify_unmatched(99, 0) == "unsolicited"
+    store.note_sent(5)
+    assert len(store) == 1
+
+
+def test_seq_wraparound_forgets_old_generation() -> None:
+    store = AckStore(max_entries=4, clock=_Clock())
+    store.note_sent(7)
+    store.note_resolved(7, acked=True)
+    # 半个 SEQ 空间的发送之后，旧的 seq=7 记录不再可信
+    store._sends += SEQ_HALF
+    assert store.classify_unmatched(7, 0) == "unsolicited"
@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.comm.async_port import PySerialAsyncPort
+
+
+def test_async_port_reads_writes_and_unregisters_on_loss(pty_pair) -> None:
+    master, _slave, name = pty_pair()
+
+    async def _run() -> None:
+        loop = asyncio.get_running_loop()
+        port = PySerialAsyncPort()
+        got = bytearray()
+        rx = asyncio.Event()
+        lost = asyncio.Event()
+        reasons = []
+
+        def _on_rx(data: bytes) -> None:
+            got.extend(data)
+            rx.set()
+        port.set_rx_callback(_on_rx)
+        port.set_lost_callback(lambda r: (reasons.append(r), lost.set()))
+        port.open(name)
+        fd = port._fd
+        try:
+            os.write(master, b"\xf2\xf8\xf1\xf2")
+            await asyncio.wait_for(rx.wait(), 1.0)
+            assert bytes(got) == b"\xf2\xf8\xf1\xf2"
+            port.write_bytes(b"ping")
+            await asyncio.sleep(0.05)
+            assert os.read(master, 16) == b"ping"
+            # 设备端消失：读回调报告丢失一次，fd 从事件循环注销（不再空转），端口已关闭
+            os.close(master)
+            await asyncio.wait_for(lost.wait(), 1.0)
+            await asyncio.sleep(0.05)
+            assert port.lost and port._fd is None and len(reasons) == 1
+            assert loop.remove_reader(fd) is False
+            port.write_bytes(b"late")  # 丢失后写入仅记日志
+        finally:
+            port.close()
+
+    asyncio.run(_run())
@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.comm.async_port import MemoryAsyncPort
+from app.comm.async_session import AsyncSerialSession
+from app.comm.protocol import AckCode, FrameType, ProtocolFrame, StreamDecoder, build_a0, encode_frame
+from app.comm.session import SessionState
+
+
+def _patch_config(monkeypatch, comm: dict) -> None:
+    monkeypatch.setattr(
+        "app.comm.session.ConfigRepo.load",
+        lambda self: {"comm": comm, "logging": {"hex": {"capture": False}}},
+    )
+
+
+def _sent(mcu: MemoryAsyncPort):
+    dec = StreamDecoder()
+    return [(f.type, f.seq, bytes(f.val)) for chunk in list(mcu.rx_log) for f in dec.feed(chunk)]
+
+
+async def _until(cond, timeout: float = 1.0) -> None:
+    end = asyncio.get_running_loop().time() + timeout
+    while not cond() and asyncio.get_running_loop().time() < end:
+        await asyncio.sleep(0.001)
+
+
+def test_b1_af_a1_bf_on_one_loop_for_many_ports(monkeypatch) -> None:
+    _patch_config(monkeypatch, {"enable_heartbeat": False, "retry": {"enabled": False}})
+
+    async def _main() -> None:
+        pairs = []
+        for i in range(3):
+            port, mcu = MemoryAsyncPort(), MemoryAsyncPort()
+            port.connect_peer(mcu)
+            s = AsyncSerialSession(port, request_handler=lambda i=i: ([i, 7], None), name=f"async-{i}")
+            results: list = []
+            s.on_a1_result = results.append
+            await s.start()
+            pairs.append((s, mcu, results))
+        for s, mcu, results in pairs:
+            mcu.write_bytes(encode_frame(ProtocolFrame(FrameType.B1, 5, b"")))
+        for s, mcu, results in pairs:
+            await _until(lambda: any(t == FrameType.A1 for t, _q, _v in _sent(mcu)))
+            sent = _sent(mcu)
+            assert sent[0] == (FrameType.AF, 5, bytes([AckCode.OK]))
+            assert sent[1][0] == FrameType.A1
+            # 重复 B1 仅回 AF(DUPLICATE)；乱序 B1 回 SEQ_TOO_LARGE
+            mcu.write_bytes(encode_frame(ProtocolFrame(FrameType.B1, 5, b"")))
+            mcu.write_bytes(encode_frame(ProtocolFrame(FrameType.B1, 9, b"")))
+            mcu.write_bytes(encode_frame(ProtocolFrame(FrameType.BF, sent[1][1], b"\x00")))
+            await _until(lambda: results == [True])
+            assert results == [True]
+            afs = [v for t, _q, v in _sent(mcu) if t == FrameType.AF]
+            assert afs[1:] == [bytes([AckCode.DUPLICATE]), bytes([AckCode.SEQ_TOO_LARGE])]
+            assert [t for t, _q, _v in _sent(mcu)].count(FrameType.A1) == 1
+            assert s.state == SessionState.CONNECTED
+            await s.close()
+
+    asyncio.run(_main())
+
+
+def test_retry_and_offline_threshold(monkeypatch) -> None:
+    _patch_config(
+        monkeypatch,
+        {
+            "enable_heartbeat": False,
+            "offline_failure_threshold": 2,
+            "retry": {"enabled": True, "max_attempts": 3, "backoff_ms": 5, "ack_timeout_ms": 20},
+        },
+    )
+
+    async def _main() -> None:
+        port, mcu = MemoryAsyncPort(), MemoryAsyncPort()
+        port.connect_peer(mcu)
+        s = AsyncSerialSession(port)
+        await s.start()
+        assert await s.send_with_ack(build_a0()) is False
+        assert [t for t, _q, _v in _sent(mcu)].count(FrameType.A0) == 3
+        assert await s.send_with_ack(build_a0(), single_try=True) is False
+        assert s.state == SessionState.OFFLINE
+        await s.close()
+
+    asyncio.run(_main())
+
+
+def test_a0_a1_seq_collision_fails_the_superseded_wait(monkeypatch) -> None:
+    _patch_config(monkeypatch, {"enable_heartbeat": False, "retry": {"enabled": False}, "ack_timeout_ms": 1000})
+
+    async def _main() -> None:
+        port, mcu = MemoryAsyncPort(), MemoryAsyncPort()
+        port.connect_peer(mcu)
+        sess = AsyncSerialSession(port)
+        await sess.start()
+        sess._seq = 0xFFFE
+        assert [sess.next_seq(), sess.next_seq()] == [0xFFFE, 0]
+        hb = asyncio.ensure_future(sess.send_with_ack(build_a0()))
+        await asyncio.sleep(0)
+        a1 = asyncio.ensure_future(sess.send_with_ack(ProtocolFrame(FrameType.A1, 0xFFFF, b"\x01\x00")))
+        assert await asyncio.wait_for(hb, 0.2) is False
+        mcu.write_bytes(encode_frame(ProtocolFrame(FrameType.BF, 0xFFFF, b"\x00")))
+        assert await asyncio.wait_for(a1, 0.5) is True
+        assert sess._outstanding == {}
+        await sess.close()
+
+    asyncio.run(_main())
@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.comm.protocol import FrameType, ProtocolFrame, StreamDecoder, encode_frame
+from app.comm.serial_port import FakeSerialPort
+from app.comm.session import SerialSession
+from app.logs.capture import CaptureWriter, read_capture
+from app.tools.replay import decode_a1_val, replay
+from conftest import wait_for
+
+
+def _cfg(monkeypatch) -> None:
+    monkeypatch.setattr(
+        "app.comm.session.ConfigRepo.load",
+        lambda self: {"comm": {"enable_heartbeat": False, "retry": {"enabled": False}}, "logging": {"hex": {"capture": False}}},
+    )
+
+
+def test_capture_round_trip(tmp_path) -> None:
+    w = CaptureWriter(tmp_path / "c.bin", flush_interval_sec=10)
+    w.record("RX", "COM3", b"\x01\x02")
+    w.record("TX", "COM4", b"\x03")
+    w.record("RX", "COM3", b"")
+    w.close()
+    recs = list(read_capture(tmp_path / "c.bin"))
+    assert [(r.direction, r.port, r.data) for r in recs] == [("RX", "COM3", b"\x01\x02"), ("TX", "COM4", b"\x03"), ("RX", "COM3", b"")]
+    assert recs[0].ts <= recs[1].ts <= recs[2].ts
+    assert w.stats()["records"] == 3
+
+
+def test_replay_reproduces_captured_tx(monkeypatch, tmp_path) -> None:
+    _cfg(monkeypatch)
+    path = tmp_path / "live.bin"
+    writer = CaptureWriter(path)
+    host, mcu = FakeSerialPort(), FakeSerialPort()
+    host.connect_peer(mcu)
+    payloads = [([1, 2, 300], [0, 1, 0], [0, 1, 2]), ([7], [1], [3])]
+    session = SerialSession(host, request_handler=lambda: payloads.pop(0), name="COM3")
+    session._capture = writer
+
+    def _a1s():
+        dec = StreamDecoder()
+        return [f for ch in list(mcu.rx_log) for f in dec.feed(ch) if f.type == FrameType.A1]
+
+    try:
+        for seq in (1, 2):
+            mcu.write_bytes(encode_frame(ProtocolFrame(FrameType.B1, seq, b"")))
+            wait_for(lambda: len(_a1s()) >= seq)
+            mcu.write_bytes(encode_frame(ProtocolFrame(FrameType.BF, _a1s()[-1].seq, b"\x00")))
+            wait_for(lambda: not session._outstanding)
+        # 重复 B1：仅重发 AF
+        mcu.write_bytes(encode_frame(ProtocolFrame(FrameType.B1, 2, b"")))
+        time.sleep(0.05)
+    finally:
+        session.close()
+        writer.close()
+
+    assert decode_a1_val(_a1s()[0].val) == ([1, 2, 300], [0, 1, 0], [0, 1, 2])
+    res = replay(list(read_capture(path)), speed=0)
+    assert res.port == "COM3"
+    assert res.rx_chunks == 5
+    assert [t for t, _ in res.captured_tx].count("A1") == 2
+    assert res.tx_match, (res.captured_tx, res.replayed_tx)
+    assert res.stats["counters"].get("b1_duplicates") == 1
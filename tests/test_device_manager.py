@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.comm.device_manager import DeviceManager, cabinet_routes
+from app.comm.protocol import AckCode, FrameType, ProtocolFrame, StreamDecoder, encode_frame
+from app.comm.serial_port import FakeSerialPort
+
+CFG = {
+    "comm": {"enable_heartbeat": False, "retry": {"enabled": False}},
+    "logging": {"hex": {"capture": False}},
+    "sp_mapping": {"block_size": 100, "leds_per_slot": 3},
+    "mapping": {"cabinets": [
+        {"name": "left", "sp_groups": [1, 2]},
+        {"name": "right", "sp_groups": [3], "led_ranges": [[2001, 2100]]},
+    ]},
+}
+
+
+def _mcu(port: FakeSerialPort, seen: list, code: int = AckCode.OK):
+    """单片机侧：记录收到的 A1 载荷（每项 2B，低 13 位为 ID）并回 BF(code)；A0 回 BF(OK)"""
+    mcu = FakeSerialPort()
+    port.connect_peer(mcu)
+    dec = StreamDecoder()
+
+    def _on(data: bytes) -> None:
+        for f in dec.feed(data):
+            if f.type == FrameType.A1:
+                seen.append([int.from_bytes(f.val[i:i + 2], "little") & 0x1FFF for i in range(0, len(f.val), 2)])
+                mcu.write_bytes(encode_frame(ProtocolFrame(FrameType.BF, f.seq, bytes([int(code)]))))
+            elif f.type == FrameType.A0:
+                mcu.write_bytes(encode_frame(ProtocolFrame(FrameType.BF, f.seq, b"\x00")))
+
+    mcu.set_rx_callback(_on)
+    return mcu
+
+
+def test_cabinet_routes_and_split_rebase_indices() -> None:
+    routes = cabinet_routes(CFG)
+    assert [(r.name, r.led_ranges, r.led_offset) for r in routes] == [
+        ("left", ((1, 300), (301, 600)), 0),
+        ("right", ((601, 900), (2001, 2100)), 600),
+    ]
+    dm = DeviceManager(routes)
+    parts = dm.split_payload([5, 610, 305, 2001, 5000], attrs=[1, 0, 0, 1, 0], colors=None)
+    assert parts == {"left": ([5, 305], [1, 0], None), "right": ([10, 1401], [0, 1], None)}
+    assert dm.unrouted_leds == 1
+
+
+def test_b1_fans_out_to_all_cabinets_and_aggregates(monkeypatch) -> None:
+    monkeypatch.setattr("app.comm.session.ConfigRepo.load", lambda self: CFG)
+    payloads = [([5, 610, 305], None, None), ([7], None, None)]
+    dm = DeviceManager(cabinet_routes(CFG), request_handler=lambda: payloads.pop(0))
+    results = []
+    done = threading.Event()
+    dm.on_result = lambda ok: (results.append(ok), done.set())
+    seen_left, seen_right = [], []
+    lp, rp = FakeSerialPort(), FakeSerialPort()
+    left = _mcu(lp, seen_left)
+    _mcu(rp, seen_right)
+    dm.attach("left", lp)
+    dm.attach("right", rp)
+    try:
+        left.write_bytes(encode_frame(ProtocolFrame(FrameType.B1, 0, b"")))
+        assert done.wait(2.0)
+        assert seen_left == [[5, 305]] and seen_right == [[10]]
+        # 第二组只涉及 left：right 收到空 A1 熄灯
+        done.clear()
+        left.write_bytes(encode_frame(ProtocolFrame(FrameType.B1, 1, b"")))
+        assert done.wait(2.0)
+        assert seen_left[-1] == [7] and seen_right[-1] == []
+        assert results == [True, True]
+        assert dm.stats()["dispatches"] == 2
+    finally:
+        dm.close()
+
+
+def test_one_failing_cabinet_fails_the_dispatch(monkeypatch) -> None:
+    monkeypatch.setattr("app.comm.session.ConfigRepo.load", lambda self: CFG)
+    dm = DeviceManager(cabinet_routes(CFG), request_handler=lambda: ([5, 610], None, None))
+    results = []
+    done = threading.Event()
+    dm.on_result = lambda ok: (results.append(ok), done.set())
+    lp, rp = FakeSerialPort(), FakeSerialPort()
+    left = _mcu(lp, [])
+    _mcu(rp, [], code=AckCode.VAL_ERROR)
+    dm.attach("left", lp)
+    dm.attach("right", rp)
+    try:
+        left.write_bytes(encode_frame(ProtocolFrame(FrameType.B1, 0, b"")))
+        assert done.wait(2.0)
+        assert results == [False]
+        assert dm.broadcast_heartbeat() == {"left": True, "right": True}
+    finally:
+        dm.close()
+
+
+def test_b1_during_pending_dispatch_does_not_stall_the_session(monkeypatch) -> None:
+    monkeypatch.setattr("app.comm.session.ConfigRepo.load", lambda self: CFG)
+    dm = DeviceManager(cabinet_routes(CFG), request_handler=lambda: ([5, 610], None, None))
+    results = []
+    done = threading.Event()
+    dm.on_result = lambda ok: (results.append(ok), len(results) == 2 and done.set())
+    lp, rp = FakeSerialPort(), FakeSerialPort()
+    left = _mcu(lp, [])
+    right = FakeSerialPort()
+    rp.connect_peer(right)
+    dec = StreamDecoder()
+    a1_seqs = []
+
+    def _slow_bf(data: bytes) -> None:
+        # right 延迟应答 A1：第一次派发仍在等待时第二个 B1 已到达
+        for f in dec.feed(data):
+            if f.type == FrameType.A1:
+                a1_seqs.append(f.seq)
+                threading.Timer(0.1, lambda s=f.seq: right.write_bytes(
+                    encode_frame(ProtocolFrame(FrameType.BF, s, b"\x00")))).start()
+
+    right.set_rx_callback(_slow_bf)
+    dm.attach("left", lp)
+    dm.attach("right", rp)
+    try:
+        t0 = time.monotonic()
+        left.write_bytes(encode_frame(ProtocolFrame(FrameType.B1, 0, b"")))
+        right.write_bytes(encode_frame(ProtocolFrame(FrameType.B1, 0, b"")))
+        # 两个 B1 的 AF 立即发出（会话线程不等待上一次派发）
+        time.sleep(0.05)
+        frames = [(f.type, f.seq) for f in StreamDecoder().feed(b"".join(right.rx_log))]
+        assert (FrameType.AF, 0) in frames
+        assert done.wait(2.0)
+        assert time.monotonic() - t0 < 1.0
+        assert results == [True, True] and a1_seqs == [0, 1]
+        assert dm.stats()["pending"] == 0
+    finally:
+        dm.close()
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.business.dispatcher import Dispatcher
+from app.business.grouping import GroupTriplet
+from conftest import wait_for
+
+
+class _Grouping:
+    def __init__(self, groups):
+        self.groups = groups
+
+    def group(self, work_dir):
+        return list(self.groups)
+
+
+class _Mapping:
+    def __init__(self):
+        self.calls = []
+
+    def compose_indices_attrs_and_colors_for_group(self, group):
+        self.calls.append(group.key)
+        txt = group.files["R"][0]
+        n = len(Path(txt).read_text())
+        return [n], None, [0]
+
+
+def _make(monkeypatch, tmp_path: Path, n: int, depth: int = 2):
+    monkeypatch.setattr(
+        "app.business.dispatcher.ConfigRepo.load",
+        lambda self: {"dispatcher": {"prefetch_depth": depth}},
+    )
+    groups = []
+    for i in range(n):
+        txt = tmp_path / f"g{i}.txt"
+        txt.write_text("x" * (i + 1))
+        groups.append(GroupTriplet(key=f"g{i}", files={"R": (txt, tmp_path / f"g{i}.jpg")}))
+    mapping = _Mapping()
+    disp = Dispatcher(work_dir=tmp_path, grouping=_Grouping(groups), mapping=mapping)
+    return disp, mapping, groups
+
+
+def test_payloads_are_precomposed_and_served_on_dequeue(monkeypatch, tmp_path) -> None:
+    disp, mapping, _groups = _make(monkeypatch, tmp_path, n=4)
+    try:
+        wait_for(lambda: len(disp._prefetched) == 2)
+        assert sorted(mapping.calls) == ["g0", "g1"]
+        assert disp.request_next_payload() == ([1], None, [0])
+        assert disp.prefetch_hits == 1
+        # 出队后后台补齐窗口
+        wait_for(lambda: "g2" in mapping.calls)
+        assert disp.request_next_payload() == ([2], None, [0])
+        assert disp.prefetch_hits == 2
+        assert disp._last_dispatched.key == "g1"
+    finally:
+        disp.close()
+
+
+def test_changed_file_invalidates_prefetched_payload(monkeypatch, tmp_path) -> None:
+    disp, mapping, groups = _make(monkeypatch, tmp_path, n=1)
+    try:
+        wait_for(lambda: len(disp._prefetched) == 1)
+        txt = groups[0].files["R"][0]
+        txt.write_text("y" * 10)
+        os.utime(txt, ns=(time.time_ns(), time.time_ns() + 1_000_000_000))
+        assert disp.request_next_payload() == ([10], None, [0])
+        assert disp.prefetch_misses == 1
+        assert disp.request_next_payload() == ([], None, None)
+    finally:
+        disp.close()
+
+
+def test_close_keeps_prefetch_stopped(monkeypatch, tmp_path) -> None:
+    disp, mapping, _groups = _make(monkeypatch, tmp_path, n=3)
+    wait_for(lambda: len(disp._prefetched) == 2)
+    disp.close()
+    # close() 之后在途的出队/重载不会重新启动预合成线程
+    assert disp.request_next_payload() == ([1], None, [0])
+    disp.reload()
+    assert disp._prefetch_thread is None
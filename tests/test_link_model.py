@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import pytest
+
+from app.comm.link_model import UartLinkModel
+from app.comm.protocol import build_a1_packed
+from app.comm.serial_port import FakeSerialPort
+from app.comm.session import SerialSession
+
+
+def test_wire_time_counts_start_parity_and_stop_bits() -> None:
+    assert UartLinkModel.from_config({"baud": 115200}).wire_time_sec(11520) == pytest.approx(1.0)
+    m = UartLinkModel.from_config({"baud": 9600, "data_bits": 8, "parity": "E", "stop_bits": 2})
+    assert m.bits_per_byte == 12
+    assert m.wire_time_sec(800) == pytest.approx(1.0)
+
+
+def test_a1_deadline_grows_with_payload(monkeypatch) -> None:
+    monkeypatch.setattr(
+        "app.comm.session.ConfigRepo.load",
+        lambda self: {
+            "serial": {"baud": 115200},
+            "comm": {"enable_heartbeat": False, "cmd_timeout_ms": 200, "a1_deadline": {"per_led_us": 100}},
+            "logging": {"hex": {"capture": False}},
+        },
+    )
+    session = SerialSession(port=FakeSerialPort())
+    try:
+        small = build_a1_packed(indices=[1, 2], seq=0)
+        big = build_a1_packed(indices=list(range(600)), seq=1)
+        assert session.expected_timeout_ms(small) == 200 + 2
+        # 1211 字节 ≈ 105 ms 线路时间 + 600 × 0.1 ms 逐灯处理 + BF 约 1 ms
+        assert session.expected_timeout_ms(big) == 200 + 105 + 60 + 1
+    finally:
+        session.close()
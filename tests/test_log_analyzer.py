@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.comm.protocol import FrameType, ProtocolFrame, build_a0, build_a1_packed, encode_af, encode_frame
+from app.logs.logger import hex_dump
+from app.tools.log_analyzer import analyze, iter_log_files
+
+
+def _line(ms: int, direction: str, data: bytes, name: str = "session") -> str:
+    s, ms = divmod(ms, 1000)
+    m, s = divmod(s, 60)
+    return f"2025-01-02 03:{m:02d}:{s:02d},{ms:03d} DEBUG {name} - {direction} HEX: {hex_dump(data)}\n"
+
+
+def _f(t: FrameType, seq: int, val: bytes = b"") -> bytes:
+    return encode_frame(ProtocolFrame(t, seq, val))
+
+
+def test_exchanges_latency_retries_and_errors(tmp_path) -> None:
+    a1 = encode_frame(build_a1_packed(indices=[1, 2], seq=5))
+    lines = [
+        "2025-01-02 03:00:00,000 INFO session - TX worker started\n",
+        _line(0, "RX", _f(FrameType.B1, 1)),
+        _line(2, "TX", bytes(encode_af(1, 0))),
+        _line(10, "TX", a1),
+        _line(400, "TX", a1),  # 重发
+        _line(430, "RX", _f(FrameType.BF, 5, b"\x00")[:7]),  # BF 跨两个 RX 分片
+        _line(431, "RX", _f(FrameType.BF, 5, b"\x00")[7:]),
+        _line(500, "RX", _f(FrameType.B1, 1)),  # 重复 B1
+        _line(501, "TX", bytes(encode_af(1, 2))),
+        _line(9000, "RX", _f(FrameType.B1, 3)),  # 缺 B1 seq=2；8.5s 静默
+        _line(9001, "TX", bytes(encode_af(3, 0)) + encode_frame(build_a0())),
+        _line(9020, "RX", _f(FrameType.BF, 0xFFFF, b"\x00") + b"\xF2\xF8\xF1\xF2\xB1\x03\x00\x04\x00\x00"),
+    ]
+    (tmp_path / "app.log.1").write_text("".join(lines[:5]), encoding="utf-8")
+    (tmp_path / "app.log").write_text("".join(lines[5:]), encoding="utf-8")
+    files = iter_log_files([str(tmp_path / "app.log*")])
+    assert [Path(f).name for f in files] == ["app.log.1", "app.log"]
+
+    rows: list = []
+    rep = analyze(files, on_exchange=lambda name, ex, st: rows.append((ex.b1_seq, st, ex.a1_sends))).report()
+    assert rep["hex_lines"] == 11
+    s = rep["sessions"]["session"]
+    assert s["exchanges"] == {"ok": 1, "no_a1": 1}
+    assert rows == [(1, "ok", 2), (3, "no_a1", 0)]
+    assert s["counters"]["a1_retries"] == 1
+    assert s["counters"]["b1_duplicates"] == 1
+    assert s["counters"]["b1_missing"] == 1
+    assert s["latency"]["b1_to_af"]["count"] == 2
+    assert s["latency"]["a1_to_bf"]["max_ms"] == 421.0
+    assert s["latency"]["a0_to_bf"]["max_ms"] == 19.0
+    assert s["decode_errors"] == {"RX:CHECKSUM_ERROR": 1}
+    assert s["silent_gaps"] == 1
@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.comm.protocol import FrameType, StreamDecoder, build_a1_packed, encode_frame
+from app.comm.serial_port import FakeSerialPort
+from app.tools.mcu_emulator import EmulatorConfig, McuEmulator, run_load
+from conftest import wait_for
+
+
+def test_emulator_renders_a1_and_checks_seq() -> None:
+    host, dev = FakeSerialPort(), FakeSerialPort()
+    host.connect_peer(dev)
+    emu = McuEmulator(dev, EmulatorConfig(b1_interval_sec=10, a1_delay_sec=0, max_requests=1), name="d")
+    dec = StreamDecoder()
+    got: list = []
+    host.set_rx_callback(lambda b: got.extend((f.type, f.seq, f.val) for f in dec.feed(b)))
+    emu.start()
+    try:
+        wait_for(lambda: (FrameType.B1, 0, b"") in got)
+        host.write_bytes(encode_frame(build_a1_packed(indices=[5, 9], seq=7, attrs=[1, 0], colors=[2, 1])))
+        wait_for(lambda: (FrameType.BF, 7, b"\x00") in got)
+        assert emu.lit == 2
+        assert emu.framebuffer[5] == (3 | 0x80) and emu.framebuffer[9] == 2
+        # 重复 SEQ 仅重发 BF；跳号回 SEQ_TOO_LARGE
+        host.write_bytes(encode_frame(build_a1_packed(indices=[1], seq=7)))
+        host.write_bytes(encode_frame(build_a1_packed(indices=[1], seq=9)))
+        wait_for(lambda: (FrameType.BF, 9, b"\x04") in got)
+        assert [x for x in got if x[0] == FrameType.BF] == [(FrameType.BF, 7, b"\x00")] * 2 + [(FrameType.BF, 9, b"\x04")]
+        assert emu.lit == 2
+        assert emu.counters["a1_duplicates"] == 1 and emu.counters["a1_seq_errors"] == 1
+    finally:
+        emu.stop()
+
+
+def test_load_run_archives_all_triplets(tmp_path) -> None:
+    cfg = EmulatorConfig(b1_interval_sec=0.001, a1_delay_sec=0.001, noise_prob=0.5, max_chunk=7, seed=1)
+    rep = run_load(devices=2, triplets=3, duration_sec=10.0, cfg=cfg, sp_per_file=5, work_root=tmp_path)
+    assert rep["triplets_ok"] == 6 and rep["triplets_failed"] == 0
+    assert rep["latency"]["device_b1_to_a1"]["count"] == 6
+    assert rep["emulator"]["noise_lines"] > 0
+    for name in ("dev0", "dev1"):
+        assert rep["per_device"][name]["lit"] > 0
+        assert len(list((tmp_path / name / "done").glob("*.txt"))) == 9
+        assert not list((tmp_path / name / "work").glob("*.txt"))
@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import os
+import select
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.comm.port_supervisor import PortSupervisor
+from app.comm.protocol import AckCode, FrameType, ProtocolFrame, StreamDecoder, encode_frame
+from app.comm.pyserial_port import PySerialPort
+from app.comm.session import SerialSession, SessionState
+
+
+def _read_frames(master: int, want: int, timeout: float = 2.0):
+    dec, frames = StreamDecoder(), []
+    end = time.monotonic() + timeout
+    while len(frames) < want and time.monotonic() < end:
+        if select.select([master], [], [], 0.05)[0]:
+            frames += dec.feed(os.read(master, 4096))
+    return frames
+
+
+def test_supervisor_reopens_lost_port_and_rebinds_session(monkeypatch, pty_pair) -> None:
+    monkeypatch.setattr(
+        "app.comm.session.ConfigRepo.load",
+        lambda self: {
+            "comm": {"enable_heartbeat": False, "retry": {"enabled": False}},
+            "logging": {"hex": {"capture": False}},
+            "serial": {"supervisor": {"backoff_initial_ms": 20, "backoff_max_ms": 50, "health_check_ms": 50}},
+        },
+    )
+    m1, _s1, name1 = pty_pair()
+    names = [name1]
+    sup = PortSupervisor(PySerialPort, candidates=lambda: list(names))
+    port = sup.open_port()
+    assert port is not None
+    session = SerialSession(port, request_handler=lambda: ([5], None), name="sup-test")
+    sup.attach(session)
+    try:
+        os.write(m1, encode_frame(ProtocolFrame(FrameType.B1, 1, b"")))
+        frames = _read_frames(m1, 2)
+        assert [f.type for f in frames] == [FrameType.AF, FrameType.A1]
+        os.write(m1, encode_frame(ProtocolFrame(FrameType.BF, frames[1].seq, b"\x00")))
+        time.sleep(0.05)
+
+        # 拔出：主端关闭后从端读到 EIO；设备以新路径重新枚举
+        m2, _s2, names[0] = pty_pair()
+        os.close(m1)
+        end = time.monotonic() + 3.0
+        while sup.recovered_count < 1 and time.monotonic() < end:
+            time.sleep(0.01)
+        assert sup.recovered_count == 1 and sup.port is not port and session.port is sup.port
+        assert port.lost and session.state == SessionState.OFFLINE
+
+        # 设备复位后从 SEQ=1 重新开始：按新序列处理，而不是判为重复 B1
+        os.write(m2, encode_frame(ProtocolFrame(FrameType.B1, 1, b"")))
+        frames = _read_frames(m2, 2)
+        assert [f.type for f in frames] == [FrameType.AF, FrameType.A1]
+        assert frames[0].val == bytes([int(AckCode.OK)])
+        st = session.stats()
+        assert st["counters"]["port_lost"] == 1 and st["counters"]["port_rebinds"] == 1
+        assert st["latency"]["port_recovery"]["count"] == 1
+        assert sup.stats()["last_recovery_sec"] < 2.0
+    finally:
+        session.close()
+        sup.stop()
@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import random
+import sys
+from array import array
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.comm import protocol
+from app.comm.protocol import build_a1, build_a1_packed, encode_a1, encode_frame
+
+
+def _cases():
+    rnd = random.Random(20240601)
+    yield [], None, None
+    yield [789], None, None
+    yield [5, 10, 150, 890, 1200], None, None
+    yield [1, 2, 3], [0, 1, 0], [0, 1, 2]
+    yield [1, 2, 3, 4], [1], [2, 3]  # attrs/colors 短于 indices
+    yield [0x7FFF, 0xFFFF, 0x1FFF], [3, 2, 1], [7, 4, 5]  # 超范围位被截断
+    for m in (63, 64, 600):
+        idx = [rnd.randint(1, 8191) for _ in range(m)]
+        at = [rnd.randint(0, 1) for _ in range(m)]
+        co = [rnd.randint(0, 3) for _ in range(m)]
+        yield idx, at, co
+        yield array("H", idx), array("H", at), array("H", co)
+
+
+def test_encode_a1_is_byte_identical_to_build_a1_encode_frame(monkeypatch) -> None:
+    paths = [None]
+    if protocol._np is not None:
+        paths.append(protocol._np)
+    for np_mod in paths:
+        monkeypatch.setattr(protocol, "_np", np_mod)
+        for seq in (0, 0x0405, 0xFFFF):
+            for indices, attrs, colors in _cases():
+                ref = encode_frame(
+                    build_a1(
+                        list(indices),
+                        seq=seq,
+                        attrs=None if attrs is None else list(attrs),
+                        colors=None if colors is None else list(colors),
+                    )
+                )
+                assert bytes(encode_a1(indices, seq=seq, attrs=attrs, colors=colors)) == ref
+
+
+def test_build_a1_packed_equals_build_a1_frame() -> None:
+    frame = build_a1_packed([5, 10, 150], seq=3, attrs=[1, 0, 0], colors=[0, 1, 2])
+    assert frame == build_a1([5, 10, 150], seq=3, attrs=[1, 0, 0], colors=[0, 1, 2])
+    assert encode_frame(frame) == encode_frame(build_a1([5, 10, 150], seq=3, attrs=[1, 0, 0], colors=[0, 1, 2]))
+    assert len(frame.val) == 6
+
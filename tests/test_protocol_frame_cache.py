@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.comm.protocol import (
+    AckCode,
+    FrameType,
+    ProtocolFrame,
+    build_a0,
+    build_af,
+    encode_a0,
+    encode_af,
+    encode_frame,
+)
+
+
+def test_a0_af_templates_match_encode_frame() -> None:
+    assert encode_a0() is encode_a0()
+    assert encode_a0().hex().upper() == "F2F8F1F2A00300FFFFA1"
+    assert encode_frame(build_a0()) == encode_frame(ProtocolFrame(FrameType.A0, 0xFFFF, b""))
+    assert encode_a0(7) == encode_frame(ProtocolFrame(FrameType.A0, 7, b""))
+    for code in list(AckCode) + [0x7F]:
+        for seq in (0, 1, 0x00FF, 0x0100, 0x0005, 0xFFFF, 0x1234):
+            ref = encode_frame(ProtocolFrame(FrameType.AF, seq, bytes([int(code)])))
+            assert bytes(encode_af(seq, code)) == ref
+            assert build_af(seq, code) == ProtocolFrame(FrameType.AF, seq, bytes([int(code)]))
+    assert bytes(encode_af(0x0005, 0)).hex().upper() == "F2F8F1F2AF0400050000B8"
@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.comm.protocol import (
+    AckCode,
+    FrameType,
+    ProtocolFrame,
+    StreamDecoder,
+    build_af,
+    decode_stream,
+    encode_frame,
+)
+
+
+def _stream() -> bytes:
+    b0 = encode_frame(ProtocolFrame(FrameType.B0, 0xFFFF, b""))
+    b1 = encode_frame(ProtocolFrame(FrameType.B1, 7, b""))
+    bf = encode_frame(ProtocolFrame(FrameType.BF, 3, b"\x00"))
+    bad = bytearray(encode_frame(ProtocolFrame(FrameType.B1, 8, b"")))
+    bad[-1] ^= 0xFF
+    return b"boot ok\r\n" + b0 + b1 + bytes(bad) + b"log line\r\n" + bf
+
+
+def test_stream_decoder_matches_decode_stream_for_any_chunking() -> None:
+    data = _stream()
+    ref_err: list = []
+    ref_garbage: list = []
+    expected = decode_stream(
+        bytearray(data),
+        on_error=lambda c, s: ref_err.append((c, s)),
+        on_garbage=ref_garbage.append,
+    )
+    assert [(f.type, f.seq, f.val) for f in expected] == [
+        (FrameType.B0, 0xFFFF, b""),
+        (FrameType.B1, 7, b""),
+        (FrameType.BF, 3, b"\x00"),
+    ]
+    assert ref_err == [(AckCode.CHECKSUM_ERROR, 8)]
+
+    for size in (1, 2, 3, 5, 11, 64):
+        errs: list = []
+        garbage: list = []
+        dec = StreamDecoder(on_error=lambda c, s: errs.append((c, s)), on_garbage=garbage.append)
+        frames = []
+        for i in range(0, len(data), size):
+            frames.extend(dec.feed(data[i:i + size]))
+        assert frames == expected
+        assert errs == ref_err
+        assert b"".join(garbage) == b"".join(ref_garbage)
+        assert dec.pending() == 0
+
+
+def test_stream_decoder_keeps_split_header_and_compacts() -> None:
+    dec = StreamDecoder(compact_threshold=16)
+    af = encode_frame(build_af(seq=5, code=AckCode.OK))
+    assert dec.feed(b"noise" + af[:2]) == []
+    assert dec.pending() == 2
+    frames = dec.feed(af[2:] + af[:9])
+    assert frames == [build_af(seq=5, code=AckCode.OK)]
+    assert dec.pending() == 9
+    assert dec.feed(af[9:]) == [build_af(seq=5, code=AckCode.OK)]
+    assert dec.pending() == 0
+
+
+def test_oversized_len_is_rejected_without_waiting() -> None:
+    errs: list = []
+    dec = StreamDecoder(on_error=lambda c, s: errs.append(c))
+    bf = encode_frame(ProtocolFrame(FrameType.BF, 9, b"\x00"))
+    # HEADER + B1 + LEN=0xFFF0：按旧逻辑需等待约 64KB 才能继续
+    frames = dec.feed(b"\xF2\xF8\xF1\xF2\xB1\xF0\xFF" + bf)
+    assert frames == [ProtocolFrame(FrameType.BF, 9, b"\x00")]
+    assert errs == [AckCode.LEN_ERROR]
+    assert dec.pending() == 0
+    assert dec.stats()["len_rejects"] == 1
+
+
+def test_overlapping_header_after_bad_len_is_found() -> None:
+    dec = StreamDecoder()
+    b1 = encode_frame(ProtocolFrame(FrameType.B1, 1, b""))
+    # 坏 HEADER 的末字节 F2 同时是合法帧 HEADER 的首字节
+    assert dec.feed(b"\xF2\xF8\xF1" + b1) == [ProtocolFrame(FrameType.B1, 1, b"")]
+
+
+def test_checksum_failure_keeps_frame_hidden_inside_region() -> None:
+    errs: list = []
+    dec = StreamDecoder(on_error=lambda c, s: errs.append(c))
+    bf = encode_frame(ProtocolFrame(FrameType.BF, 2, b"\x00"))
+    b1 = encode_frame(ProtocolFrame(FrameType.B1, 3, b""))
+    # 截断的 BF（缺 CHECK）后紧跟完整帧：LEN 会把后续帧首字节算进坏帧
+    frames = dec.feed(bf[:-1] + b1 + bf)
+    assert frames == [ProtocolFrame(FrameType.B1, 3, b""), ProtocolFrame(FrameType.BF, 2, b"\x00")]
+    assert errs == [AckCode.CHECKSUM_ERROR]
+
+
+
+def test_checksum_resync_does_not_depend_on_chunking() -> None:
+    bf = encode_frame(ProtocolFrame(FrameType.BF, 2, b"\x00"))
+    b1 = encode_frame(ProtocolFrame(FrameType.B1, 3, b""))
+    data = bf[:9] + b1
+    # 坏帧区间结束在分片末尾、下一帧 HEADER 跨分片时，也要保留 HEADER 前缀等待后续字节
+    for cut in range(len(data) + 1):
+        errs: list = []
+        dec = StreamDecoder(on_error=lambda c, s: errs.append(c))
+        frames = dec.feed(data[:cut]) + dec.feed(data[cut:])
+        assert frames == [ProtocolFrame(FrameType.B1, 3, b"")], cut
+        assert errs == [AckCode.CHECKSUM_ERROR], cut
+
+def test_custom_max_len_and_stall_metrics() -> None:
+    dec = StreamDecoder(max_len={int(FrameType.B1): 3, -1: 4})
+    b1 = encode_frame(ProtocolFrame(FrameType.B1, 4, b""))
+    assert dec.feed(b1[:8]) == []
+    assert dec.feed(b1[8:]) == [ProtocolFrame(FrameType.B1, 4, b"")]
+    st = dec.stats()
+    assert st["stalls"] == 1
+    assert st["stall_max_ms"] >= 0.0
+    # 未知 TYPE 超过上限：立即判废
+    errs: list = []
+    dec.on_error = lambda c, s: errs.append(c)
+    assert dec.feed(b"\xF2\xF8\xF1\xF2\x55\x10\x00") == []
+    assert errs == [AckCode.LEN_ERROR]
@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.comm.protocol import FrameType, ProtocolFrame, encode_frame
+from app.comm.session import SerialSession
+from app.tools.mcu_emulator import EmulatorConfig, McuEmulator
+from conftest import wait_for
+
+
+def _cfg(monkeypatch) -> None:
+    monkeypatch.setattr(
+        "app.comm.session.ConfigRepo.load",
+        lambda self: {"comm": {"enable_heartbeat": False, "retry": {"enabled": False}}, "logging": {"hex": {"capture": False}}},
+    )
+
+
+def test_session_over_real_port_with_scripted_mcu(monkeypatch, pty_loopback) -> None:
+    _cfg(monkeypatch)
+    loop = pty_loopback()
+    mcu = loop.scripted()
+    results = []
+    session = SerialSession(loop.host, request_handler=lambda: ([3, 4], None), name="pty-e2e")
+    session.on_a1_result = results.append
+    try:
+        # B1 逐字节写出：经真实 fd 分片到达，会话仍须完整解码
+        for b in encode_frame(ProtocolFrame(FrameType.B1, 1, b"")):
+            loop.device.write_bytes(bytes([b]))
+            time.sleep(0.0005)
+        frames = mcu.wait_frames(2)
+        assert [f.type for f in frames] == [FrameType.AF, FrameType.A1]
+        wait_for(lambda: results)
+        assert results == [True]
+        assert session.stats()["link"]["port"]["rx_bytes"] == 10 + 11  # B1 + BF
+    finally:
+        session.close()
+
+
+@pytest.mark.parametrize("impl", ["thread", "reactor"])
+def test_emulated_mcu_cycles_over_pty(monkeypatch, pty_loopback, impl) -> None:
+    _cfg(monkeypatch)
+    factory = None
+    if impl == "reactor":
+        from app.comm.reactor import PortReactor, ReactorSerialPort
+        reactor = PortReactor()
+        reactor.start()
+        factory = lambda: ReactorSerialPort(reactor)  # noqa: E731
+    loop = pty_loopback(factory)
+    results = []
+    session = SerialSession(loop.host, request_handler=lambda: ([1, 2, 3], [0, 1, 0]), name=f"pty-{impl}")
+    session.on_a1_result = results.append
+    emu = McuEmulator(loop.device, EmulatorConfig(b1_interval_sec=0.0, max_requests=5, max_chunk=7, seed=3), name="pty-mcu")
+    try:
+        emu.start()
+        wait_for(lambda: len(results) >= 5)
+        assert results == [True] * 5
+        assert emu.counters["a1_received"] == 5 and emu.counters["a1_seq_errors"] == 0
+        assert emu.lit == 3
+    finally:
+        emu.stop()
+        session.close()
+        if impl == "reactor":
+            reactor.stop()
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import os
+import select
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.comm.pyserial_port import PySerialPort
+
+
+def _open(monkeypatch, pty_pair, mode: str, coalesce_us: int = 20000):
+    monkeypatch.setattr(
+        "app.comm.pyserial_port.ConfigRepo.load",
+        lambda self: {"serial": {"rx": {"mode": mode, "coalesce_max_us": coalesce_us, "inter_byte_chars": 3}}},
+    )
+    master, _slave, name = pty_pair()
+    port = PySerialPort()
+    chunks: list = []
+    got = threading.Event()
+    port.set_rx_callback(lambda b: (chunks.append(b), got.set()))
+    port.open(name, baud=115200)
+    return port, master, chunks, got
+
+
+@pytest.mark.parametrize("mode", ["select", "blocking", "poll"])
+def test_rx_modes_deliver_bytes(monkeypatch, pty_pair, mode) -> None:
+    port, master, chunks, got = _open(monkeypatch, pty_pair, mode)
+    try:
+        assert port.stats()["rx_mode"] == mode
+        os.write(master, b"\xF2\xF8\xF1\xF2\xB1\x03\x00\x01\x00\xB5")
+        assert got.wait(1.0)
+        end = time.monotonic() + 1.0
+        while sum(len(c) for c in chunks) < 10 and time.monotonic() < end:
+            time.sleep(0.005)
+        assert b"".join(chunks) == b"\xF2\xF8\xF1\xF2\xB1\x03\x00\x01\x00\xB5"
+        assert port.stats()["rx_bytes"] == 10
+        # 发送经缓冲由 I/O 循环（select）或 TX 线程（blocking/poll）写出
+        port.write_bytes(b"hello")
+        assert select.select([master], [], [], 1.0)[0] and os.read(master, 16) == b"hello"
+        assert port.wait_tx_drained(1.0) and port.stats()["tx_drained_bytes"] == 5
+    finally:
+        port.close()
+
+
+def test_select_mode_coalesces_back_to_back_writes(monkeypatch, pty_pair) -> None:
+    port, master, chunks, got = _open(monkeypatch, pty_pair, "select", coalesce_us=50000)
+    port.inter_byte_chars = 200  # 间隔上限约 17 ms，覆盖下方两次写入之间的间隔
+    try:
+        os.write(master, b"abc")
+        time.sleep(0.002)
+        os.write(master, b"def")
+        assert got.wait(1.0)
+        time.sleep(0.1)
+        assert chunks == [b"abcdef"]
+        assert port.rx_callbacks == 1 and port.rx_reads == 2
+    finally:
+        port.close()
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.comm.reactor import PortReactor, ReactorSerialPort
+from conftest import wait_for
+
+
+def test_reactor_dispatches_many_ports_on_one_thread(pty_pair) -> None:
+    reactor = PortReactor()
+    reactor.start()
+    threads_before = threading.active_count()
+    ptys, ports, got = [], [], {}
+    try:
+        for i in range(6):
+            master, slave, name = pty_pair()
+            p = ReactorSerialPort(reactor)
+            p.set_rx_callback(lambda b, i=i: got.setdefault(i, bytearray()).extend(b))
+            p.open(name)
+            ptys.append((master, slave))
+            ports.append(p)
+        assert threading.active_count() == threads_before
+        assert reactor.stats()["ports"] == 6
+        for i, (master, _s) in enumerate(ptys):
+            os.write(master, bytes([i]) * 5)
+        wait_for(lambda: all(len(got.get(i, b"")) == 5 for i in range(6)))
+        assert {i: bytes(b) for i, b in got.items()} == {i: bytes([i]) * 5 for i in range(6)}
+
+        ports[2].write_bytes(b"\xF2\xF8\xF1\xF2")
+        assert os.read(ptys[2][0], 16) == b"\xF2\xF8\xF1\xF2"
+        ports[2].close()
+        assert not ports[2].is_open and reactor.stats()["ports"] == 5
+        assert ports[2].stats()["rx_mode"] == "reactor"
+    finally:
+        for p in ports:
+            p.close()
+        reactor.stop()
+
+
+def test_reactor_buffers_writes_until_writable(pty_pair) -> None:
+    reactor = PortReactor()
+    reactor.start()
+    master, _slave, name = pty_pair()
+    port = ReactorSerialPort(reactor)
+    try:
+        port.open(name)
+        blob = bytes(range(256)) * 1024  # 大于 pty 内核缓冲区
+        port.write_bytes(blob)
+        assert port.stats()["tx_pending"] > 0
+        out = bytearray()
+        end = time.monotonic() + 5.0
+        while len(out) < len(blob) and time.monotonic() < end:
+            out += os.read(master, 65536)
+        assert bytes(out) == blob
+        wait_for(lambda: port.stats()["tx_pending"] == 0)
+        assert port.stats()["tx_pending"] == 0
+    finally:
+        port.close()
+        reactor.stop()
+
+
+def test_reactor_write_error_reports_port_lost(pty_pair, monkeypatch) -> None:
+    reactor = PortReactor()
+    reactor.start()
+    _master, _slave, name = pty_pair()
+    port = ReactorSerialPort(reactor)
+    lost = threading.Event()
+    reasons = []
+    port.set_lost_callback(lambda r: (reasons.append(r), lost.set()))
+    try:
+        port.open(name)
+        real_write, port_fd = os.write, port._fd
+
+        def _eio(fd, data):
+            if fd == port_fd:
+                raise OSError(5, "Input/output error")
+            return real_write(fd, data)  # 反应器唤醒管道照常写
+        monkeypatch.setattr("app.comm.reactor.os.write", _eio)
+        port.write_bytes(b"\xF2\xF8\xF1\xF2")
+        # 写入 EIO 与读端 EOF 一样视为设备丢失：从反应器注销并通知监管者
+        assert lost.wait(2.0)
+        assert "Serial write failed" in reasons[0]
+        assert not port.is_open and reactor.stats()["ports"] == 0
+    finally:
+        port.close()
+        reactor.stop()
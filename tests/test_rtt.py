@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.comm.protocol import FrameType, ProtocolFrame, StreamDecoder, build_a0, encode_frame
+from app.comm.rtt import RttEstimator
+from app.comm.serial_port import FakeSerialPort
+from app.comm.session import SerialSession
+
+
+def test_estimator_tracks_rtt_and_backs_off() -> None:
+    est = RttEstimator(initial_sec=0.3, floor_sec=0.02, ceiling_sec=2.0)
+    assert est.rto_sec() == 0.3
+    est.sample(0.004)
+    # SRTT + 4·RTTVAR = 0.004 + 0.008，低于下限
+    assert est.rto_sec() == 0.02
+    for _ in range(50):
+        est.sample(0.5)
+    assert 0.5 <= est.rto_sec() <= 0.7
+    est.on_timeout()
+    est.on_timeout()
+    assert est.rto_sec() == 2.0
+    est.sample(0.5)
+    assert est.rto_sec() < 1.0
+
+
+def test_session_timeouts_follow_measured_rtt(monkeypatch) -> None:
+    monkeypatch.setattr(
+        "app.comm.session.ConfigRepo.load",
+        lambda self: {
+            "comm": {"enable_heartbeat": False, "retry": {"enabled": True, "ack_timeout_ms": 300}, "rtt": {"floor_ms": 20}},
+            "logging": {"hex": {"capture": False}},
+        },
+    )
+    port, mcu = FakeSerialPort(), FakeSerialPort()
+    port.connect_peer(mcu)
+    dec = StreamDecoder()
+
+    def _answer(data: bytes) -> None:
+        for f in dec.feed(data):
+            if f.type == FrameType.A0:
+                mcu.write_bytes(encode_frame(ProtocolFrame(FrameType.BF, f.seq, b"\x00")))
+
+    mcu.set_rx_callback(_answer)
+    session = SerialSession(port=port)
+    try:
+        assert session.default_timeout_ms(FrameType.A0) == 300
+        for _ in range(5):
+            assert session.send_with_ack(build_a0()).result(timeout=1.0) is True
+        st = session.rtt_stats()["A0"]
+        assert st["samples"] == 5
+        # 应答很快：单次等待收敛到下限
+        assert session.default_timeout_ms(FrameType.A0) == 20
+        assert session.default_timeout_ms(FrameType.A1) == session.cmd_timeout_ms
+    finally:
+        session.close()
+
+
+def test_each_attempt_timeout_backs_off_the_rto(monkeypatch) -> None:
+    monkeypatch.setattr(
+        "app.comm.session.ConfigRepo.load",
+        lambda self: {
+            "comm": {"enable_heartbeat": False, "retry": {"enabled": True, "max_attempts": 3, "backoff_ms": 0},
+                     "rtt": {"floor_ms": 10, "ceiling_ms": 1000}},
+            "logging": {"hex": {"capture": False}},
+        },
+    )
+    session = SerialSession(port=FakeSerialPort())
+    try:
+        est = session._rtt[FrameType.A0]
+        est.sample(0.005)
+        rto0 = est.rto_sec()
+        # 无应答的交互共 3 次尝试：每次尝试超时都翻倍
+        assert session.send_with_ack(build_a0()).result(timeout=2.0) is False
+        assert session.rtt_stats()["A0"]["timeouts"] == 3
+        assert est.rto_sec() == pytest.approx(rto0 * 8)
+    finally:
+        session.close()
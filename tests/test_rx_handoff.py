@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import sys
+import threading
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.comm.protocol import FrameType, ProtocolFrame, encode_frame
+from app.comm.rx_handoff import RxHandoff
+from app.comm.serial_port import FakeSerialPort
+from app.comm.session import SerialSession
+
+
+def test_rx_handoff_keeps_order_and_counts_overflow() -> None:
+    gate = threading.Event()
+    seen = []
+
+    def _consume(data: bytes, t_read: float) -> None:
+        gate.wait(1.0)
+        seen.append(data)
+
+    h = RxHandoff(_consume, max_chunks=3, max_bytes=1024)
+    try:
+        for i in range(6):
+            h.push(bytes([i]))
+        # 消费者阻塞在首个分片：队列容量 3（含正在处理的分片），其余丢弃并计数
+        st = h.stats()
+        assert st["overflow_chunks"] == 3 and st["peak_chunks"] == 3
+        h.push_call(lambda: seen.append(b"ctl"))
+        gate.set()
+        assert h.wait_idle(1.0)
+        assert seen == [b"\x00", b"\x01", b"\x02", b"ctl"]
+        assert h.stats()["depth_chunks"] == 0
+    finally:
+        h.close()
+
+
+def test_session_decodes_off_the_reader_thread(monkeypatch) -> None:
+    monkeypatch.setattr(
+        "app.comm.session.ConfigRepo.load",
+        lambda self: {"comm": {"enable_heartbeat": False}, "logging": {"hex": {"capture": False}}},
+    )
+    port, mcu = FakeSerialPort(), FakeSerialPort()
+    port.connect_peer(mcu)
+    session = SerialSession(port=port, name="hand")
+    threads = []
+    orig = session._process_rx
+
+    def _spy(data: bytes, t_rx: float) -> None:
+        threads.append(threading.current_thread().name)
+        orig(data, t_rx)
+    session._rx_handoff._consumer = _spy
+    try:
+        mcu.write_bytes(encode_frame(ProtocolFrame(FrameType.B0, 0xFFFF, b"")))
+        assert session.wait_rx_idle()
+        assert threads == ["hand-rx-decode"]
+        st = session.stats()
+        assert st["latency"]["rx_to_decode"]["count"] == 1
+        assert st["rx_handoff"]["pushed_chunks"] == 1
+        assert session.link_usage()["rx_by_type"] == {"B0": 10}
+    finally:
+        session.close()
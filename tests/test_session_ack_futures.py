@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.comm.protocol import FrameType, ProtocolFrame, StreamDecoder, build_a0, encode_frame
+from app.comm.serial_port import FakeSerialPort
+from app.comm.session import SerialSession
+from conftest import wait_for
+
+
+def _make_session(monkeypatch, retry: dict):
+    monkeypatch.setattr(
+        "app.comm.session.ConfigRepo.load",
+        lambda self: {
+            "comm": {"enable_heartbeat": False, "cmd_timeout_ms": 300, "retry": retry},
+            "logging": {"hex": {"capture": False}},
+        },
+    )
+    port = FakeSerialPort()
+    mcu = FakeSerialPort()
+    port.connect_peer(mcu)
+    session = SerialSession(port=port, request_handler=lambda: ([1, 2], None))
+    return session, port, mcu
+
+
+def _sent(mcu: FakeSerialPort):
+    dec = StreamDecoder()
+    return [(f.type, f.seq) for chunk in list(mcu.rx_log) for f in dec.feed(chunk)]
+
+
+def test_bf_completes_a1_future_and_af_is_not_blocked(monkeypatch) -> None:
+    session, port, mcu = _make_session(monkeypatch, {"enabled": False})
+    results: list = []
+    done = threading.Event()
+    session.on_a1_result = lambda ok: (results.append(ok), done.set())
+    try:
+        mcu.write_bytes(encode_frame(ProtocolFrame(FrameType.B1, 0, b"")))
+        wait_for(lambda: (FrameType.A1, 0) in _sent(mcu))
+        # A1 等待 BF 期间，B0 的 AF 立即发出
+        mcu.write_bytes(encode_frame(ProtocolFrame(FrameType.B0, 0xFFFF, b"")))
+        wait_for(lambda: (FrameType.AF, 0xFFFF) in _sent(mcu), timeout=0.1)
+        assert (FrameType.AF, 0xFFFF) in _sent(mcu)
+        assert not done.is_set()
+        mcu.write_bytes(encode_frame(ProtocolFrame(FrameType.BF, 0, b"\x00")))
+        assert done.wait(1.0)
+        assert results == [True]
+        assert session._outstanding == {}
+        # 同 SEQ 的第二个 BF 与从未发送过的 SEQ：仅计数，不残留
+        mcu.write_bytes(encode_frame(ProtocolFrame(FrameType.BF, 0, b"\x00")))
+        mcu.write_bytes(encode_frame(ProtocolFrame(FrameType.BF, 0x1234, b"\x00")))
+        wait_for(lambda: session.ack_stats()["unsolicited_acks"] == 1)
+        st = session.ack_stats()
+        assert (st["duplicate_acks"], st["unsolicited_acks"], st["late_acks"]) == (1, 1, 0)
+    finally:
+        session.close()
+
+
+def test_timeouts_and_retries_are_timer_driven(monkeypatch) -> None:
+    session, port, mcu = _make_session(monkeypatch, {"enabled": True, "max_attempts": 3, "backoff_ms": 10})
+    try:
+        fut = session.send_with_ack(build_a0(), timeout_ms=30)
+        assert fut.result(timeout=2.0) is False
+        assert _sent(mcu).count((FrameType.A0, 0xFFFF)) == 3
+        assert session._offline_failures == 1
+        assert session.send_and_wait_ack(build_a0(), timeout_ms=20, single_try=True) is False
+    finally:
+        session.close()
+
+
+def test_a1_seq_skips_ffff_and_a0_collision_fails_old_future(monkeypatch) -> None:
+    session, port, mcu = _make_session(monkeypatch, {"enabled": False})
+    try:
+        session._seq = 0xFFFE
+        assert [session.next_seq(), session.next_seq()] == [0xFFFE, 0]
+        # A0（SEQ 固定 0xFFFF）在等待时同 SEQ 的 A1 入表：A0 的 Future 立即以 False 结束，BF 归 A1
+        hb = session.send_with_ack(build_a0())
+        a1 = session.send_with_ack(ProtocolFrame(FrameType.A1, 0xFFFF, b"\x01\x00"))
+        assert hb.done() and hb.result() is False
+        mcu.write_bytes(encode_frame(ProtocolFrame(FrameType.BF, 0xFFFF, b"\x00")))
+        assert a1.result(timeout=1.0) is True
+        assert session.stats()["counters"]["ack_superseded"] == 1
+    finally:
+        session.close()
+
+
+def test_send_and_wait_ack_without_tx_worker_waits_on_the_future(monkeypatch) -> None:
+    session, port, mcu = _make_session(monkeypatch, {"enabled": True, "max_attempts": 2, "backoff_ms": 0})
+    try:
+        session._stop_tx_worker()
+        threading.Timer(0.05, lambda: mcu.write_bytes(encode_frame(ProtocolFrame(FrameType.BF, 0xFFFF, b"\x00")))).start()
+        t0 = time.monotonic()
+        assert session.send_and_wait_ack(build_a0(), timeout_ms=1000) is True
+        assert time.monotonic() - t0 < 0.5
+        # 无应答：本线程按截止时间驱动重发与失败
+        assert session.send_and_wait_ack(build_a0(), timeout_ms=20) is False
+        assert _sent(mcu).count((FrameType.A0, 0xFFFF)) == 3
+    finally:
+        session.close()
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import sys
+import threading
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import pytest
+
+from app.comm.metrics import LatencyHistogram
+from app.comm.protocol import FrameType, ProtocolFrame, StreamDecoder, encode_frame
+from app.comm.serial_port import FakeSerialPort
+from app.comm.session import SerialSession
+
+
+def test_histogram_percentiles_use_bucket_bounds() -> None:
+    h = LatencyHistogram()
+    for _ in range(90):
+        h.record(0.0008)   # 800 µs → 1 ms 桶
+    for _ in range(10):
+        h.record(0.030)    # 30 ms → 50 ms 桶，max 截断到实际最大值
+    snap = h.snapshot()
+    assert snap["count"] == 100
+    assert snap["p50_ms"] == 1.0
+    assert snap["p95_ms"] == 30.0
+    assert snap["max_ms"] == 30.0
+
+
+def test_stats_snapshot_covers_b1_exchange(monkeypatch) -> None:
+    monkeypatch.setattr(
+        "app.comm.session.ConfigRepo.load",
+        lambda self: {"comm": {"enable_heartbeat": False, "retry": {"enabled": False}}, "logging": {"hex": {"capture": False}}},
+    )
+    port, mcu = FakeSerialPort(), FakeSerialPort()
+    port.connect_peer(mcu)
+    dec = StreamDecoder()
+
+    def _answer(data: bytes) -> None:
+        for f in dec.feed(data):
+            if f.type == FrameType.A1:
+                mcu.write_bytes(encode_frame(ProtocolFrame(FrameType.BF, f.seq, b"\x00")))
+
+    mcu.set_rx_callback(_answer)
+    session = SerialSession(port=port, request_handler=lambda: ([1, 2, 3], None))
+    done = threading.Event()
+    session.on_a1_result = lambda ok: done.set()
+    try:
+        mcu.write_bytes(encode_frame(ProtocolFrame(FrameType.B1, 0, b"")))
+        mcu.write_bytes(encode_frame(ProtocolFrame(FrameType.B1, 0, b"")))
+        assert done.wait(1.0)
+        assert session.wait_rx_idle()
+        st = session.stats()
+        lat = st["latency"]
+        for name in ("b1_to_af", "b1_to_a1", "a1_to_bf"):
+            assert lat[name]["count"] == 1, name
+        assert lat["rx_to_handled"]["count"] >= 3
+        assert st["counters"]["b1_duplicates"] == 1
+        assert st["counters"]["state_disconnected_to_connected"] == 1
+        assert st["state"] == "CONNECTED"
+    finally:
+        session.close()
+
+
+def test_link_accounting_utilization_windows() -> None:
+    from app.comm.metrics import LinkAccounting
+
+    now = [100.0]
+    acct = LinkAccounting(seconds_per_byte=10 / 115200, clock=lambda: now[0])
+    acct.tx("A1", 11520)          # 1 s 线路时间
+    now[0] = 105.5
+    acct.tx("AF", 1152)
+    util = acct.utilization()["tx"]
+    assert util["1s"] == pytest.approx(0.1)
+    assert util["10s"] == pytest.approx(0.11)
+    assert acct.snapshot()["tx_by_type"] == {"A1": 11520, "AF": 1152}
+
+
+def test_link_usage_counts_frames_garbage_and_errors(monkeypatch) -> None:
+    monkeypatch.setattr(
+        "app.comm.session.ConfigRepo.load",
+        lambda self: {"comm": {"enable_heartbeat": False}, "logging": {"hex": {"capture": False}}},
+    )
+    port, mcu = FakeSerialPort(), FakeSerialPort()
+    port.connect_peer(mcu)
+    session = SerialSession(port=port)
+    try:
+        bad = bytearray(encode_frame(ProtocolFrame(FrameType.B0, 1, b"")))
+        bad[-1] ^= 0xFF
+        mcu.write_bytes(b"log\r\n" + encode_frame(ProtocolFrame(FrameType.B0, 0xFFFF, b"")) + bytes(bad))
+        assert session.wait_rx_idle()
+        usage = session.link_usage()
+        assert usage["rx_bytes"] == 5 + 10 + 10
+        assert usage["rx_by_type"] == {"B0": 10}
+        assert usage["garbage_bytes"] == 5
+        assert usage["decode_error_bytes"] == 10
+        assert usage["utilization"]["rx"]["1s"] > 0
+    finally:
+        session.close()
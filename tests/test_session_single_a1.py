@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import inspect
 import sys
+from concurrent.futures import Future
 from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
@@ -50,11 +51,13 @@ def test_send_a1_payload_uses_single_frame_for_multiple_indices(monkeypatch) ->
     session = _make_session(monkeypatch)
     sent_frames = []
 
-    def _fake_send_and_wait_ack(frame, timeout_ms=None, single_try=False):
+    def _fake_send_with_ack(frame, timeout_ms=None, single_try=False):
         sent_frames.append((frame, timeout_ms, single_try))
-        return True
+        fut: Future = Future()
+        fut.set_result(True)
+        return fut
 
-    monkeypatch.setattr(session, "send_and_wait_ack", _fake_send_and_wait_ack)
+    monkeypatch.setattr(session, "send_with_ack", _fake_send_with_ack)
 
     session._send_a1_payload(indices=[1, 2, 3], attrs=[0, 1, 0], colors=[0, 1, 2])
 
@@ -62,7 +65,9 @@ def test_send_a1_payload_uses_single_frame_for_multiple_indices(monkeypatch) ->
     frame, timeout_ms, single_try = sent_frames[0]
     assert frame.type == FrameType.A1
     assert frame == build_a1(indices=[1, 2, 3], seq=0, attrs=[0, 1, 0], colors=[0, 1, 2])
-    assert timeout_ms == session.cmd_timeout_ms
+    # 未显式指定：由会话按 A1 的自适应 RTO 决定，无 RTT 样本时即 cmd_timeout_ms
+    assert timeout_ms is None
+    assert session.default_timeout_ms(FrameType.A1) == session.cmd_timeout_ms
     assert single_try is False
 
 
@@ -70,16 +75,20 @@ def test_send_a1_payload_sends_one_empty_frame_for_empty_indices(monkeypatch) ->
     session = _make_session(monkeypatch)
     sent_frames = []
 
-    def _fake_send_and_wait_ack(frame, timeout_ms=None, single_try=False):
+    def _fake_send_with_ack(frame, timeout_ms=None, single_try=False):
         sent_frames.append((frame, timeout_ms, single_try))
-        return True
+        fut: Future = Future()
+        fut.set_result(True)
+        return fut
 
-    monkeypatch.setattr(session, "send_and_wait_ack", _fake_send_and_wait_ack)
+    monkeypatch.setattr(session, "send_with_ack", _fake_send_with_ack)
 
     session._send_a1_payload(indices=[], attrs=None, colors=None)
 
     assert len(sent_frames) == 1
     frame, timeout_ms, single_try = sent_frames[0]
     assert frame == build_a1(indices=[], seq=0, attrs=None, colors=None)
-    assert timeout_ms == session.cmd_timeout_ms
+    # 未显式指定：由会话按 A1 的自适应 RTO 决定，无 RTT 样本时即 cmd_timeout_ms
+    assert timeout_ms is None
+    assert session.default_timeout_ms(FrameType.A1) == session.cmd_timeout_ms
     assert single_try is False
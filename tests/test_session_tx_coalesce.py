@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.comm.protocol import AckCode, FrameType, ProtocolFrame, StreamDecoder, encode_frame
+from app.comm.serial_port import FakeSerialPort
+from app.comm.session import SerialSession
+from conftest import wait_for
+
+
+def _make_session(monkeypatch, tx_cfg: dict):
+    monkeypatch.setattr(
+        "app.comm.session.ConfigRepo.load",
+        lambda self: {
+            "comm": {
+                "enable_heartbeat": False,
+                "cmd_timeout_ms": 50,
+                "retry": {"enabled": False},
+                "tx": tx_cfg,
+            },
+            "logging": {"hex": {"capture": False}},
+        },
+    )
+    port = FakeSerialPort()
+    mcu = FakeSerialPort()
+    port.connect_peer(mcu)
+    session = SerialSession(port=port, request_handler=lambda: ([1, 2, 3], None))
+    return session, port, mcu
+
+
+def test_af_and_a1_go_out_in_one_write(monkeypatch) -> None:
+    session, port, mcu = _make_session(monkeypatch, {"coalesce_enabled": True, "coalesce_window_ms": 5})
+    try:
+        mcu.write_bytes(encode_frame(ProtocolFrame(FrameType.B1, 0, b"")))
+        wait_for(lambda: len(port.tx_log) >= 1)
+        assert len(port.tx_log) == 1
+        frames = StreamDecoder().feed(port.tx_log[0])
+        assert [(f.type, f.seq) for f in frames] == [(FrameType.AF, 0), (FrameType.A1, 0)]
+        assert frames[0].val == bytes([int(AckCode.OK)])
+    finally:
+        session._stop_tx_worker()
+
+
+def test_coalescing_can_be_disabled(monkeypatch) -> None:
+    session, port, mcu = _make_session(monkeypatch, {"coalesce_enabled": False})
+    try:
+        mcu.write_bytes(encode_frame(ProtocolFrame(FrameType.B1, 0, b"")))
+        wait_for(lambda: len(port.tx_log) >= 2)
+        assert [StreamDecoder().feed(b)[0].type for b in port.tx_log] == [FrameType.AF, FrameType.A1]
+    finally:
+        session._stop_tx_worker()
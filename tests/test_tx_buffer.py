@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.comm.protocol import FrameType, ProtocolFrame, StreamDecoder, encode_frame
+from app.comm.serial_port import FakeSerialPort
+from app.comm.session import SerialSession
+from app.comm.tx_buffer import TxBuffer
+
+
+def test_tx_buffer_bounds_put_and_drops_on_stall() -> None:
+    now = [0.0]
+    buf = TxBuffer(max_bytes=8, write_timeout_sec=1.0, backpressure_bytes=4, clock=lambda: now[0])
+    assert buf.put(b"abcdef") and buf.backpressure()
+    assert not buf.put(b"xyz", timeout=0)  # 超出容量且不等待：丢弃
+    assert buf.stats()["tx_dropped_writes"] == 1
+    buf.consume(2)
+    assert buf.peek(16) == b"cdef" and buf.put(b"xyz", timeout=0)
+    now[0] = 0.5
+    assert not buf.check_stall()
+    now[0] = 1.6
+    assert buf.check_stall()
+    st = buf.stats()
+    assert st["tx_pending"] == 0 and st["tx_write_timeouts"] == 1 and st["tx_dropped_bytes"] == 3 + 7
+    assert buf.put(b"0123456789abc")  # 空缓冲时接受超容量的单块
+
+
+def test_tx_buffer_put_waits_for_drain() -> None:
+    buf = TxBuffer(max_bytes=4, write_timeout_sec=1.0)
+    buf.put(b"abcd")
+    threading.Timer(0.05, lambda: buf.consume(4)).start()
+    t0 = time.monotonic()
+    assert buf.put(b"ef")
+    assert 0.03 < time.monotonic() - t0 < 0.9
+    assert buf.wait_drained(0) is False and buf.peek(8) == b"ef"
+
+
+class _SlowPort(FakeSerialPort):
+    def __init__(self) -> None:
+        super().__init__()
+        self.busy = True
+
+    def tx_backpressure(self) -> bool:
+        return self.busy
+
+
+def test_session_defers_a1_while_port_reports_backpressure(monkeypatch) -> None:
+    monkeypatch.setattr(
+        "app.comm.session.ConfigRepo.load",
+        lambda self: {"comm": {"enable_heartbeat": False, "retry": {"enabled": False}, "tx": {"backpressure_retry_ms": 5}},
+                      "logging": {"hex": {"capture": False}}},
+    )
+    host, mcu = _SlowPort(), FakeSerialPort()
+    host.connect_peer(mcu)
+    session = SerialSession(host, request_handler=lambda: ([1], None))
+
+    def _types():
+        dec = StreamDecoder()
+        return [f.type for ch in list(mcu.rx_log) for f in dec.feed(ch)]
+
+    try:
+        mcu.write_bytes(encode_frame(ProtocolFrame(FrameType.B1, 1, b"")))
+        time.sleep(0.05)
+        assert _types() == [FrameType.AF]  # AF 不受背压影响，A1 被推迟
+        assert session.stats()["counters"]["a1_deferred_backpressure"] >= 2
+        host.busy = False
+        end = time.monotonic() + 1.0
+        while FrameType.A1 not in _types() and time.monotonic() < end:
+            time.sleep(0.005)
+        assert _types() == [FrameType.AF, FrameType.A1]
+    finally:
+        session.close()
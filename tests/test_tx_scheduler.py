@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.comm.protocol import FrameType, ProtocolFrame, StreamDecoder, encode_frame
+from app.comm.serial_port import FakeSerialPort
+from app.comm.session import SerialSession
+from app.comm.tx_scheduler import PRIO_AF, PRIO_HEARTBEAT, PRIO_NORMAL, TxScheduler
+
+
+def test_priority_order_deadlines_and_single_keyed_entry() -> None:
+    sched = TxScheduler()
+    out: list = []
+    sched.put(lambda: out.append("a1"), PRIO_NORMAL)
+    assert sched.put(lambda: out.append("hb"), PRIO_HEARTBEAT, key="heartbeat")
+    assert not sched.put(lambda: out.append("hb2"), PRIO_HEARTBEAT, key="heartbeat")
+    sched.put(lambda: out.append("af"), PRIO_AF)
+    sched.put(lambda: out.append("later"), PRIO_AF, at=time.monotonic() + 0.05)
+    assert len(sched) == 4
+    while True:
+        job = sched.get(timeout=0.0)
+        if job is None:
+            break
+        job()
+    assert out == ["af", "hb", "a1"]
+    t0 = time.monotonic()
+    sched.get(timeout=1.0)()
+    assert out[-1] == "later" and time.monotonic() - t0 < 0.5
+    # 阻塞中的 get 可被新任务立即唤醒
+    threading.Timer(0.02, lambda: sched.put(lambda: out.append("late-af"), PRIO_AF)).start()
+    sched.get(timeout=2.0)()
+    assert out[-1] == "late-af"
+    assert sched.put(lambda: None, key="heartbeat") and sched.cancel("heartbeat")
+    assert sched.get(timeout=0.0) is None and len(sched) == 0
+
+
+def test_heartbeat_skipped_while_link_has_traffic(monkeypatch) -> None:
+    monkeypatch.setattr(
+        "app.comm.session.ConfigRepo.load",
+        lambda self: {
+            "comm": {"enable_heartbeat": False, "retry": {"enabled": False}, "ack_timeout_ms": 20},
+            "logging": {"hex": {"capture": False}},
+        },
+    )
+    port, mcu = FakeSerialPort(), FakeSerialPort()
+    port.connect_peer(mcu)
+    session = SerialSession(port=port)
+    try:
+        session.start_heartbeat(0.05)
+        deadline = time.monotonic() + 0.3
+        while time.monotonic() < deadline:
+            mcu.write_bytes(encode_frame(ProtocolFrame(FrameType.B0, 0xFFFF, b"")))
+            time.sleep(0.01)
+        dec = StreamDecoder()
+        sent = [f.type for chunk in list(mcu.rx_log) for f in dec.feed(chunk)]
+        # 首拍之后链路一直有 B0：A0 至多发出首个
+        assert sent.count(FrameType.A0) <= 1
+        assert session.heartbeats_skipped >= 3
+    finally:
+        session.close()